@@ -0,0 +1,73 @@
+"""Creating users together with their profiles.
+
+Every user has exactly one ``UserProfile``. A user saved on its own gets it
+from ``cinema.signals.create_user_profile``, which inserts it once, when the
+user is created, with the phone number set in ``profile_phone`` on the
+instance. Saving an existing user never touches the profile.
+``bulk_create`` sends no signals, so ``import_users`` inserts the profiles
+itself, one batch per batch of users.
+"""
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import UserProfile
+
+
+def register_user(username, email, password, phone=''):
+    """Create a user and its profile in one transaction: two INSERTs."""
+    user = User(username=User.normalize_username(username), email=User.objects.normalize_email(email))
+    user.set_password(password)
+    user.profile_phone = phone
+    with transaction.atomic():
+        user.save()
+    return user
+
+
+def import_users(rows, batch_size=1000):
+    """Insert users and their profiles from dicts with ``username`` and optional ``email``, ``phone`` and ``password``.
+
+    Usernames that already exist, or repeat within ``rows``, are skipped. Rows
+    without a password get an unusable one, so those customers sign in
+    through a password reset. Hashing a password takes a few hundred
+    milliseconds, which dominates imports that carry them. Returns
+    ``(created, skipped)``.
+    """
+    created = skipped = 0
+    seen = set()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return created, skipped
+        batch_created, batch_skipped = _import_batch(batch, seen)
+        created += batch_created
+        skipped += batch_skipped
+
+
+def _import_batch(rows, seen):
+    usernames = [User.normalize_username(row['username']) for row in rows]
+    seen.update(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    users, phones = [], []
+    for username, row in zip(usernames, rows):
+        if username in seen:
+            continue
+        seen.add(username)
+        user = User(username=username, email=User.objects.normalize_email(row.get('email') or ''))
+        if row.get('password'):
+            user.set_password(row['password'])
+        else:
+            user.set_unusable_password()
+        users.append(user)
+        phones.append(row.get('phone') or '')
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+        if users and users[0].pk is None:
+            # Backends that cannot return the new ids from a bulk insert.
+            ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                       .values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        UserProfile.objects.bulk_create([UserProfile(user=user, phone=phone) for user, phone in zip(users, phones)])
+    return len(users), len(rows) - len(users)
@@ -1,13 +1,27 @@
+from django import forms
 from django.contrib import admin
-from .models import Movie, Theater, Showtime, Booking, Payment
+from .models import Movie, Theater, Showtime, Booking, Payment, TelebirrNotification
 from django.utils.html import format_html
+from django.db import connection, transaction
+from .reservations import expire_bookings
+from .seating import ACTIVE_STATUSES, active_seats, find_expired_holds, parse_seats, sync_booked_seats
+from .seatmap import invalidate_seat_map
+from .payments import review_payments
+from .search import search_filter
+from collections import Counter
 
 @admin.register(Movie)
 class MovieAdmin(admin.ModelAdmin):
     list_display = ('title', 'genre', 'duration', 'release_date')
-    search_fields = ('title', 'genre')
+    search_fields = ('title', 'genre', 'director')
     list_filter = ('genre', 'release_date')
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or connection.vendor not in ('sqlite', 'postgresql'):
+            return super().get_search_results(request, queryset, search_term)
+        # Use the full-text index instead of icontains scans.
+        return queryset.filter(search_filter(search_term)), False
+
 @admin.register(Theater)
 class TheaterAdmin(admin.ModelAdmin):
     list_display = ('name', 'capacity')
@@ -16,31 +30,78 @@ class TheaterAdmin(admin.ModelAdmin):
 @admin.register(Showtime)
 class ShowtimeAdmin(admin.ModelAdmin):
     list_display = ('movie', 'theater', 'date_time')
+    readonly_fields = ('seats_sold', 'seats_held')
     search_fields = ('movie__title', 'theater__name')
     list_filter = ('date_time', 'theater')
 
+class BookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        showtime, status = cleaned_data.get('showtime'), cleaned_data.get('payment_status')
+        if showtime is None or status not in ACTIVE_STATUSES:
+            return cleaned_data
+        taken = active_seats(showtime).filter(seat__in=parse_seats(cleaned_data.get('seats'))).exclude(booking_id=self.instance.pk)
+        taken = sorted(taken.values_list('seat', flat=True))
+        if taken:
+            self.add_error('seats', f"Already booked for this showtime: {', '.join(taken)}.")
+        return cleaned_data
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = ('showtime', 'user', 'num_tickets', 'seats', 'booking_time')
     search_fields = ('showtime__movie__title', 'user__username')
     list_filter = ('booking_time', 'showtime')
 
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if obj.payment_status in ACTIVE_STATUSES:
+                # Lapsed holds the sweeper has not released yet still occupy the seats' rows.
+                expired = [pk for pk in find_expired_holds(obj.showtime, parse_seats(obj.seats)) if pk != obj.pk]
+                if expired:
+                    expire_bookings(expired)
+            sync_booked_seats(obj)
+            invalidate_seat_map(obj.showtime_id)
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('booking', 'uploaded_at', 'is_approved', 'payment_proof_image')
+    list_select_related = ('booking__user', 'booking__showtime__movie', 'booking__showtime__theater')
     readonly_fields = ('payment_proof_image',)
-    actions = ['approve_payment']
+    actions = ['approve_payment', 'reject_payment']
 
     def payment_proof_image(self, obj):
-        return format_html('<a href="{0}" target="_blank"><img src="{0}" width="100" /></a>', obj.payment_proof.url)
+        # Only the small thumbnail is inlined; the full proof opens on click.
+        if not obj.thumbnail:
+            return format_html('<a href="{0}" target="_blank">View (processing)</a>', obj.payment_proof.url)
+        return format_html(
+            '<a href="{0}" target="_blank"><img src="{1}" width="100" loading="lazy" /></a>',
+            obj.payment_proof.url, obj.thumbnail.url,
+        )
 
     payment_proof_image.short_description = 'Payment Proof'
 
+    def review(self, request, queryset, approve):
+        results = Counter(review_payments(queryset.values_list('id', flat=True), approve).values())
+        self.message_user(request, ', '.join(f"{count} {result.replace('_', ' ')}" for result, count in sorted(results.items())))
+
     def approve_payment(self, request, queryset):
-        queryset.update(is_approved=True)
-        for payment in queryset:
-            payment.booking.payment_status = 'COMPLETED'
-            payment.booking.save()
+        self.review(request, queryset, approve=True)
 
     approve_payment.short_description = "Approve selected payments"
-""
\ No newline at end of file
+
+    def reject_payment(self, request, queryset):
+        self.review(request, queryset, approve=False)
+
+    reject_payment.short_description = "Reject selected payments and release their seats"
+
+@admin.register(TelebirrNotification)
+class TelebirrNotificationAdmin(admin.ModelAdmin):
+    list_display = ('out_trade_no', 'status', 'received_at', 'processed_at', 'result')
+    search_fields = ('out_trade_no',)
+    list_filter = ('status', 'result')
@@ -5,4 +5,7 @@ class CinemaConfig(AppConfig):
        name = 'cinema'
 
        def ready(self):
-           import cinema.signals
\ No newline at end of file
+           import cinema.signals
+           from django.db.backends.signals import connection_created
+           from cinema.metrics import install_query_recorder
+           connection_created.connect(install_query_recorder)
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""Async implementations of endpoints, mounted instead of the sync views when
+``settings.ASYNC_VIEWS`` is on and the app is served through ``eliana.asgi``.
+
+They are plain Django async views because DRF views are sync-only; responses
+keep the same shape as their DRF counterparts. DRF serializers still render
+the rows, which is safe in async code as long as every relation they touch
+was loaded up front.
+"""
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
+
+from .authentication import CachedJWTAuthentication
+from .cache import cache_catalog
+from .models import Booking, Movie, Showtime
+from .pagination import ShowtimeCursorPagination
+from .reservations import extend_hold
+from .seatmap import aget_seat_map
+from .serializers import MovieSerializer, ShowtimeSerializer
+from .telebirr import TelebirrError, TelebirrUnavailable, build_order, get_client as get_telebirr_client
+from .views import filter_showtimes
+
+logger = logging.getLogger(__name__)
+
+
+def async_api_view(*methods):
+    """Limit an async view to ``methods`` and exempt it from CSRF, as DRF's APIView does.
+
+    Before Django 5.0, ``require_http_methods`` and ``csrf_exempt`` return sync
+    wrappers, and the handler would call those without awaiting the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+async def authenticate(request):
+    """Resolve the JWT bearer user, or ``None`` if the request is anonymous or invalid."""
+    try:
+        result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+@async_api_view('POST')
+async def telebirr_payment(request, booking_id):
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    try:
+        booking = await Booking.objects.select_related('showtime__movie').aget(id=booking_id, user=user)
+    except Booking.DoesNotExist:
+        logger.error(f"Booking {booking_id} not found")
+        return JsonResponse({'error': 'Booking not found'}, status=404)
+    if booking.payment_status != 'PENDING':
+        return JsonResponse({'error': 'Payment already processed'}, status=400)
+
+    out_trade_no, order = build_order(booking)
+    try:
+        # The worker's event loop keeps serving other requests while the gateway is slow.
+        to_pay_url = await get_telebirr_client().acreate_order(order)
+    except TelebirrUnavailable as e:
+        return JsonResponse({'error': str(e)}, status=502)
+    except TelebirrError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    booking.transaction_id = out_trade_no
+    await booking.asave(update_fields=['transaction_id'])
+    await sync_to_async(extend_hold)(booking, settings.TELEBIRR_CONFIG['ORDER_TIMEOUT'] * 60)
+    return JsonResponse({'toPayUrl': to_pay_url})
+
+
+@async_api_view('GET', 'HEAD')
+@cache_catalog('movie')
+async def movie_list(request):
+    movies = [movie async for movie in Movie.objects.all()]
+    data = MovieSerializer(movies, many=True, context={'request': Request(request)}).data
+    return JsonResponse(data, safe=False)
+
+
+@async_api_view('GET', 'HEAD')
+@cache_catalog('movie', 'theater', 'showtime', 'availability', timeout=60 * 5)
+async def showtime_list(request):
+    drf_request = Request(request)
+    try:
+        queryset = filter_showtimes(Showtime.objects.select_related('movie', 'theater'), drf_request.query_params)
+        paginator = ShowtimeCursorPagination()
+        page = await paginator.apaginate_queryset(queryset, drf_request)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+    data = ShowtimeSerializer(page, many=True, context={'request': drf_request}).data
+    return JsonResponse(paginator.get_paginated_response(data).data)
+
+
+@async_api_view('GET', 'HEAD')
+async def showtime_booked_seats(request, showtime_id):
+    try:
+        seat_map = await aget_seat_map(showtime_id)
+    except Showtime.DoesNotExist:
+        logger.error(f"Showtime {showtime_id} not found")
+        return JsonResponse({'error': 'Showtime not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error fetching booked seats: {str(e)}", exc_info=True)
+        return JsonResponse({'error': f"Error fetching booked seats: {str(e)}"}, status=500)
+    if request.GET.get('encoding') == 'bitmap':
+        return JsonResponse({
+            'rows': seat_map.rows,
+            'columns': seat_map.columns,
+            'bitmap': seat_map.encode(),
+            'extra_seats': sorted(seat_map.extra),
+        })
+    return JsonResponse({'booked_seats': seat_map.labels()})
@@ -0,0 +1,83 @@
+"""JWT authentication that skips the user query on read requests.
+
+``JWTAuthentication`` loads the ``User`` row on every request. For safe
+methods ``CachedJWTAuthentication`` trusts the user id in the signed token
+and takes the user, with its profile, from the shared cache instead. The
+entry lives for ``AUTH_USER_CACHE_TTL`` seconds and is dropped whenever the
+user or profile is saved or deleted (see ``cinema.signals``), so a
+deactivated account or revoked staff flag takes effect on the next request
+rather than when the token expires. Writes always load the row.
+
+The cached copy leaves out the password hash: it is deferred, and loads
+from the database only if something reads it.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import UserProfile
+
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+PROFILE_FIELDS = [field.attname for field in UserProfile._meta.concrete_fields]
+
+
+def user_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_key(user_id))
+
+
+def load_user(user_id):
+    """The user with its profile, or ``None``; cached for ``AUTH_USER_CACHE_TTL`` seconds."""
+    key = user_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        user = User.objects.select_related('profile').filter(pk=user_id).first()
+        if user is None:
+            return None
+        profile = getattr(user, 'profile', None)
+        entry = (
+            [getattr(user, name) for name in USER_FIELDS],
+            None if profile is None else [getattr(profile, name) for name in PROFILE_FIELDS],
+        )
+        cache.set(key, entry, settings.AUTH_USER_CACHE_TTL)
+        return user
+    user_values, profile_values = entry
+    user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, user_values)
+    if profile_values is not None:
+        user.profile = UserProfile.from_db(DEFAULT_DB_ALIAS, PROFILE_FIELDS, profile_values)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        # Revocation on password change needs the hash, so it takes the slow path too.
+        if request.method not in SAFE_METHODS or api_settings.CHECK_REVOKE_TOKEN:
+            return super().authenticate(request)
+        header = self.get_header(request)
+        raw_token = None if header is None else self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_cached_user(validated_token), validated_token
+
+    def get_cached_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,12 @@
+"""Load testing for the booking funnel.
+
+* ``data`` seeds a scratch database with movies, theaters, showtimes, users
+  and past bookings at a configurable scale.
+* ``funnel`` replays customer journeys (movies, showtimes, booked seats,
+  booking, payment proof) through the full Django stack and records the
+  latency and query count of every request.
+* ``results`` turns the samples into per-endpoint statistics, saves them as
+  JSON and compares a run against a saved baseline.
+
+The ``bench_funnel`` management command ties them together.
+"""
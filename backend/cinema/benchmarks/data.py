@@ -0,0 +1,80 @@
+"""Synthetic catalog, audience and booking history for load tests."""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from cinema.models import BookedSeat, Booking, Movie, Showtime, Theater
+from cinema.seating import recount_seats, seat_label
+
+GENRES = ['Drama', 'Comedy', 'Action', 'Romance', 'Thriller', 'Horror', 'Animation', 'Documentary']
+WORDS = ['Love', 'Night', 'City', 'River', 'Shadow', 'King', 'Storm', 'Journey', 'Secret', 'Garden', 'Fire',
+         'Winter', 'Road', 'House', 'Dream', 'Silence', 'Heart', 'Mountain', 'Promise', 'Letter']
+# (rows, columns) of the halls, from a studio to a premiere auditorium.
+THEATER_SIZES = [(8, 12), (10, 15), (14, 20), (20, 25)]
+USERNAME_PREFIX = 'bench-user-'
+
+
+def seed(movies=200, theaters=8, showtimes_per_theater=30, users=2000, occupancy=0.3, seed=1):
+    """Fill an empty database and return a summary of what was created.
+
+    Showtimes start within the next hour and run every three hours per
+    theater, so they are all upcoming. ``occupancy`` of each showtime's seats
+    are sold to random users, one to four seats per booking.
+    """
+    rng = random.Random(seed)
+    movie_rows = Movie.objects.bulk_create([
+        Movie(title=' '.join(rng.sample(WORDS, rng.randint(1, 3))), genre=rng.choice(GENRES),
+              director=f'Director {rng.randrange(max(movies // 4, 1))}', duration=rng.randint(85, 170),
+              poster='https://example.com/poster.jpg',
+              release_date=date(2024, 1, 1) + timedelta(days=rng.randrange(700)))
+        for _ in range(movies)
+    ], batch_size=1000)
+    theater_rows = Theater.objects.bulk_create([
+        Theater(name=f'Hall {i + 1}', capacity=rows * columns, rows=rows, columns=columns)
+        for i, (rows, columns) in enumerate(THEATER_SIZES[i % len(THEATER_SIZES)] for i in range(theaters))
+    ])
+    start = timezone.now() + timedelta(hours=1)
+    # A few titles draw most of the audience, as on a premiere night.
+    weights = [1 / (rank + 1) for rank in range(len(movie_rows))]
+    Showtime.objects.bulk_create([
+        Showtime(movie=rng.choices(movie_rows, weights)[0], theater=theater, date_time=start + timedelta(hours=3 * slot))
+        for theater in theater_rows for slot in range(showtimes_per_theater)
+    ], batch_size=1000)
+    User.objects.bulk_create(
+        [User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(users)], batch_size=5000,
+    )
+    user_ids = list(User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('id', flat=True))
+
+    showtimes = list(Showtime.objects.select_related('theater').order_by('id'))
+    booking_count = seat_count = 0
+    for showtime in showtimes:
+        theater = showtime.theater
+        seats = [seat_label(row, column) for row in range(theater.rows) for column in range(theater.columns)]
+        rng.shuffle(seats)
+        seats = seats[:int(len(seats) * occupancy)]
+        groups = []
+        while seats:
+            size = rng.randint(1, 4)
+            groups.append(seats[:size])
+            seats = seats[size:]
+        bookings = Booking.objects.bulk_create([
+            Booking(user_id=rng.choice(user_ids), showtime=showtime, num_tickets=len(group), seats=','.join(group),
+                    payment_status='COMPLETED')
+            for group in groups
+        ])
+        if bookings and bookings[0].pk is None:
+            bookings = list(Booking.objects.filter(showtime=showtime).order_by('id'))
+        BookedSeat.objects.bulk_create([
+            BookedSeat(showtime=showtime, booking=booking, seat=seat)
+            for booking, group in zip(bookings, groups) for seat in group
+        ], batch_size=2000)
+        booking_count += len(groups)
+        seat_count += sum(len(group) for group in groups)
+    # bulk_create bypasses the seat counters.
+    recount_seats([showtime.id for showtime in showtimes])
+    return {
+        'movies': len(movie_rows), 'theaters': len(theater_rows), 'showtimes': len(showtimes),
+        'users': len(user_ids), 'bookings': booking_count, 'booked_seats': seat_count,
+    }
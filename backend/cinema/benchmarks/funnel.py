@@ -0,0 +1,124 @@
+"""Replay the booking funnel through the Django test client.
+
+One journey is what the React app does for a customer: list movies, list
+the showtimes of one movie, load the seat map, book free seats (retrying
+with a fresh seat map when someone else got there first) and upload a
+payment proof. Requests go through the full middleware, view and ORM
+stack in-process. No network or web server is involved, so the numbers
+measure the application and the database.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .data import USERNAME_PREFIX
+from cinema.seating import seat_label
+
+ENDPOINTS = ['movies', 'showtimes', 'booked-seats', 'bookings', 'payments']
+BOOKING_ATTEMPTS = 3
+
+
+def proof_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (200, 30, 30)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def timed(client, samples, endpoint, method, path, **kwargs):
+    """Send one request and record ``(endpoint, seconds, queries, status)``."""
+    # The query log is capped, so start each capture from an empty one.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - started
+    samples.append((endpoint, elapsed, len(queries), response.status_code))
+    return response
+
+
+def journey(client, rng, samples, proof):
+    """Walk one customer through the funnel and return how it ended."""
+    response = timed(client, samples, 'movies', 'get', '/api/movies/')
+    if response.status_code != 200 or not response.json():
+        return 'failed'
+    movies = response.json()
+    # Seeded popularity follows catalog order, so the head of the list draws most customers.
+    movie = rng.choices(movies, [1 / (rank + 1) for rank in range(len(movies))])[0]
+
+    response = timed(client, samples, 'showtimes', 'get', f"/api/showtimes/?movie={movie['id']}")
+    if response.status_code != 200:
+        return 'failed'
+    showtimes = response.json()['results']
+    if not showtimes:
+        return 'no_showtimes'
+    showtime = showtimes[0] if rng.random() < 0.7 else rng.choice(showtimes)
+    theater = showtime['theater']
+    grid = [seat_label(row, column) for row in range(theater['rows']) for column in range(theater['columns'])]
+    wanted = rng.randint(1, 4)
+
+    for _ in range(BOOKING_ATTEMPTS):
+        response = timed(client, samples, 'booked-seats', 'get', f"/api/showtimes/{showtime['id']}/booked-seats/")
+        if response.status_code != 200:
+            return 'failed'
+        taken = set(response.json()['booked_seats'])
+        free = [seat for seat in grid if seat not in taken]
+        if len(free) < wanted:
+            return 'sold_out'
+        seats = rng.sample(free, wanted)
+        response = timed(client, samples, 'bookings', 'post', '/api/bookings/', data={
+            'showtime_id': showtime['id'], 'num_tickets': wanted, 'seats': ','.join(seats),
+        }, content_type='application/json')
+        if response.status_code == 201:
+            break
+        if response.status_code != 400:
+            return 'failed'
+    else:
+        return 'seat_conflict'
+
+    response = timed(client, samples, 'payments', 'post', '/api/payments/', data={
+        'booking': response.json()['id'],
+        'payment_proof': SimpleUploadedFile('proof.png', proof, content_type='image/png'),
+    })
+    return 'completed' if response.status_code == 201 else 'failed'
+
+
+def run_funnel(journeys=200, concurrency=8, seed=1):
+    """Run ``journeys`` customer journeys, ``concurrency`` at a time, as seeded users.
+
+    Returns ``(samples, outcomes, elapsed_seconds)``. With a concurrency of 1
+    the journeys run in the calling thread, so they see its open transaction.
+    """
+    users = list(User.objects.filter(username__startswith=USERNAME_PREFIX).only('id'))
+    if not users:
+        raise ValueError("No seeded users; run cinema.benchmarks.data.seed() first.")
+    proof = proof_image()
+    samples = []
+
+    def run(index):
+        rng = random.Random(seed * 100_003 + index)
+        token = AccessToken.for_user(rng.choice(users))
+        client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {token}')
+        try:
+            return journey(client, rng, samples, proof)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        outcomes = [run(index) for index in range(journeys)]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(run, range(journeys)))
+    return samples, Counter(outcomes), time.perf_counter() - started
@@ -0,0 +1,96 @@
+"""Per-endpoint statistics, JSON results and comparison against a baseline."""
+import json
+import math
+import platform
+import subprocess
+from collections import defaultdict
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(samples, elapsed):
+    """Group ``(endpoint, seconds, queries, status)`` samples into per-endpoint statistics."""
+    by_endpoint = defaultdict(list)
+    for endpoint, seconds, queries, status in samples:
+        by_endpoint[endpoint].append((seconds, queries, status))
+    summary = {}
+    for endpoint, rows in by_endpoint.items():
+        latencies = sorted(seconds for seconds, _, _ in rows)
+        queries = [count for _, count, _ in rows]
+        summary[endpoint] = {
+            'requests': len(rows),
+            'throughput': len(rows) / elapsed,
+            **{f'p{p}_ms': percentile(latencies, p) * 1000 for p in PERCENTILES},
+            'mean_queries': sum(queries) / len(queries),
+            'max_queries': max(queries),
+            # 4xx answers (seat conflicts) are part of the funnel; 5xx are not.
+            'client_errors': sum(1 for _, _, status in rows if 400 <= status < 500),
+            'server_errors': sum(1 for _, _, status in rows if status >= 500),
+        }
+    return summary
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_result(config, dataset, samples, outcomes, elapsed):
+    return {
+        'commit': current_commit(),
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(), 'django': django.get_version(), 'database': connection.vendor,
+        },
+        'config': config,
+        'dataset': dataset,
+        'journeys': {
+            'total': sum(outcomes.values()), 'outcomes': dict(outcomes), 'elapsed_s': elapsed,
+            'per_second': sum(outcomes.values()) / elapsed,
+        },
+        'endpoints': summarize(samples, elapsed),
+    }
+
+
+def save(result, path):
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current, baseline, tolerance=0.2):
+    """Return ``[(endpoint, metric, baseline, current, regressed)]`` for the metrics both runs share.
+
+    p95 latency regresses when it grows by more than ``tolerance``, throughput
+    when it drops by more than ``tolerance``, and query counts on any increase.
+    """
+    rows = []
+    for endpoint, stats in current['endpoints'].items():
+        before = baseline['endpoints'].get(endpoint)
+        if before is None:
+            continue
+        rows.append((endpoint, 'p95_ms', before['p95_ms'], stats['p95_ms'],
+                     stats['p95_ms'] > before['p95_ms'] * (1 + tolerance)))
+        rows.append((endpoint, 'throughput', before['throughput'], stats['throughput'],
+                     stats['throughput'] < before['throughput'] * (1 - tolerance)))
+        rows.append((endpoint, 'max_queries', before['max_queries'], stats['max_queries'],
+                     stats['max_queries'] > before['max_queries']))
+    return rows
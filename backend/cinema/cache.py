@@ -0,0 +1,137 @@
+"""Response caching for catalog endpoints with version-based invalidation.
+
+Every cached response is keyed on the current version of the models it was
+built from. Saving or deleting one of those models bumps its version (see
+``cinema.signals``), which orphans the old entries in every worker at once
+because the version lives in the shared cache rather than in process memory.
+
+The same versions back ETag and Last-Modified validators, so a client that
+already holds the current data gets a 304 before the view or the cached
+response is touched.
+"""
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+CATALOG_TIMEOUT = 60 * 60 * 24
+
+
+def version_key(name):
+    return f'catalog-version:{name}'
+
+
+def modified_key(name):
+    return f'catalog-modified:{name}'
+
+
+def get_version(name):
+    version = cache.get(version_key(name))
+    if version is None:
+        # Seed from the clock so a version lost to eviction never repeats an old one.
+        cache.add(version_key(name), time.time_ns(), None)
+        version = cache.get(version_key(name), time.time_ns())
+    return version
+
+
+def get_modified(name):
+    """Unix time of the last change to ``name``; unknown times count as now."""
+    modified = cache.get(modified_key(name))
+    if modified is None:
+        cache.add(modified_key(name), time.time(), None)
+        modified = cache.get(modified_key(name), time.time())
+    return modified
+
+
+def bump_version(name):
+    try:
+        cache.incr(version_key(name))
+    except ValueError:
+        cache.set(version_key(name), time.time_ns(), None)
+    cache.set(modified_key(name), time.time(), None)
+
+
+def cache_catalog(*names, timeout=CATALOG_TIMEOUT):
+    """Cache successful GET responses of a view until one of ``names`` changes.
+
+    Validators also change every ``timeout`` seconds, like the cached response,
+    for listings that go stale with time rather than with writes.
+    """
+    def versions(request):
+        if not hasattr(request, '_catalog_versions'):
+            request._catalog_versions = ':'.join(str(get_version(name)) for name in names)
+        return request._catalog_versions
+
+    def etag(request, *args, **kwargs):
+        window = int(time.time() // timeout)
+        # The browsable API and JSON renderings differ, so the validator does too.
+        accept = request.headers.get('Accept', '')
+        return hashlib.md5(f'{versions(request)}:{window}:{accept}'.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        window_start = time.time() // timeout * timeout
+        return datetime.fromtimestamp(max([window_start] + [get_modified(name) for name in names]), timezone.utc)
+
+    def response_key(request):
+        # DRF picks the renderer from Accept, so each Accept value gets its own copy.
+        accept = request.headers.get('Accept', '')
+        path = hashlib.md5(f"{request.get_full_path()}:{accept}".encode()).hexdigest()
+        return f'catalog:{versions(request)}:{path}'
+
+    def validators(request):
+        return quote_etag(etag(request)), int(last_modified(request).timestamp()), response_key(request)
+
+    def async_decorator(view_func):
+        # condition() only wraps sync views before Django 5.0, so this is its
+        # async counterpart. The version lookups share one thread hop.
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view_func(request, *args, **kwargs)
+            res_etag, res_last_modified, key = await sync_to_async(validators)(request)
+            response = get_conditional_response(request, etag=res_etag, last_modified=res_last_modified)
+            if response is None:
+                response = await cache.aget(key)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                    if response.status_code == 200:
+                        await cache.aset(key, response, timeout)
+                patch_cache_control(response, no_cache=True)
+            response.headers['ETag'] = res_etag
+            response.headers['Last-Modified'] = http_date(res_last_modified)
+            return response
+        return wrapper
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            return async_decorator(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            key = response_key(request)
+            response = cache.get(key)
+            if response is not None:
+                # Validators stored with the response may be from an earlier window.
+                del response['ETag']
+                del response['Last-Modified']
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == 200:
+                    if hasattr(response, 'render') and callable(response.render):
+                        response.add_post_render_callback(lambda r: cache.set(key, r, timeout))
+                    else:
+                        cache.set(key, response, timeout)
+            # Without this, browsers may reuse a stored copy without revalidating it.
+            patch_cache_control(response, no_cache=True)
+            return response
+        return condition(etag_func=etag, last_modified_func=last_modified)(wrapper)
+    return decorator
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cinema.models import Movie, Showtime, Theater
+from cinema.reservations import reserve_seats
+
+MODES = {
+    'wsgi': (['eliana.wsgi:application'], {'ASYNC_VIEWS': 'False'}),
+    'asgi': (['eliana.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'], {'ASYNC_VIEWS': 'True'}),
+}
+
+
+class SlowGateway(BaseHTTPRequestHandler):
+    """Telebirr stand-in answering every order after ``server.delay`` seconds."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.server.delay)
+        body = json.dumps({'code': '0', 'data': {'toPayUrl': 'https://pay.example.com/checkout'}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the app with gunicorn sync workers (WSGI) and with uvicorn workers (ASGI, ASYNC_VIEWS on) "
+        "at the same worker count, and compare req/s and latency on the movie list, showtime list, "
+        "booked seats and Telebirr checkout endpoints. Run it against a scratch database "
+        "(e.g. DATABASE_URL=sqlite:////tmp/bench.sqlite3 after migrate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--gateway-delay', type=float, default=0.2,
+                            help="Seconds the stub Telebirr gateway takes per order.")
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        if Movie.objects.exists():
+            raise CommandError("The database already has movies; point DATABASE_URL at a scratch database.")
+        gateway = ThreadingHTTPServer(('127.0.0.1', 0), SlowGateway)
+        gateway.delay = options['gateway_delay']
+        gateway.daemon_threads = True
+        threading.Thread(target=gateway.serve_forever, daemon=True).start()
+
+        endpoints = self.seed()
+        results = []
+        for mode, (target, env) in MODES.items():
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', *target, '--workers', str(options['workers']),
+                 '--bind', f"127.0.0.1:{options['port']}", '--log-level', 'warning'],
+                cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                env={**os.environ, **env, 'TELEBIRR_API_URL': f'http://127.0.0.1:{gateway.server_port}/payment'},
+            )
+            try:
+                base_url = f"http://127.0.0.1:{options['port']}"
+                self.wait_until_ready(base_url)
+                for name, method, path, headers in endpoints:
+                    stats = asyncio.run(self.load(
+                        base_url, method, path, headers, options['concurrency'], options['duration'],
+                    ))
+                    results.append({'endpoint': name, 'mode': mode, **stats})
+            finally:
+                server.terminate()
+                server.wait()
+        gateway.shutdown()
+
+        self.stdout.write(
+            f"{options['workers']} workers, {options['concurrency']} concurrent clients, "
+            f"{options['duration']:.0f}s per endpoint, gateway delay {options['gateway_delay'] * 1000:.0f} ms"
+        )
+        self.stdout.write(f"{'endpoint':<14} {'mode':<5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for r in results:
+            self.stdout.write(
+                f"{r['endpoint']:<14} {r['mode']:<5} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['errors']:>7}"
+            )
+
+    def seed(self):
+        theater = Theater.objects.create(name='Bench Hall', capacity=150, rows=10, columns=15)
+        movies = Movie.objects.bulk_create([
+            Movie(title=f'Bench Movie {i}', genre='Drama', director='Bench', duration=120,
+                  poster='https://example.com/poster.jpg', release_date=date(2025, 1, 1))
+            for i in range(100)
+        ])
+        start = timezone.now() + timedelta(hours=1)
+        Showtime.objects.bulk_create([
+            Showtime(movie=movies[i % len(movies)], theater=theater, date_time=start + timedelta(hours=i))
+            for i in range(300)
+        ])
+        showtime = Showtime.objects.order_by('id').first()
+        user = User.objects.create_user(username='bench-asgi', password='bench-pass-123')
+        # Checkout only needs the booking to stay PENDING, so every request can reuse it.
+        booking = reserve_seats(user, showtime, ['A1', 'A2', 'B5'])
+        auth = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        return [
+            ('movies', 'GET', '/api/movies/', {}),
+            ('showtimes', 'GET', '/api/showtimes/', {}),
+            ('booked-seats', 'GET', f'/api/showtimes/{showtime.id}/booked-seats/', {}),
+            ('telebirr', 'POST', f'/api/payments/telebirr/{booking.id}/', auth),
+        ]
+
+    def wait_until_ready(self, base_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f'{base_url}/api/movies/').status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"The server at {base_url} did not come up within {timeout}s.")
+
+    async def load(self, base_url, method, path, headers, concurrency, duration):
+        latencies, errors = [], 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            async def worker(deadline, record):
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, headers=headers)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if record:
+                        latencies.append(time.perf_counter() - started)
+                        errors += not ok
+
+            # A short warm-up fills caches and connection pools before measuring.
+            await asyncio.gather(*(worker(time.perf_counter() + 1, False) for _ in range(concurrency)))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(started + duration, True) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            'errors': errors,
+        }
@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cinema.authentication import CachedJWTAuthentication
+
+USERNAME = 'bench-auth'
+ENDPOINTS = ['user-profile', 'booking-list-create', 'user-bookings', 'payment-list']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request queries and latency of authenticated GETs with JWTAuthentication and "
+        "CachedJWTAuthentication. Run it against a scratch database after migrate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username=USERNAME).exists():
+            raise CommandError("The database already has the benchmark user; point DATABASE_URL at a scratch database.")
+        user = User.objects.create_user(username=USERNAME, password='bench-pass-123')
+        cache.clear()
+        token = f'Bearer {AccessToken.for_user(user)}'
+        count = options['requests']
+
+        self.stdout.write(f"{'':<22} {'queries':>8} {'mean µs':>9} {'p95 µs':>9}")
+        for authentication in (JWTAuthentication, CachedJWTAuthentication):
+            # The header and method are all authenticate() reads, so a bare Django request will do.
+            http_request = RequestFactory().get('/', HTTP_AUTHORIZATION=token)
+            queries, timings = self.run(lambda: authentication().authenticate(http_request), count)
+            self.stdout.write(f"{authentication.__name__:<22} {queries:>8.1f} {statistics.mean(timings):>9.0f} "
+                              f"{self.p95(timings):>9.0f}")
+
+        self.stdout.write("\nPer endpoint, stock -> cached:")
+        client = Client(HTTP_AUTHORIZATION=token)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in ENDPOINTS:
+                url = reverse(name)
+                results = []
+                for authentication in (JWTAuthentication, CachedJWTAuthentication):
+                    # Every view reads the default from APIView, bound when the class was defined.
+                    original = APIView.authentication_classes
+                    APIView.authentication_classes = [authentication]
+                    try:
+                        results.append(self.run(lambda: client.get(url), count))
+                    finally:
+                        APIView.authentication_classes = original
+                (before, before_timings), (after, after_timings) = results
+                self.stdout.write(
+                    f"  {name:<20} queries {before:.1f} -> {after:.1f}, "
+                    f"mean {statistics.mean(before_timings):.0f} -> {statistics.mean(after_timings):.0f} µs"
+                )
+
+    def run(self, call, count):
+        """Mean queries and the latencies in µs of ``count`` calls, after one warm-up call."""
+        call()
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                started = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - started) * 1_000_000)
+        return len(queries) / count, timings
+
+    def p95(self, timings):
+        timings = sorted(timings)
+        return timings[int(len(timings) * 0.95) - 1]
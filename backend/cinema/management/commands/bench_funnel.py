@@ -0,0 +1,102 @@
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from cinema.benchmarks import data, funnel, results
+from cinema.models import Movie
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic data, replay booking-funnel journeys and report p50/p95/p99 latency, throughput "
+        "and query counts per endpoint. Results are saved as JSON and can be compared with a baseline "
+        "from an earlier commit. Run it against a scratch database after migrate. SQLite only takes one "
+        "writer at a time and fails concurrent bookings with 'database is locked', so on SQLite journeys "
+        "run one at a time; use PostgreSQL (DATABASE_URL=postgres://...) for --concurrency above 1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=200)
+        parser.add_argument('--theaters', type=int, default=8)
+        parser.add_argument('--showtimes-per-theater', type=int, default=30)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--occupancy', type=float, default=0.3)
+        parser.add_argument('--journeys', type=int, default=500)
+        parser.add_argument('--concurrency', type=int,
+                            help="Journeys in flight at once (default: 8, or 1 on SQLite).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--reuse-data', action='store_true',
+                            help="Replay against data seeded by an earlier run instead of seeding.")
+        parser.add_argument('--output', help="Where to write the JSON results (default: funnel-<commit>.json).")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.2)
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] is None:
+            options['concurrency'] = 1 if connection.vendor == 'sqlite' else 8
+        elif options['concurrency'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError("SQLite fails concurrent bookings with 'database is locked'; use --concurrency 1 "
+                               "or point DATABASE_URL at PostgreSQL.")
+        if options['reuse_data']:
+            dataset = None
+        elif Movie.objects.exists():
+            raise CommandError("The database already has movies; point DATABASE_URL at a scratch database "
+                               "or pass --reuse-data.")
+        else:
+            dataset = data.seed(
+                movies=options['movies'], theaters=options['theaters'],
+                showtimes_per_theater=options['showtimes_per_theater'], users=options['users'],
+                occupancy=options['occupancy'], seed=options['seed'],
+            )
+            # Cached seat maps and catalog pages from another database would shadow the new rows.
+            cache.clear()
+            self.stdout.write(f"Seeded {dataset}.")
+
+        # The test client's host, and a throwaway home for the uploaded proofs.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], MEDIA_ROOT=media_root,
+        ):
+            samples, outcomes, elapsed = funnel.run_funnel(
+                options['journeys'], options['concurrency'], options['seed'],
+            )
+        config = {name: options[name] for name in (
+            'movies', 'theaters', 'showtimes_per_theater', 'users', 'occupancy', 'journeys', 'concurrency', 'seed',
+        )}
+        result = results.build_result(config, dataset, samples, outcomes, elapsed)
+
+        self.stdout.write(
+            f"{result['journeys']['total']} journeys in {elapsed:.1f}s "
+            f"({result['journeys']['per_second']:.1f}/s): {dict(outcomes)}"
+        )
+        self.stdout.write(f"{'endpoint':<13} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                          f"{'queries':>8} {'4xx':>5} {'5xx':>5}")
+        for endpoint in funnel.ENDPOINTS:
+            stats = result['endpoints'].get(endpoint)
+            if stats:
+                self.stdout.write(
+                    f"{endpoint:<13} {stats['requests']:>6} {stats['throughput']:>8.1f} {stats['p50_ms']:>8.1f} "
+                    f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_queries']:>8} "
+                    f"{stats['client_errors']:>5} {stats['server_errors']:>5}"
+                )
+
+        output = options['output'] or f"funnel-{(result['commit'] or 'unversioned')[:8]}.json"
+        results.save(result, output)
+        self.stdout.write(f"Saved {output}.")
+
+        if options['baseline']:
+            baseline = results.load(options['baseline'])
+            rows = results.compare(result, baseline, options['tolerance'])
+            self.stdout.write(f"Compared with {options['baseline']} ({(baseline.get('commit') or '?')[:8]}):")
+            for endpoint, metric, before, after, regressed in rows:
+                self.stdout.write(
+                    f"  {endpoint:<13} {metric:<12} {before:>9.1f} -> {after:>9.1f}"
+                    f"{'  REGRESSION' if regressed else ''}"
+                )
+            regressions = [row for row in rows if row[-1]]
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} metrics regressed beyond the tolerance.")
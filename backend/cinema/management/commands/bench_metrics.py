@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from cinema import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what the performance instrumentation adds per request, per SQL statement and per "
+        "serialized object, and check it against the budget in cinema.metrics. It only runs SELECT 1, "
+        "so any database will do."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20_000)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--fail-over-budget', action='store_true')
+
+    def handle(self, *args, **options):
+        iterations, rounds = options['iterations'], options['rounds']
+
+        request = RequestFactory().get('/api/movies/')
+        request.resolver_match = resolve('/api/movies/')
+        response = HttpResponse()
+        view = lambda request: response  # noqa: E731
+        middleware = metrics.MetricsMiddleware(view)
+        per_request = self.overhead(lambda: view(request), lambda: middleware(request), iterations, rounds)
+
+        with connection.cursor() as cursor:
+            def query():
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+
+            def instrumented_query():
+                token = metrics._current.set(metrics.RequestStats())
+                try:
+                    query()
+                finally:
+                    metrics._current.reset(token)
+
+            connection.execute_wrappers.remove(metrics.record_query)
+            try:
+                bare = self.measure(query, iterations, rounds)
+            finally:
+                metrics.install_query_recorder(connection=connection)
+            # Both sides pay for setting the context variable, so only the wrapper is counted.
+            with_wrapper = self.measure(instrumented_query, iterations, rounds)
+            context_only = self.measure(lambda: metrics._current.set(None), iterations, rounds)
+            per_query = with_wrapper - bare - context_only
+
+        token = metrics._current.set(metrics.RequestStats())
+        try:
+            def serialize():
+                with metrics.timed('serializer'):
+                    pass
+            per_row = self.measure(serialize, iterations, rounds)
+        finally:
+            metrics._current.reset(token)
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+
+        over = []
+        for name, value, budget in (
+            ('request', per_request, metrics.REQUEST_BUDGET_US),
+            ('SQL statement', per_query, metrics.QUERY_BUDGET_US),
+            ('serialized object', per_row, metrics.SERIALIZER_BUDGET_US),
+        ):
+            self.stdout.write(f"Overhead per {name}: {value:.2f} µs (budget {budget} µs){' OVER' if value > budget else ''}")
+            if value > budget:
+                over.append(name)
+        if over and options['fail_over_budget']:
+            raise CommandError(f"Instrumentation over budget per {', '.join(over)}.")
+
+    def measure(self, call, iterations, rounds):
+        """Median over ``rounds`` of the mean µs per call."""
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                call()
+            timings.append((time.perf_counter() - started) / iterations * 1_000_000)
+        return statistics.median(timings)
+
+    def overhead(self, bare, instrumented, iterations, rounds):
+        return self.measure(instrumented, iterations, rounds) - self.measure(bare, iterations, rounds)
@@ -0,0 +1,70 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from cinema.models import Movie
+from cinema.search import matching_ids
+
+WORDS = ['love', 'night', 'city', 'river', 'shadow', 'king', 'storm', 'journey', 'secret', 'garden', 'fire',
+         'winter', 'road', 'house', 'dream', 'silence', 'heart', 'mountain', 'promise', 'letter', 'stranger',
+         'harbor', 'echo', 'summer', 'mirror', 'thunder', 'bridge', 'lantern', 'desert', 'ocean']
+GENRES = ['Drama', 'Comedy', 'Action', 'Romance', 'Thriller', 'Horror', 'Animation', 'Documentary']
+NAMES = ['Abebe', 'Selam', 'Hanna', 'Dawit', 'Meron', 'Yonas', 'Tigist', 'Bereket', 'Ruth', 'Samuel']
+QUERIES = {
+    'prefix': ['sha', 'thu', 'lan', 'mou', 'pro'],
+    'word': ['storm', 'garden', 'comedy', 'selam', 'echo'],
+    'multi-word': ['night city', 'secret garden', 'winter drama', 'river dawit', 'king storm'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load synthetic movies and time full-text search queries against an icontains scan. "
+        "Run it against a scratch database (e.g. DATABASE_URL=sqlite:////tmp/bench.sqlite3 after migrate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if Movie.objects.exists():
+            raise CommandError("The database already has movies; point DATABASE_URL at a scratch database.")
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        Movie.objects.bulk_create([
+            Movie(title=' '.join(rng.sample(WORDS, rng.randint(1, 4))).title(), genre=rng.choice(GENRES),
+                  director=f'{rng.choice(NAMES)} {rng.choice(NAMES)}', duration=120,
+                  poster='https://example.com/poster.jpg',
+                  release_date=date(2000, 1, 1) + timedelta(days=rng.randrange(9000)))
+            for _ in range(options['movies'])
+        ], batch_size=2000)
+        self.stdout.write(f"Loaded {options['movies']} movies in {time.perf_counter() - started:.1f}s.")
+
+        for kind, queries in QUERIES.items():
+            indexed = self.time(lambda q: matching_ids(q), queries, options['repeat'])
+            scanned = self.time(lambda q: list(Movie.objects.filter(*[
+                Q(title__icontains=t) | Q(genre__icontains=t) | Q(director__icontains=t) for t in q.split()
+            ]).order_by('title').values_list('id', flat=True)[:20]), queries, options['repeat'])
+            self.stdout.write(
+                f"{kind:>10}: index median {statistics.median(indexed):.2f} ms, p95 {self.p95(indexed):.2f} ms; "
+                f"icontains median {statistics.median(scanned):.2f} ms, p95 {self.p95(scanned):.2f} ms"
+            )
+
+    def time(self, search, queries, repeat):
+        timings = []
+        for _ in range(repeat):
+            for query in queries:
+                started = time.perf_counter()
+                search(query)
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def p95(self, timings):
+        timings = sorted(timings)
+        return timings[int(len(timings) * 0.95) - 1]
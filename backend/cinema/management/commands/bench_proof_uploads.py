@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from PIL import Image
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+
+from cinema.serializers import PaymentSerializer
+from cinema.uploads import ProofUploadHandler
+
+BOUNDARY = 'bench-proof-boundary'
+
+
+def peak_rss_mb():
+    # On Linux ru_maxrss survives fork+exec (it would report the parent's
+    # peak), while VmHWM is reset for the new process image.
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:')) / 1024
+    except OSError:
+        # macOS reports ru_maxrss in bytes.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+def write_body(path, size_mb):
+    """Write a multipart body carrying an uncompressed PNG of about ``size_mb``."""
+    side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+    buffer = BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(buffer, format='PNG', compress_level=0)
+    with open(path, 'wb') as f:
+        f.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="payment_proof"; filename="proof.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n'.encode()
+        )
+        f.write(buffer.getvalue())
+        f.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+
+
+def parse_upload(path, streaming):
+    """Run one upload through request parsing and proof validation, as the payments view does."""
+    with open(path, 'rb') as f:
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/payments/', 'SERVER_NAME': 'bench', 'SERVER_PORT': '80',
+            'wsgi.url_scheme': 'http', 'wsgi.input': f, 'CONTENT_LENGTH': str(os.path.getsize(path)),
+            'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+        })
+        if streaming:
+            request.upload_handlers = [ProofUploadHandler(request)]
+        try:
+            proof = Request(request, parsers=[MultiPartParser()]).data['payment_proof']
+            PaymentSerializer().fields['payment_proof'].run_validation(proof)
+            return 'accepted'
+        except APIException as e:
+            return e.default_code
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare peak RSS of payment-proof uploads through Django's default upload handlers and "
+        "through ProofUploadHandler. Each case runs in a fresh subprocess so peaks do not carry over."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='2,8,25', help="Comma-separated proof sizes in MiB.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--child', nargs=3, metavar=('MODE', 'BODY', 'CONCURRENCY'), help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['child']:
+            return self.run_child(*options['child'])
+
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for size_mb in [float(size) for size in options['sizes'].split(',')]:
+                body = os.path.join(tmp, f'{size_mb}.multipart')
+                write_body(body, size_mb)
+                for mode in ('default', 'streaming'):
+                    output = subprocess.run(
+                        [sys.executable, sys.argv[0], 'bench_proof_uploads',
+                         '--child', mode, body, str(options['concurrency'])],
+                        check=True, capture_output=True, text=True,
+                    ).stdout
+                    results.append({'size_mb': size_mb, 'mode': mode, **json.loads(output.strip().splitlines()[-1])})
+
+        self.stdout.write(f"{'size MiB':>8} {'mode':>9} {'baseline':>9} {'peak':>8} {'delta':>8} {'seconds':>8}  outcome")
+        for r in results:
+            self.stdout.write(
+                f"{r['size_mb']:>8.1f} {r['mode']:>9} {r['baseline_mb']:>8.1f}M {r['peak_mb']:>7.1f}M "
+                f"{r['peak_mb'] - r['baseline_mb']:>7.1f}M {r['seconds']:>8.2f}  {r['outcome']}"
+            )
+
+    def run_child(self, mode, body, concurrency):
+        concurrency = int(concurrency)
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = set(pool.map(parse_upload, [body] * concurrency, [mode == 'streaming'] * concurrency))
+        self.stdout.write(json.dumps({
+            'baseline_mb': baseline, 'peak_mb': peak_rss_mb(),
+            'seconds': time.perf_counter() - started, 'outcome': ','.join(sorted(outcomes)),
+        }))
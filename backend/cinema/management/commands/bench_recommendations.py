@@ -0,0 +1,124 @@
+import random
+import resource
+import statistics
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from cinema.models import Booking, Movie, Recommendation, Showtime, Theater
+from cinema.recommendations import rebuild, record_booking
+
+GENRES = ['Drama', 'Comedy', 'Action', 'Romance', 'Thriller', 'Horror', 'Animation', 'Documentary',
+          'Sci-Fi', 'Fantasy', 'Musical', 'History']
+
+
+class Command(BaseCommand):
+    help = (
+        "Load synthetic users and bookings, then time a full recommendation rebuild, incremental "
+        "per-booking updates and the endpoint lookup. Run it against a scratch database "
+        "(e.g. DATABASE_URL=sqlite:////tmp/bench.sqlite3 after migrate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--bookings', type=int, default=1_000_000)
+        parser.add_argument('--movies', type=int, default=2_000)
+        parser.add_argument('--samples', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if Booking.objects.exists():
+            raise CommandError("The database already has bookings; point DATABASE_URL at a scratch database.")
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        users = self.load(rng, options['users'], options['bookings'], options['movies'])
+        self.stdout.write(f"Loaded {options['users']} users and {options['bookings']} bookings "
+                          f"in {time.perf_counter() - started:.1f}s.")
+
+        started = time.perf_counter()
+        ranked, pairs = rebuild()
+        self.stdout.write(
+            f"Full rebuild: {time.perf_counter() - started:.1f}s for {ranked} users and {pairs} co-occurrence pairs, "
+            f"{Recommendation.objects.count()} recommendation rows, peak RSS "
+            f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB."
+        )
+
+        showtime_ids = list(Showtime.objects.values_list('id', flat=True))
+        timings, queries = [], []
+        for user_id in rng.sample(users, options['samples']):
+            # bulk_create skips the post_save hook, so only the timed call updates the aggregates.
+            booking, = Booking.objects.bulk_create([Booking(
+                user_id=user_id, showtime_id=rng.choice(showtime_ids), num_tickets=1, seats='',
+                payment_status='COMPLETED',
+            )])
+            # The query log is capped, so start each capture from an empty one.
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                record_booking(booking)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+        self.report('Incremental update per booking', timings, queries)
+
+        timings, queries = [], []
+        for user_id in rng.sample(users, options['samples']):
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                list(Recommendation.objects.filter(user_id=user_id).select_related('movie').order_by('rank'))
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+        self.report('Endpoint lookup', timings, queries)
+
+    def report(self, label, timings, queries):
+        timings = sorted(timings)
+        self.stdout.write(
+            f"{label}: median {statistics.median(timings) * 1000:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms, {max(queries)} queries max."
+        )
+
+    def load(self, rng, user_count, booking_count, movie_count):
+        theater = Theater.objects.create(name='Bench Hall', capacity=500, rows=20, columns=25)
+        movies = Movie.objects.bulk_create([
+            Movie(title=f'Bench Movie {i}', genre=rng.choice(GENRES), director=f'Director {rng.randrange(movie_count // 5)}',
+                  duration=120, poster='https://example.com/poster.jpg',
+                  release_date=date(2020, 1, 1) + timedelta(days=rng.randrange(2000)))
+            for i in range(movie_count)
+        ], batch_size=1000)
+        when = timezone.now() + timedelta(days=1)
+        showtimes = Showtime.objects.bulk_create(
+            [Showtime(movie=movie, theater=theater, date_time=when) for movie in movies], batch_size=1000,
+        )
+        # Zipf-like popularity overall and within each genre.
+        by_genre = {genre: [s for s in showtimes if s.movie.genre == genre] for genre in GENRES}
+        weights = {genre: list(accumulate(1 / (rank + 1) for rank in range(len(items)))) for genre, items in by_genre.items()}
+        all_weights = list(accumulate(1 / (rank + 1) for rank in range(len(showtimes))))
+
+        users = User.objects.bulk_create(
+            [User(username=f'rec-bench-{i}', password='!') for i in range(user_count)], batch_size=5000,
+        )
+        user_ids = [user.id for user in users] if users[0].id else list(
+            User.objects.filter(username__startswith='rec-bench-').values_list('id', flat=True)
+        )
+        favourites = {user_id: rng.choice([g for g in GENRES if by_genre[g]]) for user_id in user_ids}
+        batch = []
+        for _ in range(booking_count):
+            user_id = rng.choice(user_ids)
+            genre = favourites[user_id]
+            if rng.random() < 0.7:
+                showtime = rng.choices(by_genre[genre], cum_weights=weights[genre])[0]
+            else:
+                showtime = rng.choices(showtimes, cum_weights=all_weights)[0]
+            batch.append(Booking(user_id=user_id, showtime_id=showtime.id, num_tickets=1, seats='',
+                                 payment_status='COMPLETED'))
+            if len(batch) == 10_000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+        return user_ids
@@ -0,0 +1,91 @@
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cinema.models import Movie, Theater, Showtime, Booking, BookedSeat
+from cinema.seating import parse_seats, seat_label
+
+
+def post_booking(job):
+    url, token, payload = job
+    started = time.perf_counter()
+    try:
+        response = requests.post(url, json=payload, headers={'Authorization': f'Bearer {token}'}, timeout=30)
+        code = response.status_code
+    except requests.RequestException:
+        code = 0
+    return code, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent POSTs at /api/bookings/ for one showtime and check that no seat is sold twice. "
+        "Run it against a server (e.g. gunicorn with several workers) that uses the same database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--rows', type=int, default=5)
+        parser.add_argument('--columns', type=int, default=10)
+        parser.add_argument('--seats-per-booking', type=int, default=2)
+
+    def handle(self, *args, **options):
+        rows, columns = options['rows'], options['columns']
+        movie = Movie.objects.create(
+            title='Benchmark Premiere', genre='Benchmark', duration=120,
+            poster='https://example.com/poster.jpg', release_date=date.today(),
+        )
+        theater = Theater.objects.create(name='Benchmark Hall', capacity=rows * columns, rows=rows, columns=columns)
+        showtime = Showtime.objects.create(movie=movie, theater=theater, date_time=timezone.now() + timedelta(days=1))
+
+        tokens = []
+        for i in range(options['users']):
+            user, _ = User.objects.get_or_create(username=f'bench-user-{i}')
+            tokens.append(str(RefreshToken.for_user(user).access_token))
+
+        # Ask for far more seats than the hall has so requests fight over them.
+        all_seats = [seat_label(row, column) for row in range(rows) for column in range(columns)]
+        url = f"{options['base_url'].rstrip('/')}/api/bookings/"
+        jobs = []
+        for i in range(options['requests']):
+            seats = random.sample(all_seats, options['seats_per_booking'])
+            payload = {'showtime_id': showtime.id, 'num_tickets': len(seats), 'seats': ','.join(seats)}
+            jobs.append((url, tokens[i % len(tokens)], payload))
+
+        connections.close_all()
+        started = time.perf_counter()
+        with Pool(options['processes']) as pool:
+            results = pool.map(post_booking, jobs)
+        elapsed = time.perf_counter() - started
+
+        codes = Counter(code for code, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        sold = [seat for seats in Booking.objects.filter(showtime=showtime).values_list('seats', flat=True)
+                for seat in parse_seats(seats)]
+        oversold = [seat for seat, count in Counter(sold).items() if count > 1]
+
+        self.stdout.write(f"requests: {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s)")
+        self.stdout.write(f"status codes: {dict(codes)}")
+        self.stdout.write(
+            f"latency p50: {latencies[len(latencies) // 2] * 1000:.1f}ms "
+            f"p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms"
+        )
+        self.stdout.write(f"seats sold: {len(sold)} of {theater.capacity}")
+
+        if oversold or len(sold) > theater.capacity:
+            raise CommandError(f"Oversold seats: {', '.join(oversold) or 'capacity exceeded'}")
+        if len(sold) != BookedSeat.objects.filter(showtime=showtime).count():
+            raise CommandError("Booking.seats and the seat inventory disagree.")
+        self.stdout.write(self.style.SUCCESS("No oversells."))
@@ -0,0 +1,110 @@
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from cinema.models import Movie, Showtime, Theater
+from cinema.seatfeed import get_broker
+from eliana.asgi import application
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:')) / 1024
+
+
+class Subscriber:
+    """One EventSource client driven straight through the ASGI application."""
+
+    def __init__(self, showtime_id):
+        self.showtime_id = showtime_id
+        self.closed = asyncio.Event()
+        self.events = asyncio.Queue()
+        self.scope = {'type': 'http', 'method': 'GET', 'path': f'/api/showtimes/{showtime_id}/seats/stream/',
+                      'headers': []}
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message.get('body'):
+            self.events.put_nowait(time.perf_counter())
+
+    def start(self):
+        self.task = asyncio.ensure_future(application(self.scope, self.receive, self.send))
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold thousands of idle seat-map streams in one process and time how long a seat change takes "
+        "to reach all of them. Run it against a scratch database "
+        "(e.g. DATABASE_URL=sqlite:////tmp/bench.sqlite3 after migrate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000)
+        parser.add_argument('--showtimes', type=int, default=50)
+        parser.add_argument('--broadcasts', type=int, default=20)
+        parser.add_argument('--broker', default='cinema.seatfeed.LocalBroker',
+                            help="Broker class, e.g. cinema.seatfeed.CacheBroker.")
+
+    def handle(self, *args, **options):
+        if Showtime.objects.exists():
+            raise CommandError("The database already has showtimes; point DATABASE_URL at a scratch database.")
+        theater = Theater.objects.create(name='Bench Hall', capacity=150, rows=10, columns=15)
+        movie = Movie.objects.create(title='Bench Movie', genre='Drama', duration=120,
+                                     poster='https://example.com/poster.jpg', release_date=date(2025, 1, 1))
+        showtime_ids = [showtime.id for showtime in Showtime.objects.bulk_create([
+            Showtime(movie=movie, theater=theater, date_time=timezone.now() + timedelta(days=1))
+            for _ in range(options['showtimes'])
+        ])]
+        with override_settings(SEAT_FEED_BROKER=options['broker']):
+            asyncio.run(self.run(showtime_ids, options['subscribers'], options['broadcasts']))
+
+    async def run(self, showtime_ids, count, broadcasts):
+        broker = get_broker()
+        baseline = rss_mb()
+        started = time.perf_counter()
+        subscribers = [Subscriber(showtime_ids[i % len(showtime_ids)]) for i in range(count)]
+        for subscriber in subscribers:
+            subscriber.start()
+        # Every stream sends its snapshot once it is subscribed.
+        for subscriber in subscribers:
+            await asyncio.wait_for(subscriber.events.get(), 60)
+        connected = rss_mb()
+        self.stdout.write(
+            f"{broker.subscriber_count()} subscribers on {len(showtime_ids)} showtimes connected in "
+            f"{time.perf_counter() - started:.2f}s; RSS +{connected - baseline:.1f} MiB "
+            f"({(connected - baseline) * 1024 / count:.1f} KiB per subscriber)."
+        )
+
+        by_showtime = {}
+        for subscriber in subscribers:
+            by_showtime.setdefault(subscriber.showtime_id, []).append(subscriber)
+        latencies = []
+        for i in range(broadcasts):
+            showtime_id = showtime_ids[i % len(showtime_ids)]
+            published = time.perf_counter()
+            # Published from a worker thread, as a sync view's on_commit hook would.
+            await sync_to_async(broker.publish, thread_sensitive=False)(showtime_id, {'type': 'held', 'seats': ['A1']})
+            arrivals = [await asyncio.wait_for(s.events.get(), 10) for s in by_showtime[showtime_id]]
+            latencies.append((max(arrivals) - published) * 1000)
+        latencies.sort()
+        self.stdout.write(
+            f"Broadcast to {count // len(showtime_ids)} subscribers of one showtime: "
+            f"median {statistics.median(latencies):.2f} ms, max {latencies[-1]:.2f} ms until the last delivery."
+        )
+
+        await asyncio.sleep(0.5)
+        self.stdout.write(f"Idle: RSS {rss_mb() - baseline:+.1f} MiB over baseline, "
+                          f"{len(asyncio.all_tasks()) - 1} tasks alive.")
+        for subscriber in subscribers:
+            subscriber.closed.set()
+        await asyncio.gather(*(subscriber.task for subscriber in subscribers))
+        self.stdout.write(f"Disconnected: {broker.subscriber_count()} subscribers left.")
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema.reservations import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Release seats held by PENDING bookings whose hold has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping every --interval seconds.")
+        parser.add_argument('--interval', type=int, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_holds(batch_size=options['batch_size'])
+            self.stdout.write(f"Expired {expired} bookings.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
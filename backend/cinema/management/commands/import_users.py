@@ -0,0 +1,50 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cinema.accounts import import_users
+from cinema.models import UserProfile
+
+REQUIRED_COLUMNS = {'username'}
+OPTIONAL_COLUMNS = {'email', 'phone', 'password'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import customers from a CSV file with a username column and optional email, phone and password "
+        "columns. Users and their profiles are inserted in batches; existing usernames are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        phone_length = UserProfile._meta.get_field('phone').max_length
+        invalid = []
+
+        def valid_rows(reader):
+            # Line 1 is the header.
+            for line, row in enumerate(reader, start=2):
+                if not (row.get('username') or '').strip():
+                    invalid.append((line, "missing username"))
+                elif len(row.get('phone') or '') > phone_length:
+                    invalid.append((line, f"phone longer than {phone_length} characters"))
+                else:
+                    yield {**row, 'username': row['username'].strip()}
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            columns = set(reader.fieldnames or [])
+            if not REQUIRED_COLUMNS <= columns:
+                raise CommandError(f"The CSV needs a header with {', '.join(sorted(REQUIRED_COLUMNS))}.")
+            unknown = columns - REQUIRED_COLUMNS - OPTIONAL_COLUMNS
+            if unknown:
+                raise CommandError(f"Unknown columns: {', '.join(sorted(unknown))}.")
+            created, skipped = import_users(valid_rows(reader), options['batch_size'])
+
+        for line, reason in invalid:
+            self.stdout.write(f"Line {line}: {reason}")
+        self.stdout.write(
+            f"Imported {created} users, skipped {skipped} existing usernames and {len(invalid)} invalid rows."
+        )
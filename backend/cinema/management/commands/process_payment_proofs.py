@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema.proofs import process_pending_proofs
+from cinema.uploads import delete_stale_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Strip metadata from, downscale and thumbnail newly uploaded payment proofs, "
+        "and delete abandoned resumable uploads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new uploads every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_proofs(batch_size=options['batch_size'])
+            delete_stale_uploads()
+            if processed or not options['loop']:
+                self.stdout.write(f"Processed {processed} payment proofs.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
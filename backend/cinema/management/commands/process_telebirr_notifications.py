@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema.payments import process_notifications
+
+
+class Command(BaseCommand):
+    help = "Apply queued Telebirr payment notifications to their bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the inbox every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=2)
+
+    def handle(self, *args, **options):
+        while True:
+            changed = process_notifications(batch_size=options['batch_size'])
+            if changed or not options['loop']:
+                self.stdout.write(f"Updated {changed} bookings.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema.recommendations import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute genre/director affinities, movie co-occurrence and every user's recommendations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users whose rows are replaced per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users, pairs = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            f"Ranked {users} users from {pairs} co-occurrence pairs in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cinema.models import Showtime
+from cinema.seating import recount_seats
+
+
+class Command(BaseCommand):
+    help = "Recompute Showtime.seats_sold and seats_held from the seat inventory and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--upcoming', action='store_true', help="Only check showtimes that have not started.")
+
+    def handle(self, *args, **options):
+        showtimes = Showtime.objects.order_by('id')
+        if options['upcoming']:
+            showtimes = showtimes.filter(date_time__gte=timezone.now())
+        showtime_ids = list(showtimes.values_list('id', flat=True))
+        drifted = []
+        for start in range(0, len(showtime_ids), options['batch_size']):
+            drifted += recount_seats(showtime_ids[start:start + options['batch_size']])
+        for showtime_id, (stored_sold, stored_held), (sold, held) in drifted:
+            self.stdout.write(
+                f"Showtime {showtime_id}: sold {stored_sold} -> {sold}, held {stored_held} -> {held}"
+            )
+        self.stdout.write(f"Checked {len(showtime_ids)} showtimes, corrected {len(drifted)}.")
@@ -0,0 +1,58 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cinema.scheduling import ScheduleError, schedule_showtimes
+from cinema.serializers import ShowtimeScheduleSerializer
+
+SHOWN_CONFLICTS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Create showtimes from a JSON file of recurrence rules, in the same format as "
+        "POST /api/showtimes/schedule/: {\"rules\": [{\"movie\": 1, \"theater\": 2, \"start_date\": "
+        "\"2026-11-01\", \"end_date\": \"2026-11-30\", \"times\": [\"14:00\", \"19:30\"], \"weekdays\": [4, 5, 6]}]}. "
+        "Nothing is created if any showtime would overlap another in its theater."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--dry-run', action='store_true', help="Report the showtimes and conflicts only.")
+        parser.add_argument('--cleaning-minutes', type=int,
+                            help="Gap after each showtime (default: SHOWTIME_CLEANING_MINUTES).")
+
+    def handle(self, *args, **options):
+        with open(options['path']) as f:
+            payload = json.load(f)
+        serializer = ShowtimeScheduleSerializer(data=payload)
+        if not serializer.is_valid():
+            raise CommandError(f"Invalid rules: {json.dumps(serializer.errors)}")
+        data = serializer.validated_data
+        cleaning = options['cleaning_minutes'] if options['cleaning_minutes'] is not None else data.get('cleaning_minutes')
+        dry_run = options['dry_run'] or data['dry_run']
+
+        started = time.perf_counter()
+        try:
+            result = schedule_showtimes(
+                data['rules'], cleaning=None if cleaning is None else timedelta(minutes=cleaning), dry_run=dry_run,
+            )
+        except ScheduleError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for conflict in result['conflicts'][:SHOWN_CONFLICTS]:
+            self.stdout.write(
+                f"Rule {conflict['rule']}: theater {conflict['theater']} at {conflict['date_time']} overlaps "
+                f"{json.dumps(conflict['overlaps'])}"
+            )
+        if len(result['conflicts']) > SHOWN_CONFLICTS:
+            self.stdout.write(f"... and {len(result['conflicts']) - SHOWN_CONFLICTS} more conflicts")
+        self.stdout.write(
+            f"{result['showtimes']} showtimes planned, {len(result['conflicts'])} conflicts, "
+            f"{result['created']} created in {elapsed:.2f}s."
+        )
+        if result['conflicts'] and not dry_run:
+            raise CommandError("Nothing was created because of the conflicts above.")
@@ -0,0 +1,293 @@
+"""Per-request performance instrumentation and a Prometheus endpoint.
+
+``MetricsMiddleware`` opens a ``RequestStats`` for every request. The
+instrumentation hooks feed it while the view runs:
+
+* every SQL statement goes through ``record_query``, an execute wrapper
+  installed on each database connection as it opens;
+* ``timed('serializer')`` wraps ``to_representation`` of the API serializers
+  (see ``cinema.serializers.TimedSerializerMixin``);
+* ``outbound(service)`` wraps calls to external services (Telebirr).
+
+When the response is ready the totals go into in-process histograms labelled
+by URL route and method, and ``metrics_view`` renders them in the Prometheus
+text format. Each worker process keeps its own histograms, so Prometheus has
+to scrape every worker (or run one worker per target).
+
+Requests slower than ``METRICS_SLOW_REQUEST_MS`` are logged with the SQL they
+ran. Serializer time includes any queries a serializer triggers lazily.
+
+The instrumentation must stay within ``REQUEST_BUDGET_US`` per request,
+``QUERY_BUDGET_US`` per SQL statement and ``SERIALIZER_BUDGET_US`` per
+serialized object; ``python manage.py bench_metrics`` measures all three.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# Statements kept per request for the slow-request log.
+MAX_LOGGED_QUERIES = 50
+# Overhead budget, in microseconds, checked by bench_metrics.
+REQUEST_BUDGET_US = 50
+QUERY_BUDGET_US = 5
+SERIALIZER_BUDGET_US = 2
+
+_current = ContextVar('cinema_request_stats', default=None)
+
+
+class Histogram:
+    """Cumulative histogram with one series per label tuple, safe to share between threads."""
+
+    def __init__(self, name, documentation, labelnames, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then the sum.
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def samples(self, labels):
+        """``{'le': count}`` cumulative buckets, plus ``'sum'`` and ``'count'``, for one series."""
+        with self._lock:
+            series = list(self._series.get(labels) or [0] * (len(self.buckets) + 1) + [0.0])
+        cumulative, total = {}, 0
+        for bound, count in zip((*map(_format_value, self.buckets), '+Inf'), series):
+            total += count
+            cumulative[bound] = total
+        return {**cumulative, 'sum': series[-1], 'count': total}
+
+    def render(self):
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, values in series:
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            total = 0
+            for bound, count in zip((*map(_format_value, self.buckets), '+Inf'), values):
+                total += count
+                bucket_labels = ','.join([*pairs, f'le="{bound}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {total}')
+            suffix = '{' + ','.join(pairs) + '}' if pairs else ''
+            lines.append(f'{self.name}_sum{suffix} {_format_value(values[-1])}')
+            lines.append(f'{self.name}_count{suffix} {total}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUEST_LABELS = ('route', 'method')
+REQUEST_DURATION = Histogram(
+    'cinema_request_duration_seconds', 'Wall time of HTTP requests.', ('route', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'cinema_request_db_queries', 'SQL statements run per request.', REQUEST_LABELS, QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'cinema_request_db_duration_seconds', 'Time per request spent in SQL.', REQUEST_LABELS,
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    'cinema_request_serializer_duration_seconds', 'Time per request spent in serializers.', REQUEST_LABELS,
+)
+REQUEST_HTTP_DURATION = Histogram(
+    'cinema_request_http_duration_seconds', 'Time per request spent waiting on external services.', REQUEST_LABELS,
+)
+OUTBOUND_DURATION = Histogram(
+    'cinema_outbound_http_duration_seconds', 'Duration of calls to external services.', ('service', 'outcome'),
+)
+HISTOGRAMS = [
+    REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_DURATION, REQUEST_SERIALIZER_DURATION,
+    REQUEST_HTTP_DURATION, OUTBOUND_DURATION,
+]
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db', 'serializer', 'http', 'sql', 'depth')
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db = self.serializer = self.http = 0.0
+        # (seconds, sql) of the first statements, when the slow-request log is on.
+        self.sql = [] if capture_sql else None
+        self.depth = 0
+
+
+def current_stats():
+    """The ``RequestStats`` of the request being handled, or ``None`` outside one."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper that adds each statement's count and time to the current request."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db += elapsed
+        if stats.sql is not None and len(stats.sql) < MAX_LOGGED_QUERIES:
+            stats.sql.append((elapsed, sql))
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """``connection_created`` receiver; also safe to call on an already open connection."""
+    # First in line, so an execute_wrapper() block entered earlier pops its own wrapper.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class timed:
+    """Add the time spent in the block to ``section`` (``serializer`` or ``http``) of the current request.
+
+    Nested blocks for the same request count once, so a serializer that
+    renders nested serializers is not timed twice. A class rather than a
+    generator, since it wraps every serialized row.
+    """
+
+    __slots__ = ('section', 'stats', 'started')
+
+    def __init__(self, section):
+        self.section = section
+
+    def __enter__(self):
+        stats = self.stats = _current.get()
+        if stats is not None:
+            stats.depth += 1
+            if stats.depth == 1:
+                self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        stats = self.stats
+        if stats is not None:
+            stats.depth -= 1
+            if not stats.depth:
+                setattr(stats, self.section, getattr(stats, self.section) + time.perf_counter() - self.started)
+
+
+@contextmanager
+def outbound(service):
+    """Time a call to an external service, for its histogram and the current request's ``http`` time."""
+    stats = _current.get()
+    outcome = 'error'
+    started = time.perf_counter()
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - started
+        OUTBOUND_DURATION.observe((service, outcome), elapsed)
+        if stats is not None:
+            stats.http += elapsed
+
+
+class MetricsMiddleware:
+    """Time every request and record its SQL, serializer and outbound HTTP time.
+
+    Works under WSGI and ASGI. Put it first in ``MIDDLEWARE`` so the wall time
+    covers the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # 0 or unset turns the slow-request log off.
+        self.slow_request_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 0) or None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats(capture_sql=self.slow_request_ms is not None)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(capture_sql=self.slow_request_ms is not None)
+        # sync_to_async copies the context, so the view's threads see the same stats.
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else '<unmatched>'
+        labels = (route, request.method)
+        REQUEST_DURATION.observe((route, request.method, str(response.status_code)), elapsed)
+        REQUEST_QUERIES.observe(labels, stats.queries)
+        REQUEST_DB_DURATION.observe(labels, stats.db)
+        REQUEST_SERIALIZER_DURATION.observe(labels, stats.serializer)
+        REQUEST_HTTP_DURATION.observe(labels, stats.http)
+        if self.slow_request_ms is not None and elapsed * 1000 >= self.slow_request_ms:
+            log_slow_request(request, response, stats, elapsed)
+
+
+def log_slow_request(request, response, stats, elapsed):
+    lines = [
+        f"Slow request {request.method} {request.path} {response.status_code} took {elapsed * 1000:.0f}ms: "
+        f"{stats.queries} queries in {stats.db * 1000:.0f}ms, serializers {stats.serializer * 1000:.0f}ms, "
+        f"external HTTP {stats.http * 1000:.0f}ms"
+    ]
+    lines += [f"  {seconds * 1000:7.2f}ms  {sql}" for seconds, sql in stats.sql]
+    if stats.queries > len(stats.sql):
+        lines.append(f"  ... {stats.queries - len(stats.sql)} more")
+    logger.warning('\n'.join(lines))
+
+
+def render():
+    return '\n'.join(line for histogram in HISTOGRAMS for line in histogram.render()) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint. With ``METRICS_TOKEN`` set it needs ``Authorization: Bearer <token>``."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0009_theater_columns_theater_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedSeat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat', models.CharField(max_length=10)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_seats', to='cinema.booking')),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_seats', to='cinema.showtime')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='bookedseat',
+            constraint=models.UniqueConstraint(fields=('showtime', 'seat'), name='unique_showtime_seat'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Failed, rejected and expired bookings gave their seats back (cinema.seating.ACTIVE_STATUSES).
+ACTIVE_STATUSES = ('PENDING', 'PENDING_APPROVAL', 'COMPLETED')
+
+
+def populate_booked_seats(apps, schema_editor):
+    Booking = apps.get_model('cinema', 'Booking')
+    BookedSeat = apps.get_model('cinema', 'BookedSeat')
+    booked_seats = []
+    bookings = Booking.objects.filter(payment_status__in=ACTIVE_STATUSES).exclude(seats='')
+    for booking in bookings.order_by('id').only('id', 'showtime_id', 'seats').iterator():
+        for seat in booking.seats.split(','):
+            seat = seat.strip()
+            if seat:
+                booked_seats.append(BookedSeat(showtime_id=booking.showtime_id, booking_id=booking.id, seat=seat))
+    # Seats that were double-booked before the constraint existed keep their first claim.
+    BookedSeat.objects.bulk_create(booked_seats, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0010_bookedseat'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_booked_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:13
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def expire_pending_holds(apps, schema_editor):
+    # Seats of carts left PENDING before holds expired would otherwise stay sold for good;
+    # give them the hold they would have had, so the sweeper releases the lapsed ones.
+    Booking = apps.get_model('cinema', 'Booking')
+    BookedSeat = apps.get_model('cinema', 'BookedSeat')
+    ttl = timedelta(seconds=settings.SEAT_HOLD_TTL)
+    pending = Booking.objects.filter(payment_status='PENDING', booked_seats__isnull=False).distinct()
+    for booking_id, booking_time in pending.values_list('id', 'booking_time').iterator():
+        BookedSeat.objects.filter(booking_id=booking_id).update(expires_at=booking_time + ttl)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0011_populate_bookedseat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookedseat',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='payment_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PENDING_APPROVAL', 'Pending Approval'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('REJECTED', 'Rejected'), ('EXPIRED', 'Expired')], default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(expire_pending_holds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0012_seat_hold_expiry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['movie', 'date_time'], name='showtime_movie_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['theater', 'date_time'], name='showtime_theater_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['date_time', 'id'], name='showtime_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0013_showtime_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'booking_time'], name='booking_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+def blank_transaction_ids_to_null(apps, schema_editor):
+    Booking = apps.get_model('cinema', 'Booking')
+    Booking.objects.filter(transaction_id='').update(transaction_id=None)
+
+
+def null_transaction_ids_to_blank(apps, schema_editor):
+    Booking = apps.get_model('cinema', 'Booking')
+    Booking.objects.filter(transaction_id__isnull=True).update(transaction_id='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0014_booking_user_time_index'),
+    ]
+
+    operations = [
+        # Bookings without a checkout must hold NULL, not '', before the column can be unique.
+        migrations.AlterField(
+            model_name='booking',
+            name='transaction_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(blank_transaction_ids_to_null, null_transaction_ids_to_blank),
+        migrations.AlterField(
+            model_name='booking',
+            name='transaction_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='TelebirrNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('out_trade_no', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='telebirr_inbox_pending_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='telebirrnotification',
+            constraint=models.UniqueConstraint(fields=('out_trade_no', 'status'), name='unique_telebirr_notification'),
+        ),
+    ]
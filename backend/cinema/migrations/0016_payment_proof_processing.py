@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0015_telebirr_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='payment_proofs/thumbs/'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='payment_unprocessed_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cinema', '0016_payment_proof_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=50)),
+                ('size', models.PositiveIntegerField()),
+                ('received', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proof_uploads', to='cinema.booking')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proof_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
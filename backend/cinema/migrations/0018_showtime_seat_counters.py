@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_seat_counters(apps, schema_editor):
+    Showtime = apps.get_model('cinema', 'Showtime')
+    BookedSeat = apps.get_model('cinema', 'BookedSeat')
+    counts = BookedSeat.objects.order_by().values('showtime_id').annotate(
+        sold=Count('id', filter=Q(expires_at__isnull=True)),
+        held=Count('id', filter=Q(expires_at__isnull=False)),
+    )
+    showtimes = [Showtime(id=row['showtime_id'], seats_sold=row['sold'], seats_held=row['held']) for row in counts]
+    Showtime.objects.bulk_update(showtimes, ['seats_sold', 'seats_held'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0017_proof_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='seats_held',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='seats_sold',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_seat_counters, migrations.RunPython.noop),
+    ]
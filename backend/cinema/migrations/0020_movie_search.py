@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# SQLite: an external-content FTS5 table kept in sync by triggers, so bulk
+# inserts and queryset updates are indexed as well as Model.save().
+# SQLite cannot alter most columns in place, so Django rebuilds cinema_movie
+# for such changes and the triggers are dropped with the old table. A later
+# migration that alters cinema_movie must recreate them (MovieSearchTests
+# checks that they exist).
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE cinema_movie_fts USING fts5(
+        title, genre, director,
+        content='cinema_movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER cinema_movie_fts_insert AFTER INSERT ON cinema_movie BEGIN
+        INSERT INTO cinema_movie_fts(rowid, title, genre, director)
+        VALUES (new.id, new.title, new.genre, new.director);
+    END
+    """,
+    """
+    CREATE TRIGGER cinema_movie_fts_delete AFTER DELETE ON cinema_movie BEGIN
+        INSERT INTO cinema_movie_fts(cinema_movie_fts, rowid, title, genre, director)
+        VALUES ('delete', old.id, old.title, old.genre, old.director);
+    END
+    """,
+    """
+    CREATE TRIGGER cinema_movie_fts_update AFTER UPDATE OF title, genre, director ON cinema_movie BEGIN
+        INSERT INTO cinema_movie_fts(cinema_movie_fts, rowid, title, genre, director)
+        VALUES ('delete', old.id, old.title, old.genre, old.director);
+        INSERT INTO cinema_movie_fts(rowid, title, genre, director)
+        VALUES (new.id, new.title, new.genre, new.director);
+    END
+    """,
+    "INSERT INTO cinema_movie_fts(cinema_movie_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS cinema_movie_fts_update",
+    "DROP TRIGGER IF EXISTS cinema_movie_fts_delete",
+    "DROP TRIGGER IF EXISTS cinema_movie_fts_insert",
+    "DROP TABLE IF EXISTS cinema_movie_fts",
+]
+
+# PostgreSQL: a generated tsvector column (maintained by the database on every
+# write) with a GIN index. Title matches weigh most, then genre, then director.
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE cinema_movie ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(genre, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(director, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX cinema_movie_search_idx ON cinema_movie USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS cinema_movie_search_idx",
+    "ALTER TABLE cinema_movie DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0019_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    # Users saved without a profile used to get one on their next save; now nothing else creates it.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserProfile = apps.get_model('cinema', 'UserProfile')
+    user_ids = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    UserProfile.objects.bulk_create([UserProfile(user_id=user_id) for user_id in user_ids], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cinema', '0020_movie_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
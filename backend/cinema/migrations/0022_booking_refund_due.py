@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0021_backfill_user_profiles'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='payment_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PENDING_APPROVAL', 'Pending Approval'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('REJECTED', 'Rejected'), ('EXPIRED', 'Expired'), ('REFUND_DUE', 'Refund Due')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -32,10 +34,41 @@ class Showtime(models.Model):
        movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
        theater = models.ForeignKey(Theater, on_delete=models.CASCADE)
        date_time = models.DateTimeField()
+       # Denormalised from BookedSeat: confirmed seats and seats on a pending hold.
+       seats_sold = models.IntegerField(default=0)
+       seats_held = models.IntegerField(default=0)
+
+       SELLING_FAST_RATIO = 0.8
+       # Only cinema.seating writes these, with relative UPDATEs.
+       COUNTER_FIELDS = ('seats_sold', 'seats_held')
+
+       class Meta:
+           indexes = [
+               models.Index(fields=['movie', 'date_time'], name='showtime_movie_date_idx'),
+               models.Index(fields=['theater', 'date_time'], name='showtime_theater_date_idx'),
+               models.Index(fields=['date_time', 'id'], name='showtime_date_idx'),
+           ]
 
        def __str__(self):
            return f"{self.movie.title} at {self.theater.name} on {self.date_time}"
 
+       def save(self, *args, **kwargs):
+           # A full save would write back counters read before concurrent bookings changed them.
+           if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+               kwargs['update_fields'] = [
+                   field.name for field in self._meta.concrete_fields
+                   if not field.primary_key and field.name not in self.COUNTER_FIELDS
+               ]
+           super().save(*args, **kwargs)
+
+       @property
+       def seats_available(self):
+           return max(self.theater.capacity - self.seats_sold - self.seats_held, 0)
+
+       @property
+       def selling_fast(self):
+           return self.seats_sold + self.seats_held >= self.theater.capacity * self.SELLING_FAST_RATIO
+
 class Booking(models.Model):
        user = models.ForeignKey(User, on_delete=models.CASCADE)
        showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE)
@@ -50,19 +83,129 @@ class Booking(models.Model):
                ('COMPLETED', 'Completed'),
                ('FAILED', 'Failed'),
                ('REJECTED', 'Rejected'),
+               ('EXPIRED', 'Expired'),
+               ('REFUND_DUE', 'Refund Due'),
            ],
            default='PENDING'
        )
-       transaction_id = models.CharField(max_length=100, blank=True)
+       transaction_id = models.CharField(max_length=100, blank=True, null=True, unique=True)
+
+       class Meta:
+           indexes = [
+               models.Index(fields=['user', 'booking_time'], name='booking_user_time_idx'),
+           ]
 
        def __str__(self):
            return f"Booking for {self.showtime} by {self.user.username}"
 
+class BookedSeat(models.Model):
+       showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='booked_seats')
+       booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='booked_seats')
+       seat = models.CharField(max_length=10)
+       expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+       class Meta:
+           constraints = [
+               models.UniqueConstraint(fields=['showtime', 'seat'], name='unique_showtime_seat'),
+           ]
+
+       def __str__(self):
+           return f"Seat {self.seat} for showtime {self.showtime_id}"
+
 class Payment(models.Model):
        booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='payment')
        payment_proof = models.ImageField(upload_to='payment_proofs/')
        uploaded_at = models.DateTimeField(auto_now_add=True)
        is_approved = models.BooleanField(default=False)
+       thumbnail = models.ImageField(upload_to='payment_proofs/thumbs/', blank=True)
+       content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+       processed_at = models.DateTimeField(null=True, blank=True)
+
+       class Meta:
+           indexes = [
+               models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='payment_unprocessed_idx'),
+           ]
+
+       def __str__(self):
+           return f"Payment for booking {self.booking.id}"
+
+class TelebirrNotification(models.Model):
+       """Inbox of raw gateway callbacks, applied to bookings by a background worker."""
+       out_trade_no = models.CharField(max_length=100)
+       status = models.CharField(max_length=20)
+       payload = models.JSONField()
+       received_at = models.DateTimeField(auto_now_add=True)
+       processed_at = models.DateTimeField(null=True, blank=True)
+       result = models.CharField(max_length=20, blank=True)
+
+       class Meta:
+           constraints = [
+               # Gateway retries of the same callback collapse into one row.
+               models.UniqueConstraint(fields=['out_trade_no', 'status'], name='unique_telebirr_notification'),
+           ]
+           indexes = [
+               models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='telebirr_inbox_pending_idx'),
+           ]
+
+       def __str__(self):
+           return f"Telebirr {self.status} for {self.out_trade_no}"
+
+
+class ProofUpload(models.Model):
+       """A resumable payment-proof upload; the bytes live in ``PAYMENT_UPLOAD_DIR`` until complete."""
+       id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+       user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='proof_uploads')
+       booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='proof_uploads')
+       content_type = models.CharField(max_length=50)
+       size = models.PositiveIntegerField()
+       received = models.PositiveIntegerField(default=0)
+       created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+       def __str__(self):
+           return f"Upload {self.id} ({self.received}/{self.size} bytes)"
+
+class UserAffinity(models.Model):
+       """How many of a user's bookings were for a genre or a director."""
+       KIND_CHOICES = [('genre', 'Genre'), ('director', 'Director')]
+
+       user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='affinities')
+       kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+       value = models.CharField(max_length=100)
+       weight = models.IntegerField(default=0)
+
+       class Meta:
+           constraints = [
+               models.UniqueConstraint(fields=['user', 'kind', 'value'], name='unique_user_affinity'),
+           ]
+
+       def __str__(self):
+           return f"{self.user_id} {self.kind} {self.value}: {self.weight}"
+
+class MovieCooccurrence(models.Model):
+       """Number of users who booked both ``movie`` and ``other``; stored in both directions."""
+       movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='cooccurrences')
+       other = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+       count = models.IntegerField(default=0)
+
+       class Meta:
+           constraints = [
+               models.UniqueConstraint(fields=['movie', 'other'], name='unique_movie_cooccurrence'),
+           ]
+
+       def __str__(self):
+           return f"{self.movie_id} & {self.other_id}: {self.count}"
+
+class Recommendation(models.Model):
+       """Precomputed, ranked recommendations served by ``MovieRecommendationView``."""
+       user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recommendations')
+       movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+       rank = models.PositiveSmallIntegerField()
+       score = models.FloatField()
+
+       class Meta:
+           constraints = [
+               models.UniqueConstraint(fields=['user', 'rank'], name='unique_recommendation_rank'),
+           ]
 
        def __str__(self):
-           return f"Payment for booking {self.booking.id}"
\ No newline at end of file
+           return f"#{self.rank} for {self.user_id}: {self.movie_id}"
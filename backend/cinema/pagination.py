@@ -0,0 +1,59 @@
+from rest_framework.pagination import CursorPagination
+
+
+class _PageFetch(Exception):
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+
+class _DeferredQuerySet:
+    """Stands in for the queryset while DRF's ``paginate_queryset`` builds the page query.
+
+    Iterating it raises ``_PageFetch`` with the final query until ``rows`` are supplied.
+    """
+
+    def __init__(self, queryset, rows=None):
+        self.queryset = queryset
+        self.rows = rows
+
+    def order_by(self, *fields):
+        return _DeferredQuerySet(self.queryset.order_by(*fields), self.rows)
+
+    def filter(self, *args, **kwargs):
+        return _DeferredQuerySet(self.queryset.filter(*args, **kwargs), self.rows)
+
+    def __getitem__(self, index):
+        return _DeferredQuerySet(self.queryset[index], self.rows)
+
+    def __iter__(self):
+        if self.rows is None:
+            raise _PageFetch(self.queryset)
+        return iter(self.rows)
+
+
+class AsyncCursorPaginationMixin:
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` with the page read through the async ORM.
+
+        The cursor logic is DRF's own. It runs once to find the page query and
+        again over the fetched rows, so links and cursors match the sync views.
+        """
+        try:
+            return self.paginate_queryset(_DeferredQuerySet(queryset), request, view)
+        except _PageFetch as fetch:
+            rows = [row async for row in fetch.queryset]
+        return self.paginate_queryset(_DeferredQuerySet(queryset, rows), request, view)
+
+
+class ShowtimeCursorPagination(AsyncCursorPaginationMixin, CursorPagination):
+    ordering = ('date_time', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class BookingCursorPagination(CursorPagination):
+    ordering = ('-booking_time', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
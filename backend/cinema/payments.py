@@ -0,0 +1,204 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Booking, BookedSeat, Payment, Showtime, TelebirrNotification
+from .reservations import confirm_hold, expire_bookings, release_seats
+from .seating import claim_seats, confirm_seats, find_expired_holds, find_taken_seats, parse_seats
+from .seatmap import refresh_seat_map
+
+logger = logging.getLogger(__name__)
+
+
+class ProofRejected(Exception):
+    """The booking can no longer take a payment proof."""
+
+
+def submit_proof(booking_id, save):
+    """Call ``save`` to create a booking's Payment while holding the booking's lock.
+
+    The seat hold is made permanent and a PENDING booking moves on to
+    PENDING_APPROVAL. Raises ``ProofRejected`` if the hold already lapsed.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.select_for_update().get(pk=booking_id)
+        if booking.payment_status == 'EXPIRED':
+            raise ProofRejected('The seat hold for this booking has expired.')
+        if Payment.objects.filter(booking=booking).exists():
+            raise ProofRejected('A payment proof was already submitted for this booking.')
+        payment = save()
+        confirm_hold(booking)
+        if booking.payment_status == 'PENDING':
+            booking.payment_status = 'PENDING_APPROVAL'
+            booking.save(update_fields=['payment_status'])
+    return payment
+
+
+REVIEWABLE_STATUSES = ('PENDING', 'PENDING_APPROVAL')
+
+
+def review_payments(payment_ids, approve):
+    """Approve or reject a batch of payments in one transaction.
+
+    Approving marks the payment approved and completes its booking;
+    rejecting moves the booking to REJECTED and releases its seats. Both are a fixed
+    number of set-based UPDATEs whatever the batch size. Returns
+    ``{payment_id: result}`` where result is ``'approved'``, ``'rejected'``,
+    ``'not_found'``, ``'already_approved'`` or ``'booking_<status>'`` for a
+    booking that is no longer awaiting review.
+    """
+    payment_ids = list(dict.fromkeys(payment_ids))
+    with transaction.atomic():
+        rows = {
+            payment_id: (booking_id, is_approved, payment_status)
+            for payment_id, booking_id, is_approved, payment_status in Payment.objects.select_for_update()
+            .filter(id__in=payment_ids).values_list('id', 'booking_id', 'is_approved', 'booking__payment_status')
+        }
+        results = {}
+        for payment_id in payment_ids:
+            if payment_id not in rows:
+                results[payment_id] = 'not_found'
+            elif rows[payment_id][1]:
+                results[payment_id] = 'already_approved'
+            elif rows[payment_id][2] not in REVIEWABLE_STATUSES:
+                results[payment_id] = f'booking_{rows[payment_id][2].lower()}'
+            else:
+                results[payment_id] = 'approved' if approve else 'rejected'
+        reviewed = [payment_id for payment_id, result in results.items() if result in ('approved', 'rejected')]
+        booking_ids = [rows[payment_id][0] for payment_id in reviewed]
+        bookings = Booking.objects.filter(id__in=booking_ids, payment_status__in=REVIEWABLE_STATUSES)
+        if approve:
+            Payment.objects.filter(id__in=reviewed).update(is_approved=True)
+            bookings.update(payment_status='COMPLETED')
+        else:
+            bookings.update(payment_status='REJECTED')
+            release_seats(booking_ids)
+    return results
+
+
+def record_notification(payload):
+    """Store a gateway callback in the inbox; repeats of a stored callback are dropped.
+
+    Returns ``False`` when the payload lacks the fields needed to apply it.
+    """
+    out_trade_no = payload.get('outTradeNo')
+    status = payload.get('status')
+    if not out_trade_no or not status:
+        return False
+    TelebirrNotification.objects.bulk_create(
+        [TelebirrNotification(out_trade_no=out_trade_no, status=status, payload=payload)],
+        ignore_conflicts=True,
+    )
+    return True
+
+
+# Bookings that gave their seats back before the gateway's success arrived.
+LAPSED_STATUSES = ('EXPIRED', 'FAILED')
+
+
+def _settle_late_payment(booking):
+    """Re-claim the seats of a lapsed ``booking`` that has been paid, or flag it for a refund.
+
+    Returns ``True`` when the booking got its seats back and is COMPLETED.
+    """
+    seats = parse_seats(booking.seats)
+    with transaction.atomic():
+        showtime = Showtime.objects.select_for_update().get(pk=booking.showtime_id)
+        expired = find_expired_holds(showtime, seats)
+        if expired:
+            expire_bookings(expired)
+        if not find_taken_seats(showtime, seats):
+            try:
+                with transaction.atomic():
+                    claim_seats(booking, seats)
+            except IntegrityError:
+                pass
+            else:
+                refresh_seat_map(showtime.id)
+                booking.payment_status = 'COMPLETED'
+                booking.save(update_fields=['payment_status'])
+                return True
+        booking.payment_status = 'REFUND_DUE'
+        booking.save(update_fields=['payment_status'])
+        return False
+
+
+def _apply(notifications):
+    """Apply one batch of inbox rows with set-based UPDATEs.
+
+    Only PENDING bookings change state, so replaying a batch is a no-op. A
+    success wins over a failure for the same order, since the gateway may
+    report a failed attempt before the customer retries and pays. A success
+    for a booking that already expired or failed is ``paid_after_expiry``:
+    the booking gets its seats back if nobody took them, and moves to
+    REFUND_DUE otherwise. A success for a booking whose proof staff rejected
+    is ``paid_after_rejection``: the rejection stands and the booking moves
+    to REFUND_DUE.
+    """
+    succeeded = {n.out_trade_no for n in notifications if n.status == 'SUCCESS'}
+    failed = {n.out_trade_no for n in notifications} - succeeded
+    # Locked until the batch commits, so the sweeper cannot expire a booking
+    # between reading its status here and the UPDATEs below.
+    bookings = {
+        transaction_id: (booking_id, payment_status)
+        for booking_id, transaction_id, payment_status in Booking.objects.select_for_update().filter(
+            transaction_id__in=succeeded | failed
+        ).values_list('id', 'transaction_id', 'payment_status')
+    }
+    completed = [bookings[no][0] for no in succeeded if no in bookings and bookings[no][1] == 'PENDING']
+    cancelled = [bookings[no][0] for no in failed if no in bookings and bookings[no][1] == 'PENDING']
+    late = [bookings[no][0] for no in succeeded if no in bookings and bookings[no][1] in LAPSED_STATUSES]
+    refused = [bookings[no][0] for no in succeeded if no in bookings and bookings[no][1] == 'REJECTED']
+
+    Booking.objects.filter(id__in=completed, payment_status='PENDING').update(payment_status='COMPLETED')
+    confirm_seats(BookedSeat.objects.filter(booking_id__in=completed))
+    Booking.objects.filter(id__in=cancelled, payment_status='PENDING').update(payment_status='FAILED')
+    release_seats(cancelled)
+    settled = set()
+    for booking in Booking.objects.filter(id__in=late):
+        lapsed_status = booking.payment_status
+        if _settle_late_payment(booking):
+            logger.error(f"Telebirr payment for {lapsed_status} booking {booking.id} arrived late; its seats were re-claimed.")
+        else:
+            logger.error(f"Telebirr payment for {lapsed_status} booking {booking.id} arrived late and its seats are taken; it needs a refund.")
+        settled.add(booking.id)
+    if refused:
+        Booking.objects.filter(id__in=refused).update(payment_status='REFUND_DUE')
+        logger.error(f"Telebirr payments for rejected bookings {refused} need a refund.")
+
+    changed = set(completed) | set(cancelled)
+    results = {'applied': [], 'paid_after_expiry': [], 'paid_after_rejection': [], 'ignored': [], 'unknown': []}
+    for n in notifications:
+        if n.out_trade_no not in bookings:
+            results['unknown'].append(n.id)
+        elif bookings[n.out_trade_no][0] in changed and (n.status == 'SUCCESS') == (n.out_trade_no in succeeded):
+            results['applied'].append(n.id)
+        elif bookings[n.out_trade_no][0] in settled and n.status == 'SUCCESS':
+            results['paid_after_expiry'].append(n.id)
+        elif bookings[n.out_trade_no][0] in refused and n.status == 'SUCCESS':
+            results['paid_after_rejection'].append(n.id)
+        else:
+            # Duplicates, superseded failures and callbacks for settled bookings.
+            results['ignored'].append(n.id)
+    if results['unknown']:
+        logger.error(f"Telebirr notifications for unknown orders: {results['unknown']}")
+    now = timezone.now()
+    for result, ids in results.items():
+        if ids:
+            TelebirrNotification.objects.filter(id__in=ids).update(processed_at=now, result=result)
+    return len(changed | settled) + len(refused)
+
+
+def process_notifications(batch_size=500):
+    """Drain the inbox in batches; returns the number of bookings that changed."""
+    total = 0
+    while True:
+        with transaction.atomic():
+            notifications = list(
+                TelebirrNotification.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True).order_by('id')[:batch_size]
+            )
+            if not notifications:
+                return total
+            total += _apply(notifications)
@@ -0,0 +1,81 @@
+"""Background processing of uploaded payment proofs.
+
+Each proof is re-encoded without metadata (phone photos carry GPS EXIF),
+downscaled, and given a thumbnail. Files are named after the SHA-256 of the
+processed image, so re-uploads of the same screenshot share one file.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+MAX_DIMENSION = 1600
+THUMBNAIL_DIMENSION = 200
+MAX_PIXELS = 50_000_000
+JPEG_QUALITY = 85
+
+
+def _encode(image, dimension):
+    copy = image.copy()
+    copy.thumbnail((dimension, dimension))
+    buffer = BytesIO()
+    # Saving without exif= drops all metadata from the output.
+    copy.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _store(name, data):
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return name
+
+
+def _load(field):
+    with field.open('rb') as f:
+        data = f.read()
+    with Image.open(BytesIO(data)) as probe:
+        if probe.width * probe.height > MAX_PIXELS:
+            raise ValueError(f"{probe.width}x{probe.height} image is too large")
+        probe.verify()
+    image = Image.open(BytesIO(data))
+    # Apply the EXIF orientation before the EXIF block is dropped.
+    return ImageOps.exif_transpose(image).convert('RGB')
+
+
+def process_proof(payment):
+    original = payment.payment_proof.name
+    try:
+        image = _load(payment.payment_proof)
+    except Exception as e:
+        logger.error(f"Payment proof {payment.id} is not a usable image: {str(e)}")
+        Payment.objects.filter(pk=payment.pk).update(processed_at=timezone.now())
+        return False
+
+    data = _encode(image, MAX_DIMENSION)
+    content_hash = hashlib.sha256(data).hexdigest()
+    proof = _store(f'payment_proofs/{content_hash}.jpg', data)
+    thumbnail = _store(f'payment_proofs/thumbs/{content_hash}.jpg', _encode(image, THUMBNAIL_DIMENSION))
+    Payment.objects.filter(pk=payment.pk).update(
+        payment_proof=proof, thumbnail=thumbnail, content_hash=content_hash, processed_at=timezone.now(),
+    )
+    if original != proof and not Payment.objects.filter(payment_proof=original).exists():
+        default_storage.delete(original)
+    return True
+
+
+def process_pending_proofs(batch_size=50):
+    """Process every proof uploaded since the last run; returns how many succeeded."""
+    processed = 0
+    while True:
+        batch = list(Payment.objects.filter(processed_at__isnull=True).order_by('id')[:batch_size])
+        if not batch:
+            return processed
+        processed += sum(process_proof(payment) for payment in batch)
@@ -0,0 +1,249 @@
+"""Movie recommendations precomputed from booking history.
+
+Two aggregates are derived from ``Booking``:
+
+* ``UserAffinity``: per user, how many bookings went to each genre and director.
+* ``MovieCooccurrence``: for each pair of movies, how many users booked both.
+
+Both are folded into a user's ranked ``Recommendation`` rows, which the API
+reads with a single indexed lookup. ``record_booking`` updates the aggregates
+and re-ranks the booking user after every new booking. ``rebuild`` recomputes
+everything from scratch and should run periodically, because co-occurrence
+changes only reach other users' rankings on a rebuild.
+"""
+import heapq
+from collections import Counter, defaultdict
+from itertools import islice, permutations
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import Booking, Movie, MovieCooccurrence, Recommendation, UserAffinity
+
+TOP_N = 10
+# Only a user's most recent distinct movies feed co-occurrence, which keeps
+# the pair count per user bounded.
+HISTORY_LIMIT = 50
+RECENT_LIMIT = 10
+NEIGHBOUR_LIMIT = 20
+TOP_GENRES = 3
+COOCCURRENCE_WEIGHT = 0.6
+GENRE_WEIGHT = 0.25
+DIRECTOR_WEIGHT = 0.15
+
+
+def rank_movies(watched, cooccurrence, genres, directors, candidates):
+    """Return up to ``TOP_N`` ``(movie_id, score)`` pairs, best first.
+
+    ``cooccurrence`` maps movie ids to co-booking counts summed over the
+    user's recent movies, ``genres`` and ``directors`` map values to affinity
+    weights, and ``candidates`` maps movie ids to ``(genre, director,
+    release_date)``. Ties go to the newer release.
+    """
+    top_count = max(cooccurrence.values(), default=0) or 1
+    genre_total = sum(genres.values()) or 1
+    director_total = sum(directors.values()) or 1
+    scored = []
+    for movie_id, (genre, director, release_date) in candidates.items():
+        if movie_id in watched:
+            continue
+        score = (
+            COOCCURRENCE_WEIGHT * cooccurrence.get(movie_id, 0) / top_count
+            + GENRE_WEIGHT * genres.get(genre, 0) / genre_total
+            + DIRECTOR_WEIGHT * directors.get(director, 0) / director_total
+        )
+        if score > 0:
+            scored.append((score, release_date, movie_id))
+    return [(movie_id, score) for score, _, movie_id in heapq.nlargest(TOP_N, scored)]
+
+
+def _insert(model, fields, rows, batch_size=5000):
+    """INSERT plain tuples with ``executemany``.
+
+    A rebuild writes millions of rows, and ``bulk_create`` spends most of
+    that time building and validating model instances.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(field).column) for field in fields)
+    sql = f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(sql, batch)
+
+
+def _save_recommendations(rankings):
+    """Replace the stored rows of every user in ``rankings`` (``{user_id: [(movie_id, score)]}``)."""
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=list(rankings)).delete()
+        _insert(Recommendation, ['user', 'movie', 'rank', 'score'], (
+            (user_id, movie_id, rank, score)
+            for user_id, ranking in rankings.items()
+            for rank, (movie_id, score) in enumerate(ranking, start=1)
+        ))
+
+
+def _recent_movies(user_id):
+    recent = []
+    for movie_id in Booking.objects.filter(user_id=user_id).order_by('-booking_time', '-id').values_list(
+        'showtime__movie_id', flat=True
+    )[:HISTORY_LIMIT * 4]:
+        if movie_id not in recent:
+            recent.append(movie_id)
+    return recent[:HISTORY_LIMIT]
+
+
+def refresh_user(user_id):
+    """Re-rank one user from the stored aggregates."""
+    watched = set(Booking.objects.filter(user_id=user_id).values_list('showtime__movie_id', flat=True))
+    recent = _recent_movies(user_id)[:RECENT_LIMIT]
+    affinity = {'genre': {}, 'director': {}}
+    for kind, value, weight in UserAffinity.objects.filter(user_id=user_id).values_list('kind', 'value', 'weight'):
+        affinity[kind][value] = weight
+
+    cooccurrence = Counter()
+    for other_id, count in MovieCooccurrence.objects.filter(movie_id__in=recent).exclude(
+        other_id__in=watched
+    ).order_by('-count').values_list('other_id', 'count')[:NEIGHBOUR_LIMIT * RECENT_LIMIT]:
+        cooccurrence[other_id] += count
+    cooccurrence = dict(cooccurrence.most_common(NEIGHBOUR_LIMIT))
+
+    top_genres = [genre for genre, _ in Counter(affinity['genre']).most_common(TOP_GENRES)]
+    candidate_ids = set(cooccurrence)
+    for genre in top_genres:
+        candidate_ids.update(
+            Movie.objects.filter(genre=genre).exclude(id__in=watched)
+            .order_by('-release_date', '-id').values_list('id', flat=True)[:TOP_N]
+        )
+    candidates = {
+        movie_id: (genre, director, release_date)
+        for movie_id, genre, director, release_date in Movie.objects.filter(
+            Q(id__in=candidate_ids) | Q(director__in=[d for d in affinity['director'] if d])
+        ).values_list('id', 'genre', 'director', 'release_date')
+    }
+    ranking = rank_movies(watched, cooccurrence, affinity['genre'], affinity['director'], candidates)
+    _save_recommendations({user_id: ranking})
+
+
+def _bump_affinity(user_id, kind, value):
+    if not value:
+        return
+    if UserAffinity.objects.filter(user_id=user_id, kind=kind, value=value).update(weight=F('weight') + 1):
+        return
+    try:
+        with transaction.atomic():
+            UserAffinity.objects.create(user_id=user_id, kind=kind, value=value, weight=1)
+    except IntegrityError:
+        # Created concurrently by another booking of the same user.
+        UserAffinity.objects.filter(user_id=user_id, kind=kind, value=value).update(weight=F('weight') + 1)
+
+
+def _bump_cooccurrence(movie_id, others):
+    existing = set(
+        MovieCooccurrence.objects.filter(movie_id=movie_id, other_id__in=others).values_list('other_id', flat=True)
+    )
+    MovieCooccurrence.objects.filter(movie_id=movie_id, other_id__in=existing).update(count=F('count') + 1)
+    MovieCooccurrence.objects.filter(movie_id__in=existing, other_id=movie_id).update(count=F('count') + 1)
+    MovieCooccurrence.objects.bulk_create(
+        [MovieCooccurrence(movie_id=a, other_id=b, count=1)
+         for other_id in set(others) - existing for a, b in ((movie_id, other_id), (other_id, movie_id))],
+        ignore_conflicts=True,
+    )
+
+
+def record_booking(booking):
+    """Fold a new booking into the aggregates and re-rank its user."""
+    movie_id, genre, director = Movie.objects.filter(showtime__id=booking.showtime_id).values_list(
+        'id', 'genre', 'director'
+    ).get()
+    recent = _recent_movies(booking.user_id)
+    first_booking = not Booking.objects.filter(
+        user_id=booking.user_id, showtime__movie_id=movie_id
+    ).exclude(pk=booking.pk).exists()
+    with transaction.atomic():
+        _bump_affinity(booking.user_id, 'genre', genre)
+        _bump_affinity(booking.user_id, 'director', director)
+        others = [other_id for other_id in recent if other_id != movie_id]
+        if first_booking and others:
+            _bump_cooccurrence(movie_id, others)
+        refresh_user(booking.user_id)
+
+
+def rebuild(batch_size=1000):
+    """Recompute affinities, co-occurrence and every user's recommendations from ``Booking``.
+
+    Returns ``(users, pairs)``: users ranked and co-occurrence rows written.
+    """
+    histories = defaultdict(list)
+    for user_id, movie_id in Booking.objects.order_by('user_id', '-booking_time', '-id').values_list(
+        'user_id', 'showtime__movie_id'
+    ).iterator(chunk_size=10000):
+        history = histories[user_id]
+        if len(history) < HISTORY_LIMIT and movie_id not in history:
+            history.append(movie_id)
+
+    cooccurrence = Counter()
+    for history in histories.values():
+        cooccurrence.update(permutations(history, 2))
+
+    affinities = defaultdict(lambda: {'genre': {}, 'director': {}})
+    for kind in ('genre', 'director'):
+        for row in Booking.objects.exclude(**{f'showtime__movie__{kind}': ''}).order_by().values(
+            'user_id', f'showtime__movie__{kind}'
+        ).annotate(weight=Count('id')):
+            affinities[row['user_id']][kind][row[f'showtime__movie__{kind}']] = row['weight']
+
+    with transaction.atomic():
+        UserAffinity.objects.all().delete()
+        _insert(UserAffinity, ['user', 'kind', 'value', 'weight'], (
+            (user_id, kind, value, weight)
+            for user_id, kinds in affinities.items() for kind, values in kinds.items()
+            for value, weight in values.items()
+        ))
+        MovieCooccurrence.objects.all().delete()
+        _insert(MovieCooccurrence, ['movie', 'other', 'count'], (
+            (movie_id, other_id, count) for (movie_id, other_id), count in cooccurrence.items()
+        ))
+
+    neighbours = defaultdict(list)
+    for (movie_id, other_id), count in cooccurrence.items():
+        neighbours[movie_id].append((count, other_id))
+    neighbours = {
+        movie_id: heapq.nlargest(NEIGHBOUR_LIMIT, pairs) for movie_id, pairs in neighbours.items()
+    }
+    movies = {
+        movie_id: (genre, director, release_date)
+        for movie_id, genre, director, release_date in Movie.objects.values_list('id', 'genre', 'director', 'release_date')
+    }
+    newest = defaultdict(list)
+    for kind, index in (('genre', 0), ('director', 1)):
+        for movie_id, meta in sorted(movies.items(), key=lambda item: (item[1][2], item[0]), reverse=True):
+            if meta[index]:
+                newest[kind, meta[index]].append(movie_id)
+
+    rankings = {}
+    for user_id, history in histories.items():
+        watched = set(history)
+        scores = Counter()
+        for movie_id in history[:RECENT_LIMIT]:
+            for count, other_id in neighbours.get(movie_id, ()):
+                if other_id not in watched:
+                    scores[other_id] += count
+        scores = dict(scores.most_common(NEIGHBOUR_LIMIT))
+        affinity = affinities[user_id]
+        candidate_ids = set(scores)
+        for genre, _ in Counter(affinity['genre']).most_common(TOP_GENRES):
+            candidate_ids.update(newest['genre', genre][:TOP_N + len(watched)])
+        for director in affinity['director']:
+            candidate_ids.update(newest['director', director][:TOP_N + len(watched)])
+        rankings[user_id] = rank_movies(
+            watched, scores, affinity['genre'], affinity['director'], {m: movies[m] for m in candidate_ids},
+        )
+        if len(rankings) >= batch_size:
+            _save_recommendations(rankings)
+            rankings = {}
+    if rankings:
+        _save_recommendations(rankings)
+    # Users without any booking left keep no stale rows.
+    Recommendation.objects.exclude(user_id__in=Booking.objects.values('user_id')).delete()
+    return len(histories), len(cooccurrence)
@@ -0,0 +1,149 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, BookedSeat, Showtime
+from .seatmap import refresh_seat_map
+from .seating import (
+    claim_seats, confirm_seats, count_booked_seats, find_expired_holds, find_taken_seats, remove_seats,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 0.05
+
+
+class SeatUnavailable(Exception):
+    pass
+
+
+class ReservationBusy(Exception):
+    """The database stayed locked through every retry; the client should try again shortly."""
+
+
+def _lock_showtime(showtime_id):
+    if connection.vendor == 'sqlite':
+        # SQLite has no row locks, and a transaction that reads first cannot wait
+        # for the write lock: upgrading fails at once with "database is locked".
+        # A write up front takes the lock at the start, waiting up to the
+        # connection's timeout like BEGIN IMMEDIATE would.
+        Showtime.objects.filter(pk=showtime_id).update(seats_sold=F('seats_sold'))
+    return Showtime.objects.select_for_update().select_related('theater').get(pk=showtime_id)
+
+
+def _reserve(user, showtime_id, seats):
+    with transaction.atomic():
+        # Locking the showtime row serialises reservations for the same show on
+        # databases with row locks; the unique (showtime, seat) constraint is the
+        # backstop everywhere else.
+        showtime = _lock_showtime(showtime_id)
+        # Lapsed holds on the requested seats are released now rather than
+        # waiting for the sweeper, so their rows do not trip the unique constraint.
+        expired = find_expired_holds(showtime, seats)
+        if expired:
+            expire_bookings(expired)
+            showtime.refresh_from_db(fields=['seats_sold', 'seats_held'])
+        available_seats = showtime.seats_available
+        if len(seats) > available_seats:
+            # The counters still include lapsed holds the sweeper has not
+            # released yet, so only trust a refusal after an exact count.
+            available_seats = showtime.theater.capacity - count_booked_seats(showtime)
+        if len(seats) > available_seats:
+            raise SeatUnavailable(f"Only {available_seats} seats are available for this showtime.")
+        taken_seats = find_taken_seats(showtime, seats)
+        if taken_seats:
+            raise SeatUnavailable(f"Seat {taken_seats[0]} is already booked.")
+        booking = Booking.objects.create(
+            user=user, showtime=showtime, num_tickets=len(seats), seats=','.join(seats)
+        )
+        expires_at = timezone.now() + timedelta(seconds=settings.SEAT_HOLD_TTL)
+        try:
+            claim_seats(booking, seats, expires_at=expires_at)
+        except IntegrityError:
+            raise SeatUnavailable("One or more selected seats have just been booked.")
+        refresh_seat_map(showtime.id)
+        return booking
+
+
+def reserve_seats(user, showtime, seats):
+    """Atomically create a booking for ``seats`` or raise ``SeatUnavailable``.
+
+    Lock timeouts and deadlocks (``OperationalError``) are retried with a short
+    jittered backoff, since the competing transaction usually commits quickly.
+    Raises ``ReservationBusy`` once the retries run out.
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return _reserve(user, showtime.pk, seats)
+        except OperationalError as e:
+            if attempt == MAX_ATTEMPTS:
+                logger.error(f"Seat reservation for showtime {showtime.pk} gave up after {attempt} attempts: {str(e)}")
+                raise ReservationBusy() from e
+            logger.warning(f"Seat reservation retry {attempt} for showtime {showtime.pk}: {str(e)}")
+            time.sleep(RETRY_BACKOFF * attempt * random.uniform(0.5, 1.5))
+
+
+def expire_bookings(booking_ids):
+    """Mark still-PENDING bookings as EXPIRED and free their seats."""
+    with transaction.atomic():
+        expired = list(
+            Booking.objects.select_for_update()
+            .filter(id__in=booking_ids, payment_status='PENDING')
+            .values_list('id', flat=True)
+        )
+        Booking.objects.filter(id__in=expired).update(payment_status='EXPIRED')
+        release_seats(expired)
+    return len(expired)
+
+
+def release_seats(booking_ids):
+    """Delete the seat rows of ``booking_ids`` and clear them from the seat maps."""
+    released = remove_seats(BookedSeat.objects.filter(booking_id__in=booking_ids))
+    for showtime_id in released:
+        refresh_seat_map(showtime_id)
+
+
+def cancel_booking(booking, payment_status):
+    """Move ``booking`` to a terminal ``payment_status`` and give its seats back."""
+    with transaction.atomic():
+        booking.payment_status = payment_status
+        booking.save(update_fields=['payment_status'])
+        release_seats([booking.id])
+
+
+def expire_holds(batch_size=500):
+    """Release every lapsed hold in batches of ``batch_size`` bookings.
+
+    Each batch is one indexed scan on ``BookedSeat.expires_at`` followed by a
+    set-based UPDATE and DELETE, so a backlog of abandoned carts never loads
+    more than ``batch_size`` bookings into memory.
+    """
+    total = 0
+    while True:
+        booking_ids = list(
+            BookedSeat.objects.filter(expires_at__lte=timezone.now())
+            .values_list('booking_id', flat=True).distinct()[:batch_size]
+        )
+        if not booking_ids:
+            return total
+        total += expire_bookings(booking_ids)
+        # Holds of bookings that already left PENDING no longer expire.
+        confirm_seats(BookedSeat.objects.filter(booking_id__in=booking_ids))
+
+
+def confirm_hold(booking):
+    """Keep the seats of ``booking`` once payment is under way."""
+    confirm_seats(BookedSeat.objects.filter(booking=booking))
+
+
+def extend_hold(booking, seconds):
+    BookedSeat.objects.filter(booking=booking, expires_at__isnull=False).update(
+        expires_at=timezone.now() + timedelta(seconds=seconds)
+    )
@@ -0,0 +1,148 @@
+"""Bulk showtime scheduling from recurrence rules.
+
+A rule puts one movie in one theater at the same times every day, or on
+some weekdays, between two dates. A showtime occupies its theater from its
+start until the movie's ``duration`` plus the cleaning buffer later.
+Candidates are checked against the theater's existing showtimes and
+against each other with a ``TheaterTimeline`` per theater. If any overlap,
+nothing is created. Otherwise all rows go in with one ``bulk_create`` in one
+transaction, and the showtime catalog cache is invalidated once.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import Movie, Showtime, Theater
+
+# Upper bound on one request, so a typo in a date range cannot generate millions of rows.
+MAX_SHOWTIMES = 50_000
+
+
+class ScheduleError(Exception):
+    """The rules refer to movies or theaters that do not exist, or generate too many showtimes."""
+
+
+class TheaterTimeline:
+    """Intervals taken in one theater, sorted by start, with bisect lookups.
+
+    Intervals may overlap each other (showtimes entered before this check
+    existed). A lookup only walks back as far as the longest interval, since
+    anything that starts earlier has ended before the new one begins.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+        self.longest = timedelta(0)
+
+    def add(self, start, end, source):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.intervals.insert(index, (start, end, source))
+        self.longest = max(self.longest, end - start)
+
+    def overlapping(self, start, end):
+        """Sources of the intervals that overlap ``[start, end)``."""
+        found = []
+        index = bisect_left(self.starts, end)
+        while index:
+            index -= 1
+            other_start, other_end, source = self.intervals[index]
+            if other_start + self.longest <= start:
+                break
+            if other_end > start:
+                found.append(source)
+        return found
+
+
+def occurrences(rule):
+    """Start times of ``rule`` in the current time zone."""
+    day = rule['start_date']
+    weekdays = set(rule.get('weekdays') or range(7))
+    while day <= rule['end_date']:
+        if day.weekday() in weekdays:
+            for time in rule['times']:
+                yield timezone.make_aware(datetime.combine(day, time))
+        day += timedelta(days=1)
+
+
+def schedule_showtimes(rules, cleaning=None, dry_run=False):
+    """Create the showtimes described by ``rules`` unless any of them overlap.
+
+    Each rule is a dict with ``movie`` and ``theater`` ids, ``start_date`` and
+    ``end_date`` (inclusive), ``times`` and optional ``weekdays`` (0 is
+    Monday). ``cleaning`` is the ``timedelta`` a theater needs between two
+    showtimes, ``SHOWTIME_CLEANING_MINUTES`` by default.
+
+    Returns ``{'showtimes': planned, 'created': created, 'conflicts': [...]}``;
+    nothing is created on a dry run or when there are conflicts. A conflict
+    names the planned showtime and what it overlaps: an existing showtime by
+    id, or another planned showtime by its rule's index.
+    """
+    if cleaning is None:
+        cleaning = timedelta(minutes=settings.SHOWTIME_CLEANING_MINUTES)
+    movie_ids = {rule['movie'] for rule in rules}
+    theater_ids = {rule['theater'] for rule in rules}
+    durations = dict(Movie.objects.filter(id__in=movie_ids).values_list('id', 'duration'))
+    missing_movies = movie_ids - durations.keys()
+    if missing_movies:
+        raise ScheduleError(f"Unknown movies: {', '.join(map(str, sorted(missing_movies)))}")
+
+    planned = []
+    for index, rule in enumerate(rules):
+        length = timedelta(minutes=durations[rule['movie']]) + cleaning
+        for start in occurrences(rule):
+            planned.append((index, rule, start, start + length))
+            if len(planned) > MAX_SHOWTIMES:
+                raise ScheduleError(f"The rules generate more than {MAX_SHOWTIMES} showtimes.")
+
+    with transaction.atomic():
+        # Concurrent schedules for the same theaters wait here rather than both passing the check.
+        found_theaters = set(Theater.objects.select_for_update().filter(id__in=theater_ids).values_list('id', flat=True))
+        missing_theaters = theater_ids - found_theaters
+        if missing_theaters:
+            raise ScheduleError(f"Unknown theaters: {', '.join(map(str, sorted(missing_theaters)))}")
+
+        timelines = {theater_id: TheaterTimeline() for theater_id in theater_ids}
+        if planned:
+            earliest = min(start for _, _, start, _ in planned)
+            latest = max(end for _, _, _, end in planned)
+            # Anything that started more than the longest movie earlier has ended by then.
+            longest = Movie.objects.aggregate(longest=Max('duration'))['longest'] or 0
+            existing = Showtime.objects.filter(
+                theater_id__in=theater_ids, date_time__lt=latest,
+                date_time__gte=earliest - timedelta(minutes=longest) - cleaning,
+            )
+            for showtime_id, theater_id, start, duration in existing.values_list(
+                'id', 'theater_id', 'date_time', F('movie__duration'),
+            ):
+                end = start + timedelta(minutes=duration) + cleaning
+                timelines[theater_id].add(start, end, {'showtime': showtime_id, 'date_time': start.isoformat()})
+
+        conflicts = []
+        for index, rule, start, end in planned:
+            timeline = timelines[rule['theater']]
+            overlaps = timeline.overlapping(start, end)
+            if overlaps:
+                conflicts.append({
+                    'rule': index, 'movie': rule['movie'], 'theater': rule['theater'],
+                    'date_time': start.isoformat(), 'overlaps': overlaps,
+                })
+            timeline.add(start, end, {'rule': index, 'date_time': start.isoformat()})
+
+        result = {'showtimes': len(planned), 'created': 0, 'conflicts': conflicts}
+        if dry_run or conflicts:
+            return result
+        Showtime.objects.bulk_create([
+            Showtime(movie_id=rule['movie'], theater_id=rule['theater'], date_time=start)
+            for _, rule, start, _ in planned
+        ], batch_size=1000)
+        # bulk_create skips the post_save signal that invalidates the catalog.
+        transaction.on_commit(lambda: bump_version('showtime'))
+        result['created'] = len(planned)
+    return result
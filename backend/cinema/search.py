@@ -0,0 +1,93 @@
+"""Full-text movie search over title, genre and director.
+
+The index is created by migration 0020: an FTS5 table on SQLite and a
+generated ``tsvector`` column on PostgreSQL. Both are maintained by the
+database itself, so every write path keeps them in sync. Other backends fall
+back to ``icontains`` scans.
+
+Every word of the query must match, and each one matches as a prefix:
+``"sost mae"`` finds "Sost Maezen". Title hits outrank genre hits, which
+outrank director hits.
+"""
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Movie
+
+MAX_TERMS = 8
+# bm25 column weights for title, genre and director.
+SQLITE_WEIGHTS = (10.0, 3.0, 2.0)
+
+
+def search_terms(query):
+    """Lower-cased words of ``query``; punctuation is dropped so it cannot reach the query syntax."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _sqlite_match(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _contains_all(terms):
+    return reduce(and_, (
+        Q(title__icontains=term) | Q(genre__icontains=term) | Q(director__icontains=term) for term in terms
+    ))
+
+
+def search_filter(query):
+    """A ``Q`` for movies matching ``query``, unranked, for filtering querysets such as the admin's.
+
+    The index is queried in a subquery, so the number of matches never
+    turns into SQL parameters.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return Q(pk__in=[])
+    if connection.vendor == 'sqlite':
+        return Q(pk__in=RawSQL("SELECT rowid FROM cinema_movie_fts WHERE cinema_movie_fts MATCH %s", [_sqlite_match(terms)]))
+    if connection.vendor == 'postgresql':
+        return Q(pk__in=RawSQL("SELECT id FROM cinema_movie WHERE search_vector @@ to_tsquery('simple', %s)", [_tsquery(terms)]))
+    return _contains_all(terms)
+
+
+def matching_ids(query, limit=20):
+    """Ids of movies matching ``query``, best match first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    limit_sql = ' LIMIT %s' if limit else ''
+    params = [limit] if limit else []
+    if connection.vendor == 'sqlite':
+        sql = (
+            "SELECT rowid FROM cinema_movie_fts WHERE cinema_movie_fts MATCH %s "
+            f"ORDER BY bm25(cinema_movie_fts, {', '.join(map(str, SQLITE_WEIGHTS))}), rowid{limit_sql}"
+        )
+        params = [_sqlite_match(terms)] + params
+    elif connection.vendor == 'postgresql':
+        sql = (
+            "SELECT id FROM cinema_movie WHERE search_vector @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank(search_vector, to_tsquery('simple', %s)) DESC, id{limit_sql}"
+        )
+        tsquery = _tsquery(terms)
+        params = [tsquery, tsquery] + params
+    else:
+        movies = Movie.objects.filter(_contains_all(terms)).order_by('title').values_list('id', flat=True)
+        return list(movies[:limit] if limit else movies)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_movies(query, limit=20):
+    ids = matching_ids(query, limit)
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
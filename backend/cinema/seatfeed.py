@@ -0,0 +1,180 @@
+"""Seat-state events per showtime, published as seats change.
+
+``cinema.seating`` publishes an event once the surrounding transaction commits:
+
+* ``held`` when a pending booking claims seats,
+* ``sold`` when a hold is confirmed or seats are sold outright,
+* ``free`` when a booking expires, is cancelled or loses seats.
+
+Brokers fan events out to the subscribers of their own process (see
+``cinema.seatstream``). ``LocalBroker`` only sees events published in that
+process. ``CacheBroker`` carries them through the shared cache as well, so
+holds released by the ``expire_holds`` sweeper reach every web worker. It
+numbers events with ``cache.add`` and ``cache.incr``, which only Redis,
+memcached and the in-process ``LocMemCache`` perform atomically; on other
+backends two publishers could take the same number and one event would be
+lost without a resync, so ``CacheBroker`` refuses to start there.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+QUEUE_SIZE = 100
+POLL_INTERVAL = 0.5
+EVENT_TIMEOUT = 60
+# Sent in place of events a subscriber missed, either because it fell more
+# than QUEUE_SIZE events behind or because the cache lost them; the stream
+# answers it with a fresh snapshot.
+RESYNC = {'type': 'resync'}
+# Backends whose add and incr are atomic, as CacheBroker's sequence numbers need.
+ATOMIC_CACHES = (RedisCache, BaseMemcachedCache, LocMemCache)
+
+
+def _enqueue(queue, event):
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        event = RESYNC
+    queue.put_nowait(event)
+
+
+class LocalBroker:
+    """In-process pub/sub. ``publish`` may be called from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, showtime_id, event):
+        self._deliver(showtime_id, event)
+
+    def _deliver(self, showtime_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(showtime_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_enqueue, queue, event)
+
+    def subscriber_count(self, showtime_id=None):
+        with self._lock:
+            if showtime_id is not None:
+                return len(self._subscribers.get(showtime_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    @asynccontextmanager
+    async def subscribe(self, showtime_id):
+        """Yield a queue that receives the events of ``showtime_id`` until the block exits."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[showtime_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[showtime_id].discard(subscriber)
+                if not self._subscribers[showtime_id]:
+                    del self._subscribers[showtime_id]
+
+
+def sequence_key(showtime_id):
+    return f'seatfeed:{showtime_id}'
+
+
+def event_key(showtime_id, sequence):
+    return f'seatfeed:{showtime_id}:{sequence}'
+
+
+class CacheBroker(LocalBroker):
+    """Carries events between processes as a per-showtime log in the cache.
+
+    Each process polls the logs of the showtimes it has subscribers for, so
+    the cost is one cache read per active showtime every ``POLL_INTERVAL``,
+    however many clients are listening.
+    """
+
+    def __init__(self):
+        backend = caches[DEFAULT_CACHE_ALIAS]
+        if not isinstance(backend, ATOMIC_CACHES):
+            raise ImproperlyConfigured(
+                f'CacheBroker needs a cache with atomic increments (Redis or memcached), '
+                f'not {type(backend).__name__}; use cinema.seatfeed.LocalBroker instead.'
+            )
+        super().__init__()
+        self._pollers = {}
+
+    def publish(self, showtime_id, event):
+        cache.add(sequence_key(showtime_id), 0, None)
+        try:
+            sequence = cache.incr(sequence_key(showtime_id))
+        except ValueError:
+            # Evicted between add and incr; pollers resync on the restarted log.
+            sequence = 1
+            cache.set(sequence_key(showtime_id), sequence, None)
+        cache.set(event_key(showtime_id, sequence), event, EVENT_TIMEOUT)
+
+    async def _poll(self, showtime_id, last):
+        get = sync_to_async(cache.get, thread_sensitive=False)
+        get_many = sync_to_async(cache.get_many, thread_sensitive=False)
+        pending = None
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            latest = await get(sequence_key(showtime_id), 0)
+            if latest < last:
+                self._deliver(showtime_id, RESYNC)
+                last = latest
+                continue
+            keys = {event_key(showtime_id, sequence): sequence for sequence in range(last + 1, latest + 1)}
+            events = await get_many(list(keys)) if keys else {}
+            for key, sequence in keys.items():
+                event = events.get(key)
+                if event is None:
+                    # The publisher may not have stored it yet; give it one more poll.
+                    if pending != sequence:
+                        pending = sequence
+                        break
+                    event = RESYNC
+                self._deliver(showtime_id, event)
+                last = sequence
+
+    @asynccontextmanager
+    async def subscribe(self, showtime_id):
+        if showtime_id not in self._pollers:
+            last = await sync_to_async(cache.get, thread_sensitive=False)(sequence_key(showtime_id), 0)
+            if showtime_id not in self._pollers:
+                self._pollers[showtime_id] = asyncio.create_task(self._poll(showtime_id, last))
+        try:
+            async with super().subscribe(showtime_id) as queue:
+                yield queue
+        finally:
+            if not self.subscriber_count(showtime_id) and showtime_id in self._pollers:
+                self._pollers.pop(showtime_id).cancel()
+
+
+_broker = None
+_broker_path = None
+
+
+def get_broker():
+    """Process-wide broker named by ``settings.SEAT_FEED_BROKER``."""
+    global _broker, _broker_path
+    if _broker is None or _broker_path != settings.SEAT_FEED_BROKER:
+        _broker = import_string(settings.SEAT_FEED_BROKER)()
+        _broker_path = settings.SEAT_FEED_BROKER
+    return _broker
+
+
+def publish(showtime_id, state, seats):
+    """Broadcast that ``seats`` of a showtime became ``state`` once the transaction commits."""
+    if seats:
+        event = {'type': state, 'seats': list(seats)}
+        transaction.on_commit(lambda: get_broker().publish(showtime_id, event))
@@ -0,0 +1,191 @@
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import BookedSeat, Showtime
+from .seatfeed import publish
+
+SEAT_LABEL_RE = re.compile(r'^([A-Z]+)([1-9][0-9]*)$')
+# Booking statuses whose seats stay taken.
+ACTIVE_STATUSES = ('PENDING', 'PENDING_APPROVAL', 'COMPLETED')
+
+
+def parse_seats(value):
+    """Split a comma-separated seat string into clean seat labels."""
+    if not value:
+        return []
+    return [seat.strip() for seat in value.split(',') if seat.strip()]
+
+
+def row_label(row):
+    """Spreadsheet-style letters for a zero-based row: A..Z, AA, AB, ..."""
+    letters = ''
+    row += 1
+    while row:
+        row, remainder = divmod(row - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def seat_label(row, column):
+    """Label of a zero-based (row, column) position, e.g. ``(0, 0)`` is ``A1``."""
+    return f"{row_label(row)}{column + 1}"
+
+
+def parse_seat_label(label):
+    """Inverse of ``seat_label``; returns ``None`` for labels that do not parse."""
+    match = SEAT_LABEL_RE.match(label)
+    if not match:
+        return None
+    row = 0
+    for letter in match.group(1):
+        row = row * 26 + ord(letter) - ord('A') + 1
+    return row - 1, int(match.group(2)) - 1
+
+
+def active_seats(showtime):
+    """Seat rows that still block the seat: paid seats and unexpired holds."""
+    return BookedSeat.objects.filter(showtime=showtime).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+    )
+
+
+def booked_seat_labels(showtime):
+    return list(active_seats(showtime).values_list('seat', flat=True))
+
+
+def count_booked_seats(showtime):
+    return active_seats(showtime).count()
+
+
+def find_taken_seats(showtime, seats):
+    """Return the subset of ``seats`` already claimed for ``showtime``."""
+    return list(active_seats(showtime).filter(seat__in=seats).values_list('seat', flat=True))
+
+
+def find_expired_holds(showtime, seats):
+    """Return the ids of bookings whose lapsed holds still occupy any of ``seats``."""
+    return list(
+        BookedSeat.objects.filter(showtime=showtime, seat__in=seats, expires_at__lte=timezone.now())
+        .values_list('booking_id', flat=True).distinct()
+    )
+
+
+def update_seat_counters(sold=None, held=None):
+    """Add per-showtime deltas (``{showtime_id: n}``) to the availability counters.
+
+    All showtimes are updated by one UPDATE relative to the stored values, so
+    concurrent writers never overwrite each other's changes.
+    """
+    def delta(changes):
+        whens = [When(pk=showtime_id, then=Value(n)) for showtime_id, n in (changes or {}).items() if n]
+        return Case(*whens, default=Value(0)) if whens else Value(0)
+
+    showtime_ids = {pk for changes in (sold, held) for pk, n in (changes or {}).items() if n}
+    if showtime_ids:
+        Showtime.objects.filter(pk__in=showtime_ids).update(
+            seats_sold=F('seats_sold') + delta(sold), seats_held=F('seats_held') + delta(held),
+        )
+        # Cached showtime listings carry the counters.
+        transaction.on_commit(lambda: bump_version('availability'))
+
+
+def remove_seats(seats):
+    """Delete the BookedSeat rows in ``seats`` and take them off the counters.
+
+    Returns ``{showtime_id: [seat, ...]}`` of the rows removed.
+    """
+    removed = {}
+    sold, held = Counter(), Counter()
+    with transaction.atomic(savepoint=False):
+        # Locking the rows first keeps two releases of the same seats from both counting them.
+        for showtime_id, seat, expires_at in seats.select_for_update().values_list('showtime_id', 'seat', 'expires_at'):
+            removed.setdefault(showtime_id, []).append(seat)
+            (held if expires_at else sold)[showtime_id] -= 1
+        seats.delete()
+        update_seat_counters(sold, held)
+    for showtime_id, labels in removed.items():
+        publish(showtime_id, 'free', labels)
+    return removed
+
+
+def confirm_seats(seats):
+    """Turn the pending holds among the BookedSeat rows in ``seats`` into sold seats."""
+    confirmed = {}
+    with transaction.atomic(savepoint=False):
+        for showtime_id, seat in seats.filter(expires_at__isnull=False).select_for_update().values_list('showtime_id', 'seat'):
+            confirmed.setdefault(showtime_id, []).append(seat)
+        held = Counter({showtime_id: len(labels) for showtime_id, labels in confirmed.items()})
+        seats.filter(expires_at__isnull=False).update(expires_at=None)
+        update_seat_counters(sold=held, held={showtime_id: -n for showtime_id, n in held.items()})
+    for showtime_id, labels in confirmed.items():
+        publish(showtime_id, 'sold', labels)
+
+
+def claim_seats(booking, seats, expires_at=None):
+    """Insert one inventory row per seat.
+
+    Raises ``IntegrityError`` when another booking already holds one of the
+    seats, so callers must run this inside a transaction.
+    """
+    BookedSeat.objects.bulk_create(
+        [BookedSeat(showtime_id=booking.showtime_id, booking=booking, seat=seat, expires_at=expires_at)
+         for seat in seats]
+    )
+    if expires_at:
+        update_seat_counters(held={booking.showtime_id: len(seats)})
+    else:
+        update_seat_counters(sold={booking.showtime_id: len(seats)})
+    publish(booking.showtime_id, 'held' if expires_at else 'sold', seats)
+
+
+def sync_booked_seats(booking):
+    """Rebuild the inventory rows of ``booking`` from its ``seats`` string.
+
+    Bookings outside ``ACTIVE_STATUSES`` only lose their rows. A PENDING
+    booking keeps the expiry of its current hold, or gets a fresh one.
+    """
+    expires_at = None
+    if booking.payment_status == 'PENDING':
+        expires_at = (
+            BookedSeat.objects.filter(booking=booking, expires_at__isnull=False)
+            .values_list('expires_at', flat=True).first()
+            or timezone.now() + timedelta(seconds=settings.SEAT_HOLD_TTL)
+        )
+    remove_seats(BookedSeat.objects.filter(booking=booking))
+    if booking.payment_status in ACTIVE_STATUSES:
+        claim_seats(booking, parse_seats(booking.seats), expires_at=expires_at)
+
+
+def recount_seats(showtime_ids):
+    """Recompute the counters of ``showtime_ids`` from their BookedSeat rows.
+
+    Returns ``[(showtime_id, (stored_sold, stored_held), (sold, held)), ...]``
+    for the showtimes whose counters had drifted and were corrected.
+    """
+    with transaction.atomic():
+        showtimes = list(Showtime.objects.select_for_update().filter(pk__in=showtime_ids).only('seats_sold', 'seats_held'))
+        counts = {
+            row['showtime_id']: (row['sold'], row['held'])
+            for row in BookedSeat.objects.filter(showtime_id__in=showtime_ids).order_by().values('showtime_id').annotate(
+                sold=Count('id', filter=Q(expires_at__isnull=True)),
+                held=Count('id', filter=Q(expires_at__isnull=False)),
+            )
+        }
+        drifted, corrected = [], []
+        for showtime in showtimes:
+            stored, actual = (showtime.seats_sold, showtime.seats_held), counts.get(showtime.id, (0, 0))
+            if stored != actual:
+                drifted.append((showtime.id, stored, actual))
+                showtime.seats_sold, showtime.seats_held = actual
+                corrected.append(showtime)
+        Showtime.objects.bulk_update(corrected, ['seats_sold', 'seats_held'])
+        if corrected:
+            transaction.on_commit(lambda: bump_version('availability'))
+    return drifted
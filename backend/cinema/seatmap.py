@@ -0,0 +1,168 @@
+"""Per-showtime seat occupancy bitmaps kept in the Django cache.
+
+Bit ``row * columns + column`` is set when that seat is booked or held. Labels
+that fall outside the theater grid (legacy free-form seats) are kept verbatim
+in ``extra`` so nothing booked ever disappears from the map.
+
+Bookings never edit a cached map in place: two workers doing a read, change
+and write at once would each drop the other's seats. A change instead gives
+the showtime a new version once its transaction commits, and the next read
+rebuilds the map from the database. The reader notes the version before it
+queries, so a map built from rows read before a change is tagged with the
+old version and rebuilt again on the following read.
+"""
+import base64
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Showtime
+from .seatfeed import RESYNC, get_broker
+from .seating import active_seats, parse_seat_label, seat_label
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def cache_key(showtime_id):
+    return f'seatmap:{showtime_id}'
+
+
+def version_key(showtime_id):
+    return f'seatmap-version:{showtime_id}'
+
+
+class SeatMap:
+    def __init__(self, rows, columns, bits=None, extra=None, next_expiry=None):
+        self.rows = rows
+        self.columns = columns
+        self.bits = bytearray(bits) if bits is not None else bytearray((rows * columns + 7) // 8)
+        self.extra = set(extra or ())
+        self.next_expiry = next_expiry
+
+    def _index(self, seat):
+        position = parse_seat_label(seat)
+        if position is None:
+            return None
+        row, column = position
+        if row >= self.rows or column >= self.columns:
+            return None
+        return row * self.columns + column
+
+    def mark(self, seat, booked=True):
+        index = self._index(seat)
+        if index is None:
+            if booked:
+                self.extra.add(seat)
+            else:
+                self.extra.discard(seat)
+        elif booked:
+            self.bits[index // 8] |= 1 << (index % 8)
+        else:
+            self.bits[index // 8] &= ~(1 << (index % 8)) & 0xFF
+
+    def expire_at(self, expires_at):
+        if expires_at is not None:
+            timestamp = expires_at.timestamp()
+            if self.next_expiry is None or timestamp < self.next_expiry:
+                self.next_expiry = timestamp
+
+    def is_stale(self):
+        return self.next_expiry is not None and time.time() >= self.next_expiry
+
+    def labels(self):
+        labels = []
+        for byte_index, byte in enumerate(self.bits):
+            # Empty bytes are skipped whole, so a sparse map decodes quickly.
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    index = byte_index * 8 + bit
+                    labels.append(seat_label(index // self.columns, index % self.columns))
+        return labels + sorted(self.extra)
+
+    def encode(self):
+        return base64.b64encode(bytes(self.bits)).decode('ascii')
+
+    def to_cache(self):
+        return {
+            'rows': self.rows, 'columns': self.columns, 'bits': bytes(self.bits),
+            'extra': sorted(self.extra), 'next_expiry': self.next_expiry,
+        }
+
+    @classmethod
+    def from_cache(cls, value):
+        return cls(**value)
+
+
+def _fill(showtime, seats):
+    seat_map = SeatMap(showtime.theater.rows, showtime.theater.columns)
+    for seat, expires_at in seats:
+        seat_map.mark(seat)
+        seat_map.expire_at(expires_at)
+    return seat_map
+
+
+def _cached(values, showtime_id):
+    """The cached map if it is current, and the version a rebuild should be tagged with."""
+    version = values.get(version_key(showtime_id), 0)
+    value = values.get(cache_key(showtime_id))
+    if value is not None and value.get('version') == version:
+        seat_map = SeatMap.from_cache(value['map'])
+        if not seat_map.is_stale():
+            return seat_map, version
+    return None, version
+
+
+def _store(showtime_id, seat_map, version):
+    return cache_key(showtime_id), {'version': version, 'map': seat_map.to_cache()}, CACHE_TIMEOUT
+
+
+def build_seat_map(showtime, version=0):
+    seat_map = _fill(showtime, active_seats(showtime).values_list('seat', 'expires_at'))
+    cache.set(*_store(showtime.id, seat_map, version))
+    return seat_map
+
+
+def get_seat_map(showtime_id):
+    """Return the cached seat map, rebuilding it on a miss, after a change or once a hold lapses.
+
+    Raises ``Showtime.DoesNotExist`` when the map has to be rebuilt for an
+    unknown showtime.
+    """
+    seat_map, version = _cached(cache.get_many([cache_key(showtime_id), version_key(showtime_id)]), showtime_id)
+    if seat_map is not None:
+        return seat_map
+    return build_seat_map(Showtime.objects.select_related('theater').get(pk=showtime_id), version)
+
+
+async def aget_seat_map(showtime_id):
+    """Async ``get_seat_map``, for the ASGI views."""
+    values = await cache.aget_many([cache_key(showtime_id), version_key(showtime_id)])
+    seat_map, version = _cached(values, showtime_id)
+    if seat_map is not None:
+        return seat_map
+    showtime = await Showtime.objects.select_related('theater').aget(pk=showtime_id)
+    seat_map = _fill(showtime, [row async for row in active_seats(showtime).values_list('seat', 'expires_at')])
+    await cache.aset(*_store(showtime.id, seat_map, version))
+    return seat_map
+
+
+def _bump(showtime_id):
+    # Any fresh value will do, so concurrent bumps need no atomic increment.
+    cache.set(version_key(showtime_id), uuid.uuid4().hex, None)
+
+
+def refresh_seat_map(showtime_id):
+    """Have the next read rebuild the map once the surrounding transaction commits."""
+    transaction.on_commit(lambda: _bump(showtime_id))
+
+
+def invalidate_seat_map(showtime_id):
+    def invalidate():
+        _bump(showtime_id)
+        # Live subscribers reload the rebuilt map instead of applying deltas.
+        get_broker().publish(showtime_id, RESYNC)
+    transaction.on_commit(invalidate)
@@ -0,0 +1,107 @@
+"""Server-Sent Events stream of a showtime's seat map, mounted by ``eliana.asgi``.
+
+``GET /api/showtimes/<id>/seats/stream/`` opens with a ``snapshot`` event
+listing every taken seat, then relays ``held``, ``sold`` and ``free`` deltas
+from ``cinema.seatfeed``. A resync from the broker is answered with a fresh
+snapshot.
+
+This is a plain ASGI application rather than a Django view. Django 4.2 does
+not notice when a client goes away in the middle of a streaming response,
+so a view would keep every closed stream alive. Here each subscriber is one
+coroutine waiting on a queue and on ``http.disconnect``, and an idle worker
+can hold thousands of them.
+"""
+import asyncio
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Showtime
+from .seatfeed import get_broker
+from .seatmap import get_seat_map
+
+PATH_RE = re.compile(r'^/api/showtimes/(?P<showtime_id>[0-9]+)/seats/stream/$')
+# Comment lines keep proxies from closing idle streams.
+HEARTBEAT = 20
+RETRY_MS = 3000
+
+
+def format_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+def _taken_seats(showtime_id):
+    try:
+        return get_seat_map(showtime_id).labels()
+    finally:
+        close_old_connections()
+
+
+async def snapshot(showtime_id):
+    return format_event('snapshot', {'seats': await sync_to_async(_taken_seats)(showtime_id)})
+
+
+def response_headers(scope):
+    headers = [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        # Stops nginx from buffering the stream.
+        (b'x-accel-buffering', b'no'),
+    ]
+    # CorsMiddleware does not see this app, so EventSource needs the header from here.
+    origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        headers += [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'origin')]
+    return headers
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def seat_stream(scope, receive, send):
+    showtime_id = int(PATH_RE.match(scope['path'])['showtime_id'])
+    if scope['method'] != 'GET':
+        await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    # Subscribing before the snapshot is read means no delta can fall in between.
+    async with get_broker().subscribe(showtime_id) as queue:
+        try:
+            first = await snapshot(showtime_id)
+        except Showtime.DoesNotExist:
+            await send({'type': 'http.response.start', 'status': 404,
+                        'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': b'{"detail": "Not found."}'})
+            return
+        await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers(scope)})
+        await send({'type': 'http.response.body', 'body': f'retry: {RETRY_MS}\n\n'.encode() + first,
+                    'more_body': True})
+
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, disconnected}, timeout=HEARTBEAT, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    getter.cancel()
+                    return
+                if getter in done:
+                    event = getter.result()
+                    if event['type'] == 'resync':
+                        chunk = await snapshot(showtime_id)
+                    else:
+                        chunk = format_event(event['type'], {'seats': event['seats']})
+                else:
+                    getter.cancel()
+                    chunk = b': keepalive\n\n'
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            disconnected.cancel()
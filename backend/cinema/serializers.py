@@ -1,32 +1,123 @@
-from rest_framework import serializers
-from .models import Movie, Theater, Showtime, Booking, Payment
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from .models import Movie, Theater, Showtime, Booking, Payment, ProofUpload
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import transaction
+from .accounts import register_user
+from .reservations import ReservationBusy, SeatUnavailable, reserve_seats
+from .metrics import timed
+from .seating import parse_seats
+from .uploads import SIGNATURES, max_proof_size
 
-class MovieSerializer(serializers.ModelSerializer):
+class BookingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many bookings are being made for this showtime; please try again.'
+    default_code = 'booking_busy'
+
+class DynamicFieldsMixin:
+    """Trim the output of a top-level serializer to the request's ``?fields=a,b``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        fields = request.query_params.get('fields')
+        if fields:
+            requested = {name.strip() for name in fields.split(',')}
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+class TimedSerializerMixin:
+    """Count the time spent rendering rows towards the request's serializer time."""
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+class MovieSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
        class Meta:
            model = Movie
            fields = '__all__'
 
-class TheaterSerializer(serializers.ModelSerializer):
+class TheaterSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
        class Meta:
            model = Theater
            fields = '__all__'
 
-class ShowtimeSerializer(serializers.ModelSerializer):
+class ShowtimeSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
        movie = MovieSerializer(read_only=True)
        theater = TheaterSerializer(read_only=True)
+       seats_available = serializers.ReadOnlyField()
+       selling_fast = serializers.ReadOnlyField()
 
        class Meta:
            model = Showtime
            fields = '__all__'
+           read_only_fields = ['seats_sold', 'seats_held']
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = '__all__'
+        # Approval only goes through the review endpoints, never a plain update.
+        read_only_fields = ['is_approved', 'thumbnail', 'content_hash', 'processed_at']
+
+    def validate_booking(self, booking):
+        # A proof holds the booking's seats for review, so only its owner may submit one.
+        if booking.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("You can only upload proofs for your own bookings.")
+        return booking
 
-class BookingSerializer(serializers.ModelSerializer):
+class PaymentReviewSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=1000)
+    decision = serializers.ChoiceField(choices=['approve', 'reject'])
+
+class ScheduleRuleSerializer(serializers.Serializer):
+    movie = serializers.IntegerField()
+    theater = serializers.IntegerField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    times = serializers.ListField(child=serializers.TimeField(), min_length=1, max_length=48)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), required=False, max_length=7,
+    )
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        return data
+
+class ShowtimeScheduleSerializer(serializers.Serializer):
+    """Recurrence rules for ``cinema.scheduling.schedule_showtimes``."""
+    rules = ScheduleRuleSerializer(many=True, allow_empty=False)
+    cleaning_minutes = serializers.IntegerField(min_value=0, required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+class ProofUploadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ProofUpload
+        fields = ['id', 'booking', 'content_type', 'size', 'received', 'created_at']
+        read_only_fields = ['received', 'created_at']
+
+    def validate_booking(self, booking):
+        if booking.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("You can only upload proofs for your own bookings.")
+        if Payment.objects.filter(booking=booking).exists():
+            raise serializers.ValidationError("A payment proof was already submitted for this booking.")
+        return booking
+
+    def validate_content_type(self, value):
+        if value not in SIGNATURES:
+            raise serializers.ValidationError(f"Must be one of: {', '.join(SIGNATURES)}.")
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= max_proof_size():
+            raise serializers.ValidationError(f"Must be between 1 and {max_proof_size()} bytes.")
+        return value
+
+class BookingSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
        showtime = ShowtimeSerializer(read_only=True)
        showtime_id = serializers.PrimaryKeyRelatedField(
            queryset=Showtime.objects.all(), source='showtime', write_only=True
@@ -38,62 +129,69 @@ class BookingSerializer(serializers.ModelSerializer):
            fields = ['id', 'showtime', 'showtime_id', 'num_tickets', 'booking_time', 'seats', 'payment_status', 'transaction_id', 'payment']
 
        def validate(self, data):
-           showtime = data.get('showtime')
            num_tickets = data.get('num_tickets')
-           seats = data.get('seats', '').split(',') if data.get('seats') else []
+           seats = parse_seats(data.get('seats'))
 
-           try:
-               if len(seats) != num_tickets:
-                   raise serializers.ValidationError(
-                       f"Number of seats ({len(seats)}) must match number of tickets ({num_tickets})."
-                   )
-               total_booked = Booking.objects.filter(showtime=showtime).aggregate(
-                   total=models.Sum('num_tickets')
-               )['total'] or 0
-               available_seats = showtime.theater.capacity - total_booked
-               if num_tickets > available_seats:
-                   raise serializers.ValidationError(
-                       f"Only {available_seats} seats are available for this showtime."
-                   )
-               booked_seats = Booking.objects.filter(showtime=showtime).values_list('seats', flat=True)
-               booked_seats = [seat for booking_seats in booked_seats for seat in booking_seats.split(',') if booking_seats]
-               for seat in seats:
-                   if seat in booked_seats:
-                       raise serializers.ValidationError(f"Seat {seat} is already booked.")
-           except Exception as e:
-               raise serializers.ValidationError(f"Validation failed: {str(e)}")
+           if not seats:
+               raise serializers.ValidationError("Select at least one seat.")
+           if len(seats) != num_tickets:
+               raise serializers.ValidationError(
+                   f"Number of seats ({len(seats)}) must match number of tickets ({num_tickets})."
+               )
+           if len(set(seats)) != len(seats):
+               raise serializers.ValidationError("Each seat can only be selected once.")
 
+           data['seats'] = ','.join(seats)
            return data
 
-class UserSerializer(serializers.ModelSerializer):
-       bookings = BookingSerializer(many=True, read_only=True, source='booking_set')
-       phone = serializers.CharField(max_length=15, required=False, allow_blank=True)
+       def create(self, validated_data):
+           # Availability is checked by the reservation service under a lock, not
+           # here, so two concurrent requests cannot both pass validation.
+           try:
+               return reserve_seats(
+                   validated_data['user'], validated_data['showtime'], parse_seats(validated_data['seats'])
+               )
+           except SeatUnavailable as e:
+               raise serializers.ValidationError(str(e))
+           except ReservationBusy:
+               raise BookingBusy()
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+       phone = serializers.CharField(source='profile.phone', max_length=15, required=False, allow_blank=True)
 
        class Meta:
            model = User
-           fields = ['id', 'username', 'email', 'phone', 'password', 'bookings']
+           fields = ['id', 'username', 'email', 'phone', 'password']
            extra_kwargs = {
                'password': {'write_only': True},
            }
 
        def create(self, validated_data):
-           user = User.objects.create_user(
+           return register_user(
                username=validated_data['username'],
                email=validated_data.get('email', ''),
-               password=validated_data['password']
+               password=validated_data['password'],
+               phone=validated_data.get('profile', {}).get('phone', ''),
            )
-           user.profile.phone = validated_data.get('phone', '')
-           user.profile.save()
-           return user
 
        def update(self, instance, validated_data):
            instance.email = validated_data.get('email', instance.email)
-           instance.profile.phone = validated_data.get('phone', instance.profile.phone)
-           instance.save()
-           instance.profile.save()
+           phone = validated_data.get('profile', {}).get('phone')
+           with transaction.atomic():
+               instance.save()
+               if phone is not None and phone != instance.profile.phone:
+                   instance.profile.phone = phone
+                   instance.profile.save(update_fields=['phone'])
            return instance
 
        def validate_email(self, value):
            if User.objects.exclude(pk=self.instance.pk if self.instance else None).filter(email=value).exists():
                raise serializers.ValidationError("This email is already in use.")
-           return value
\ No newline at end of file
+           return value
+
+class UserProfileSerializer(DynamicFieldsMixin, UserSerializer):
+    """The signed-in user without credentials; bookings live at ``users/me/bookings/``."""
+
+    class Meta(UserSerializer.Meta):
+        fields = ['id', 'username', 'email', 'phone']
+        read_only_fields = ['username']
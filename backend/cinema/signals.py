@@ -1,16 +1,52 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import UserProfile, Booking, Movie, Theater, Showtime
+from .authentication import invalidate_user
+from .cache import bump_version
+from .seatmap import invalidate_seat_map
+from .seating import recount_seats
+from .recommendations import record_booking
+
+logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
+       # The profile is written once, with the user; later user saves leave it alone (see cinema.accounts).
        if created:
-           UserProfile.objects.create(user=instance)
+           UserProfile.objects.create(user=instance, phone=getattr(instance, 'profile_phone', ''))
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    try:
-        instance.profile.save()
-    except UserProfile.DoesNotExist:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk if sender is User else instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+@receiver(post_save, sender=Booking)
+def update_recommendations(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    def update():
+        try:
+            record_booking(instance)
+        except Exception as e:
+            # Recommendations are best effort; the nightly rebuild catches up.
+            logger.error(f"Recommendation update failed for booking {instance.id}: {str(e)}", exc_info=True)
+
+    transaction.on_commit(update)
+
+@receiver(post_delete, sender=Booking)
+def release_deleted_booking_seats(sender, instance, **kwargs):
+    invalidate_seat_map(instance.showtime_id)
+    # The seat rows went with the booking through the cascade, bypassing the counters.
+    recount_seats([instance.showtime_id])
+
+@receiver([post_save, post_delete], sender=Movie)
+@receiver([post_save, post_delete], sender=Theater)
+@receiver([post_save, post_delete], sender=Showtime)
+def invalidate_catalog(sender, **kwargs):
+    bump_version(sender._meta.model_name)
@@ -0,0 +1,151 @@
+"""Telebirr payment gateway client.
+
+One ``requests.Session`` per process keeps TLS connections to the gateway
+alive between checkouts. Every call has strict connect/read timeouts and a
+bounded number of retries, so a slow gateway can hold a worker for at most
+``(MAX_RETRIES + 1) * (CONNECT_TIMEOUT + READ_TIMEOUT)`` plus backoff.
+Retrying a POST is safe here because Telebirr deduplicates orders on
+``outTradeNo``.
+
+``acreate_order`` is the asyncio counterpart used by the ASGI views; it
+needs the optional ``httpx`` package.
+"""
+import asyncio
+import base64
+import json
+import logging
+import time
+import uuid
+import weakref
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import outbound
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (502, 503, 504)
+PRICE_PER_TICKET = 100  # ETB
+
+
+class TelebirrError(Exception):
+    """The gateway answered but refused the order."""
+
+
+class TelebirrUnavailable(TelebirrError):
+    """The gateway could not be reached in time."""
+
+
+def build_order(booking):
+    """Return ``(out_trade_no, body)`` for a checkout of ``booking``."""
+    config = settings.TELEBIRR_CONFIG
+    out_trade_no = uuid.uuid4().hex
+    data = {
+        'appId': config['APP_ID'],
+        'outTradeNo': out_trade_no,
+        'subject': f'Booking {booking.id} for {booking.showtime.movie.title}',
+        'totalAmount': str(booking.num_tickets * PRICE_PER_TICKET),
+        'shortCode': config['SHORT_CODE'],
+        'notifyUrl': config['NOTIFY_URL'],
+        'returnUrl': config['RETURN_URL'],
+        'receiveName': 'Eliana Cinema',
+        'timeoutExpress': str(config['ORDER_TIMEOUT']),
+        'nonce': uuid.uuid4().hex,
+        'timestamp': str(int(time.time() * 1000)),
+    }
+    signature = base64.b64encode(json.dumps(data).encode()).decode('utf-8')
+    return out_trade_no, {'data': data, 'sign': signature}
+
+
+def _parse(status_code, text, payload):
+    if status_code in RETRY_STATUSES:
+        logger.error(f"Telebirr unavailable ({status_code}): {text}")
+        raise TelebirrUnavailable('Payment gateway unavailable')
+    if status_code != 200:
+        logger.error(f"Telebirr API error: {text}")
+        raise TelebirrError('Failed to initiate payment')
+    if payload.get('code') == '0':
+        return payload['data']['toPayUrl']
+    logger.error(f"Telebirr invalid response: {payload}")
+    raise TelebirrError(payload.get('msg', 'Invalid response'))
+
+
+class TelebirrClient:
+    def __init__(self, api_url, connect_timeout, read_timeout, max_retries, backoff_factor=0.5, pool_size=10):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = requests.Session()
+        retry = Retry(
+            total=max_retries, connect=max_retries, read=max_retries, status=max_retries,
+            backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['POST']), raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def create_order(self, body):
+        """Submit an order and return the ``toPayUrl`` the customer is sent to."""
+        try:
+            with outbound('telebirr'):
+                response = self.session.post(self.api_url, json=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"Telebirr unreachable: {str(e)}")
+            raise TelebirrUnavailable('Payment gateway unavailable')
+        return _parse(response.status_code, response.text, response.json() if response.status_code == 200 else {})
+
+    def _async_client(self):
+        # An httpx client is bound to the event loop it was first used on.
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]))
+            self._async_clients[loop] = client
+        return client
+
+    async def acreate_order(self, body):
+        if httpx is None:
+            raise ImproperlyConfigured('The async Telebirr client requires the httpx package.')
+        client = self._async_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with outbound('telebirr'):
+                    response = await client.post(self.api_url, json=body)
+            except httpx.HTTPError as e:
+                logger.error(f"Telebirr unreachable: {str(e)}")
+                if attempt == self.max_retries:
+                    raise TelebirrUnavailable('Payment gateway unavailable')
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return _parse(
+                        response.status_code, response.text,
+                        response.json() if response.status_code == 200 else {},
+                    )
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+
+_client = None
+_client_config = None
+
+
+def get_client():
+    """Process-wide client, so every checkout shares one connection pool."""
+    global _client, _client_config
+    config = settings.TELEBIRR_CONFIG
+    client_config = (config['API_URL'], config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'], config['MAX_RETRIES'])
+    if _client is None or _client_config != client_config:
+        _client = TelebirrClient(*client_config)
+        _client_config = client_config
+    return _client
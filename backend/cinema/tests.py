@@ -1,3 +1,1357 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, transaction
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import async_views, metrics
+from .accounts import import_users
+from .authentication import load_user
+from .scheduling import TheaterTimeline
+from .benchmarks import data as bench_data, funnel as bench_funnel, results as bench_results
+from .models import Movie, Theater, Showtime, Booking, BookedSeat, Payment, ProofUpload, TelebirrNotification
+from .payments import process_notifications
+from .proofs import process_pending_proofs
+from .recommendations import rebuild as rebuild_recommendations
+from .seating import booked_seat_labels
+from .reservations import SeatUnavailable, cancel_booking, confirm_hold, expire_bookings, expire_holds, reserve_seats
+from .seatfeed import CacheBroker, get_broker, sequence_key
+from .seatmap import _fill, _store, get_seat_map
+from .telebirr import TelebirrClient, build_order
+from eliana.asgi import application as asgi_application
+
+
+def create_showtime(capacity=150, rows=10, columns=15, **kwargs):
+    movie = Movie.objects.create(
+        title=kwargs.pop('title', 'Sost Maezen'), genre=kwargs.pop('genre', 'Drama'), duration=120,
+        poster='https://example.com/poster.jpg', release_date=date(2025, 1, 1),
+        director=kwargs.pop('director', ''),
+    )
+    theater = Theater.objects.create(name='Hall 1', capacity=capacity, rows=rows, columns=columns)
+    return Showtime.objects.create(
+        movie=movie, theater=theater,
+        date_time=kwargs.pop('date_time', timezone.now() + timedelta(days=1)),
+    )
+
+
+class SeatInventoryTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user(username='abebe', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, seats):
+        return self.client.post(reverse('booking-list-create'), {
+            'showtime_id': self.showtime.id,
+            'num_tickets': len(seats.split(',')),
+            'seats': seats,
+        }, format='json')
+
+    def test_booking_claims_one_row_per_seat(self):
+        response = self.book('A1, A2')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['seats'], 'A1,A2')
+        self.assertEqual(
+            sorted(BookedSeat.objects.filter(showtime=self.showtime).values_list('seat', flat=True)),
+            ['A1', 'A2'],
+        )
+
+    def test_already_booked_seat_is_rejected(self):
+        self.assertEqual(self.book('A1,A2').status_code, 201)
+        response = self.book('A2,A3')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_booked_seats_endpoint_reads_inventory(self):
+        self.book('B4,B5')
+        response = self.client.get(reverse('showtime-booked-seats', args=[self.showtime.id]))
+        self.assertEqual(sorted(response.data['booked_seats']), ['B4', 'B5'])
+
+
+class ReservationServiceTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime(capacity=2)
+        self.user = User.objects.create_user(username='almaz', password='secret-pass-123')
+
+    def test_reservation_cannot_exceed_capacity(self):
+        reserve_seats(self.user, self.showtime, ['A1'])
+        with self.assertRaises(SeatUnavailable):
+            reserve_seats(self.user, self.showtime, ['A2', 'A3'])
+        self.assertEqual(BookedSeat.objects.filter(showtime=self.showtime).count(), 1)
+
+    def test_conflicting_reservation_leaves_no_booking(self):
+        reserve_seats(self.user, self.showtime, ['A1'])
+        with self.assertRaises(SeatUnavailable):
+            reserve_seats(self.user, self.showtime, ['A1'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_exhausted_retries_are_a_503(self):
+        def locked(execute, sql, params, many, context):
+            # The showtime lock: a row lock, or on SQLite the write that takes the database lock.
+            if 'cinema_showtime' in sql and ('FOR UPDATE' in sql or sql.startswith('UPDATE')):
+                raise OperationalError('database is locked')
+            return execute(sql, params, many, context)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with connection.execute_wrapper(locked):
+            response = client.post(reverse('booking-list-create'), {
+                'showtime_id': self.showtime.id, 'num_tickets': 1, 'seats': 'A1',
+            }, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['detail'], 'Too many bookings are being made for this showtime; please try again.')
+        self.assertFalse(Booking.objects.exists())
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user(username='kebede', password='secret-pass-123')
+
+    def lapse(self, booking):
+        BookedSeat.objects.filter(booking=booking).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_sweeper_expires_lapsed_pending_bookings(self):
+        lapsed = reserve_seats(self.user, self.showtime, ['A1', 'A2'])
+        paid = reserve_seats(self.user, self.showtime, ['A3'])
+        confirm_hold(paid)
+        self.lapse(lapsed)
+
+        self.assertEqual(expire_holds(batch_size=1), 1)
+        lapsed.refresh_from_db()
+        self.assertEqual(lapsed.payment_status, 'EXPIRED')
+        self.assertEqual(list(BookedSeat.objects.values_list('seat', flat=True)), ['A3'])
+
+    def test_lapsed_hold_is_ignored_and_reclaimable_before_sweep(self):
+        lapsed = reserve_seats(self.user, self.showtime, ['A1'])
+        self.lapse(lapsed)
+        self.assertEqual(booked_seat_labels(self.showtime), [])
+
+        reserve_seats(self.user, self.showtime, ['A1'])
+        lapsed.refresh_from_db()
+        self.assertEqual(lapsed.payment_status, 'EXPIRED')
+
+
+class BookingAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user(username='meron', password='secret-pass-123')
+        self.client.force_login(User.objects.create_superuser(username='root', password='secret-pass-123'))
+
+    def save(self, booking, **changes):
+        data = {
+            'user': booking.user_id, 'showtime': booking.showtime_id, 'num_tickets': booking.num_tickets,
+            'seats': booking.seats, 'payment_status': booking.payment_status, 'transaction_id': '', **changes,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('admin:cinema_booking_change', args=[booking.id]), data)
+
+    def test_saving_an_inactive_booking_does_not_take_seats(self):
+        booking = reserve_seats(self.user, self.showtime, ['A1'])
+        expire_bookings([booking.id])
+        self.assertEqual(self.save(booking, payment_status='EXPIRED').status_code, 302)
+        self.assertFalse(BookedSeat.objects.exists())
+        self.assertEqual(get_seat_map(self.showtime.id).labels(), [])
+
+    def test_saving_a_pending_booking_keeps_its_hold_expiry(self):
+        booking = reserve_seats(self.user, self.showtime, ['A1'])
+        expires_at = BookedSeat.objects.get().expires_at
+        self.assertEqual(self.save(booking, seats='A1,A2', num_tickets=2).status_code, 302)
+        self.assertEqual(
+            sorted(BookedSeat.objects.values_list('seat', 'expires_at')), [('A1', expires_at), ('A2', expires_at)],
+        )
+
+    def test_seat_conflict_is_a_form_error(self):
+        reserve_seats(self.user, self.showtime, ['A1'])
+        booking = reserve_seats(self.user, self.showtime, ['A2'])
+        response = self.save(booking, seats='A1,A2')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Already booked for this showtime: A1.')
+        self.assertEqual(BookedSeat.objects.get(booking=booking).seat, 'A2')
+
+
+class SeatCounterTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime(capacity=5, rows=1, columns=5)
+        self.user = User.objects.create_user(username='almaz', password='secret-pass-123')
+
+    def assertCounters(self, sold, held):
+        self.showtime.refresh_from_db()
+        self.assertEqual((self.showtime.seats_sold, self.showtime.seats_held), (sold, held))
+
+    def test_counters_follow_the_booking_lifecycle(self):
+        paid = reserve_seats(self.user, self.showtime, ['A1', 'A2'])
+        lapsed = reserve_seats(self.user, self.showtime, ['A3'])
+        cancelled = reserve_seats(self.user, self.showtime, ['A4'])
+        self.assertCounters(sold=0, held=4)
+
+        confirm_hold(paid)
+        self.assertCounters(sold=2, held=2)
+        BookedSeat.objects.filter(booking=lapsed).update(expires_at=timezone.now() - timedelta(seconds=1))
+        expire_holds()
+        self.assertCounters(sold=2, held=1)
+        cancel_booking(cancelled, 'CANCELLED')
+        self.assertCounters(sold=2, held=0)
+        paid.delete()
+        self.assertCounters(sold=0, held=0)
+
+    def test_lapsed_holds_do_not_block_a_full_showtime(self):
+        lapsed = reserve_seats(self.user, self.showtime, ['A1', 'A2', 'A3', 'A4', 'A5'])
+        BookedSeat.objects.filter(booking=lapsed).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(reserve_seats(self.user, self.showtime, ['A1']).num_tickets, 1)
+        with self.assertRaises(SeatUnavailable):
+            reserve_seats(self.user, self.showtime, ['B1', 'B2', 'B3', 'B4', 'B5'])
+
+    def test_reconcile_command_corrects_drift(self):
+        reserve_seats(self.user, self.showtime, ['A1', 'A2'])
+        Showtime.objects.filter(pk=self.showtime.pk).update(seats_sold=7, seats_held=0)
+        out = StringIO()
+        call_command('reconcile_seat_counters', stdout=out)
+        self.assertIn(f'Showtime {self.showtime.id}: sold 7 -> 0, held 0 -> 2', out.getvalue())
+        self.assertCounters(sold=0, held=2)
+
+    def test_saving_a_showtime_keeps_the_counters(self):
+        loaded = Showtime.objects.get(pk=self.showtime.pk)
+        reserve_seats(self.user, self.showtime, ['A1', 'A2'])
+        loaded.date_time += timedelta(hours=1)
+        loaded.save()
+        self.assertCounters(sold=0, held=2)
+
+    def test_admin_cannot_edit_the_counters(self):
+        self.client.force_login(User.objects.create_superuser(username='root', password='secret-pass-123'))
+        reserve_seats(self.user, self.showtime, ['A1'])
+        date_time = timezone.localtime(self.showtime.date_time)
+        response = self.client.post(reverse('admin:cinema_showtime_change', args=[self.showtime.id]), {
+            'movie': self.showtime.movie_id, 'theater': self.showtime.theater_id,
+            'date_time_0': date_time.strftime('%Y-%m-%d'), 'date_time_1': date_time.strftime('%H:%M:%S'),
+            'seats_sold': 4, 'seats_held': 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertCounters(sold=0, held=1)
+
+    def test_showtime_list_exposes_availability(self):
+        reserve_seats(self.user, self.showtime, ['A1', 'A2', 'A3', 'A4'])
+        showtime = self.client.get(reverse('showtime-list')).json()['results'][0]
+        self.assertEqual((showtime['seats_available'], showtime['selling_fast']), (1, True))
+
+    def test_cached_showtime_list_follows_bookings(self):
+        cache.clear()
+        response = self.client.get(reverse('showtime-list'))
+        self.assertEqual(response.json()['results'][0]['seats_available'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.user, self.showtime, ['A1', 'A2', 'A3', 'A4', 'A5'])
+        response = self.client.get(reverse('showtime-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['seats_available'], 0)
+
+
+class SeatMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime(rows=3, columns=4)
+        self.user = User.objects.create_user(username='hana', password='secret-pass-123')
+        self.url = reverse('showtime-booked-seats', args=[self.showtime.id])
+
+    def test_bitmap_encoding(self):
+        reserve_seats(self.user, self.showtime, ['A1', 'B2'])
+        response = self.client.get(self.url, {'encoding': 'bitmap'})
+        self.assertEqual((response.data['rows'], response.data['columns']), (3, 4))
+        # A1 is bit 0, B2 is bit 1 * 4 + 1 = 5.
+        self.assertEqual(base64.b64decode(response.data['bitmap']), bytes([0b100001, 0]))
+
+    def test_map_is_rebuilt_after_each_change(self):
+        get_seat_map(self.showtime.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = reserve_seats(self.user, self.showtime, ['C4'])
+        self.assertEqual(self.client.get(self.url).data['booked_seats'], ['C4'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['booked_seats'], ['C4'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_booking(booking, 'FAILED')
+        self.assertEqual(self.client.get(self.url).data['booked_seats'], [])
+
+    def test_map_built_before_a_change_is_not_served(self):
+        showtime = Showtime.objects.select_related('theater').get(pk=self.showtime.id)
+        stale = _fill(showtime, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.user, self.showtime, ['B3'])
+        # A reader that queried before the booking committed stores its map afterwards.
+        cache.set(*_store(self.showtime.id, stale, 0))
+        self.assertEqual(get_seat_map(self.showtime.id).labels(), ['B3'])
+
+    def test_unknown_showtime_is_404(self):
+        response = self.client.get(reverse('showtime-booked-seats', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.movie = self.showtime.movie
+
+    def test_movie_list_is_served_from_cache(self):
+        self.client.get(reverse('movie-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('movie-list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_saving_a_movie_invalidates_cached_responses(self):
+        self.client.get(reverse('movie-detail', args=[self.movie.id]))
+        self.movie.title = 'Lamb'
+        self.movie.save()
+        response = self.client.get(reverse('movie-detail', args=[self.movie.id]))
+        self.assertEqual(response.json()['title'], 'Lamb')
+
+    def test_theater_change_invalidates_showtimes(self):
+        self.client.get(reverse('showtime-list'))
+        Theater.objects.filter(pk=self.showtime.theater_id).get().delete()
+        self.assertEqual(self.client.get(reverse('showtime-list')).json()['results'], [])
+
+    def test_unchanged_catalog_is_not_modified(self):
+        response = self.client.get(reverse('showtime-list'))
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('showtime-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('showtime-list'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        Showtime.objects.get(pk=self.showtime.pk).save()
+        response = self.client.get(reverse('showtime-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_validators_do_not_change_on_cache_hits(self):
+        first = self.client.get(reverse('movie-detail', args=[self.movie.id]))
+        second = self.client.get(reverse('movie-detail', args=[self.movie.id]))
+        self.assertEqual(first['ETag'], second['ETag'])
+        response = self.client.get(reverse('movie-detail', args=[self.movie.id]), HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_each_media_type_is_cached_separately(self):
+        for accept in ('text/html', 'application/json', 'text/html', 'application/json'):
+            response = self.client.get(reverse('movie-list'), HTTP_ACCEPT=accept)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Content-Type'].startswith(accept))
+
+
+class ShowtimeListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.past = create_showtime(date_time=now - timedelta(days=1))
+        self.upcoming = create_showtime(date_time=now + timedelta(days=1))
+        self.later = Showtime.objects.create(
+            movie=self.upcoming.movie, theater=self.past.theater, date_time=now + timedelta(days=10)
+        )
+
+    def ids(self, **params):
+        response = self.client.get(reverse('showtime-list'), params)
+        return [showtime['id'] for showtime in response.json()['results']]
+
+    def test_defaults_to_upcoming_shows(self):
+        self.assertEqual(self.ids(), [self.upcoming.id, self.later.id])
+        self.assertEqual(self.ids(include_past='true')[0], self.past.id)
+
+    def test_filters(self):
+        self.assertEqual(self.ids(movie=self.upcoming.movie_id), [self.upcoming.id, self.later.id])
+        self.assertEqual(self.ids(theater=self.past.theater_id), [self.later.id])
+        date_to = (timezone.now() + timedelta(days=2)).date().isoformat()
+        self.assertEqual(self.ids(date_to=date_to), [self.upcoming.id])
+
+    def test_cursor_pagination(self):
+        response = self.client.get(reverse('showtime-list'), {'page_size': 1}).json()
+        self.assertEqual([s['id'] for s in response['results']], [self.upcoming.id])
+        self.assertEqual([s['id'] for s in self.client.get(response['next']).json()['results']], [self.later.id])
+
+    def test_invalid_filter_is_400(self):
+        self.assertEqual(self.client.get(reverse('showtime-list'), {'date_from': 'soon'}).status_code, 400)
+
+
+class QueryBudgetTests(TestCase):
+    """Every endpoint runs a fixed number of queries however much data exists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='selam', password='secret-pass-123')
+        cls.staff = User.objects.create_user(username='staff', password='secret-pass-123', is_staff=True)
+        movies = Movie.objects.bulk_create([
+            Movie(title=f'Movie {i}', genre=f'Genre {i % 7}', duration=100, director=f'Director {i % 11}',
+                  poster='https://example.com/poster.jpg', release_date=date(2025, 1, 1))
+            for i in range(200)
+        ])
+        theaters = Theater.objects.bulk_create([
+            Theater(name=f'Hall {i}', capacity=150) for i in range(20)
+        ])
+        start = timezone.now() + timedelta(days=1)
+        showtimes = Showtime.objects.bulk_create([
+            Showtime(movie=movies[i % len(movies)], theater=theaters[i % len(theaters)],
+                     date_time=start + timedelta(hours=i))
+            for i in range(1000)
+        ])
+        bookings = Booking.objects.bulk_create([
+            Booking(user=cls.user, showtime=showtimes[i % len(showtimes)], num_tickets=1,
+                    seats=f'A{i // len(showtimes) + 1}', payment_status='COMPLETED')
+            for i in range(1200)
+        ])
+        BookedSeat.objects.bulk_create([
+            BookedSeat(showtime_id=booking.showtime_id, booking=booking, seat=booking.seats) for booking in bookings
+        ])
+        Payment.objects.bulk_create([
+            Payment(booking=booking, payment_proof='payment_proofs/proof.png', is_approved=True)
+            for booking in bookings[::2]
+        ])
+        cls.showtime = showtimes[0]
+        cls.movie = movies[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertBudget(self, budget, url, user=None, **params):
+        # A real token, so the budget includes JWT authentication.
+        credentials = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'} if user else {}
+        self.client.credentials(**credentials)
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalog_endpoints(self):
+        self.assertBudget(1, reverse('movie-list'))
+        self.assertBudget(1, reverse('movie-detail', args=[self.movie.id]))
+        self.assertBudget(1, reverse('showtime-list'))
+        self.assertBudget(2, reverse('showtime-booked-seats', args=[self.showtime.id]))
+
+    def test_user_endpoints(self):
+        # A user's first request also loads it, with its profile, into the auth cache.
+        self.assertBudget(2, reverse('booking-list-create'), self.user)
+        # Later ones take the user from the cache, and it already carries its profile.
+        self.assertBudget(0, reverse('user-profile'), self.user)
+        self.assertBudget(1, reverse('user-bookings'), self.user)
+        self.assertBudget(1, reverse('payment-list'), self.user)
+        self.assertBudget(2, reverse('payment-list'), self.staff)
+        self.assertBudget(1, reverse('payment-list'), self.staff)
+        self.assertBudget(1, reverse('movie-recommendations'), self.user)
+
+    def test_profile_of_a_user_not_yet_cached(self):
+        self.assertBudget(1, reverse('user-profile'), self.user)
+
+
+class BookingListTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.other_showtime = create_showtime()
+        self.user = User.objects.create_user(username='dawit', password='secret-pass-123')
+        self.other = User.objects.create_user(username='mekdes', password='secret-pass-123')
+        self.staff = User.objects.create_user(username='admin', password='secret-pass-123', is_staff=True)
+        self.first = reserve_seats(self.user, self.showtime, ['A1'])
+        self.second = reserve_seats(self.user, self.other_showtime, ['A1'])
+        self.foreign = reserve_seats(self.other, self.showtime, ['A2'])
+        self.client = APIClient()
+
+    def ids(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('booking-list-create'), params)
+        return [booking['id'] for booking in response.data['results']]
+
+    def test_users_only_see_their_own_bookings_newest_first(self):
+        self.assertEqual(self.ids(self.user), [self.second.id, self.first.id])
+
+    def test_staff_can_filter_all_bookings(self):
+        self.assertEqual(len(self.ids(self.staff)), 3)
+        self.assertEqual(self.ids(self.staff, showtime=self.showtime.id), [self.foreign.id, self.first.id])
+        self.assertEqual(self.ids(self.staff, status='COMPLETED'), [])
+
+    def test_keyset_pagination(self):
+        self.client.force_authenticate(self.user)
+        page = self.client.get(reverse('booking-list-create'), {'page_size': 1}).data
+        self.assertEqual([booking['id'] for booking in page['results']], [self.second.id])
+        page = self.client.get(page['next']).data
+        self.assertEqual([booking['id'] for booking in page['results']], [self.first.id])
+
+
+class UserProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tigist', email='tigist@example.com', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        reserve_seats(self.user, create_showtime(), ['A1'])
+
+    def test_profile_is_slim_and_bookings_are_a_sub_resource(self):
+        response = self.client.get(reverse('user-profile'))
+        self.assertEqual(set(response.data), {'id', 'username', 'email', 'phone'})
+        response = self.client.get(reverse('user-bookings'))
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_profile_update_keeps_username(self):
+        response = self.client.put(reverse('user-profile'), {'email': 'new@example.com', 'phone': '+251911000000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['phone'], '+251911000000')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.phone, '+251911000000')
+
+    def test_field_selection(self):
+        response = self.client.get(reverse('movie-list'), {'fields': 'id,title'})
+        self.assertEqual(set(response.json()[0]), {'id', 'title'})
+        response = self.client.get(reverse('user-bookings'), {'fields': 'id,seats'})
+        self.assertEqual(response.data['results'][0], {'id': response.data['results'][0]['id'], 'seats': 'A1'})
+
+
+class StubTelebirrHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers['Content-Length']))
+        server.requests.append(self.client_address[1])
+        time.sleep(server.delay)
+        status_code = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({'code': '0', 'data': {'toPayUrl': 'https://pay.example.com/checkout'}}).encode()
+        try:
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting, which is what the timeout tests want.
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TelebirrGatewayTests(TestCase):
+    """Checkout against a local stub gateway."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubTelebirrHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_url = f'http://127.0.0.1:{cls.server.server_address[1]}/payment'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests, self.server.statuses, self.server.delay = [], [], 0
+        self.user = User.objects.create_user(username='yonas', password='secret-pass-123')
+        self.booking = reserve_seats(self.user, create_showtime(), ['A1'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def gateway(self, **overrides):
+        return override_settings(TELEBIRR_CONFIG={**settings.TELEBIRR_CONFIG, 'API_URL': self.api_url, **overrides})
+
+    def checkout(self):
+        return self.client.post(reverse('telebirr-payment', args=[self.booking.id]))
+
+    def test_checkouts_share_one_pooled_connection(self):
+        with self.gateway():
+            for _ in range(3):
+                response = self.checkout()
+                self.assertEqual(response.data, {'toPayUrl': 'https://pay.example.com/checkout'})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.server.requests)), 1)
+        self.booking.refresh_from_db()
+        self.assertTrue(self.booking.transaction_id)
+
+    def test_transient_gateway_errors_are_retried(self):
+        self.server.statuses = [503]
+        with self.gateway():
+            self.assertEqual(self.checkout().status_code, 200)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_slow_gateway_releases_the_worker_within_the_timeout(self):
+        self.server.delay = 2
+        started = time.perf_counter()
+        with self.gateway(READ_TIMEOUT=0.2, MAX_RETRIES=1):
+            response = self.checkout()
+        occupied = time.perf_counter() - started
+        self.assertEqual(response.status_code, 502)
+        # Two attempts of 0.2s each; without a timeout the worker would wait out the full delay.
+        self.assertLess(occupied, 1.5)
+
+    def test_async_checkout_view(self):
+        token = RefreshToken.for_user(self.user).access_token
+        request = RequestFactory().post('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.gateway():
+            response = async_to_sync(async_views.telebirr_payment)(request, self.booking.id)
+        self.assertEqual(json.loads(response.content), {'toPayUrl': 'https://pay.example.com/checkout'})
+        anonymous = async_to_sync(async_views.telebirr_payment)(RequestFactory().post('/'), self.booking.id)
+        self.assertEqual(anonymous.status_code, 401)
+
+    def test_async_client(self):
+        client = TelebirrClient(self.api_url, 1, 1, 1, backoff_factor=0)
+        _, order = build_order(self.booking)
+        self.server.statuses = [503]
+        self.assertEqual(async_to_sync(client.acreate_order)(order), 'https://pay.example.com/checkout')
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class TelebirrNotificationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ruth', password='secret-pass-123')
+        showtime = create_showtime()
+        self.paid = reserve_seats(self.user, showtime, ['A1'])
+        self.unpaid = reserve_seats(self.user, showtime, ['A2'])
+        Booking.objects.filter(pk=self.paid.pk).update(transaction_id='order-1')
+        Booking.objects.filter(pk=self.unpaid.pk).update(transaction_id='order-2')
+
+    def notify(self, out_trade_no, status):
+        return self.client.post(reverse('telebirr-notify'), {'outTradeNo': out_trade_no, 'status': status},
+                                content_type='application/json')
+
+    def test_notifications_are_queued_and_deduplicated(self):
+        for _ in range(3):
+            self.assertEqual(self.notify('order-1', 'SUCCESS').json(), {'status': 'success'})
+        self.assertEqual(TelebirrNotification.objects.count(), 1)
+        self.paid.refresh_from_db()
+        self.assertEqual(self.paid.payment_status, 'PENDING')
+        self.assertEqual(self.notify('', 'SUCCESS').status_code, 400)
+
+    def test_worker_applies_batches_idempotently(self):
+        self.notify('order-1', 'FAILED')
+        self.notify('order-1', 'SUCCESS')
+        self.notify('order-2', 'FAILED')
+        self.notify('order-404', 'SUCCESS')
+
+        self.assertEqual(process_notifications(batch_size=10), 2)
+        self.paid.refresh_from_db()
+        self.unpaid.refresh_from_db()
+        self.assertEqual(self.paid.payment_status, 'COMPLETED')
+        self.assertEqual(self.unpaid.payment_status, 'FAILED')
+        self.assertEqual(list(BookedSeat.objects.values_list('seat', 'expires_at')), [('A1', None)])
+        self.assertEqual(
+            sorted(TelebirrNotification.objects.values_list('result', flat=True)),
+            ['applied', 'applied', 'ignored', 'unknown'],
+        )
+
+        TelebirrNotification.objects.update(processed_at=None)
+        self.assertEqual(process_notifications(), 0)
+
+    def test_payment_after_expiry_reclaims_free_seats(self):
+        BookedSeat.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        expire_holds()
+        self.notify('order-1', 'SUCCESS')
+        with self.assertLogs('cinema.payments', 'ERROR'):
+            self.assertEqual(process_notifications(), 1)
+        self.paid.refresh_from_db()
+        self.assertEqual(self.paid.payment_status, 'COMPLETED')
+        self.assertEqual(list(BookedSeat.objects.values_list('seat', 'expires_at')), [('A1', None)])
+        self.assertEqual(TelebirrNotification.objects.get().result, 'paid_after_expiry')
+
+    def test_payment_for_a_rejected_booking_is_refunded(self):
+        cancel_booking(self.paid, 'REJECTED')
+        self.notify('order-1', 'SUCCESS')
+        with self.assertLogs('cinema.payments', 'ERROR'):
+            self.assertEqual(process_notifications(), 1)
+        self.paid.refresh_from_db()
+        self.assertEqual(self.paid.payment_status, 'REFUND_DUE')
+        self.assertFalse(BookedSeat.objects.filter(booking=self.paid).exists())
+        self.assertEqual(TelebirrNotification.objects.get().result, 'paid_after_rejection')
+
+    def test_payment_after_expiry_flags_a_refund_when_seats_are_taken(self):
+        BookedSeat.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        expire_holds()
+        other = User.objects.create_user(username='saba', password='secret-pass-123')
+        reserve_seats(other, self.paid.showtime, ['A1'])
+        self.notify('order-1', 'SUCCESS')
+        with self.assertLogs('cinema.payments', 'ERROR'):
+            self.assertEqual(process_notifications(), 1)
+        self.paid.refresh_from_db()
+        self.assertEqual(self.paid.payment_status, 'REFUND_DUE')
+        self.assertFalse(BookedSeat.objects.filter(booking=self.paid).exists())
+        self.assertEqual(TelebirrNotification.objects.get().result, 'paid_after_expiry')
+
+
+class PaymentProofTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='hana', password='secret-pass-123')
+        self.showtime = create_showtime()
+
+    def upload(self, seat, size=(3000, 2000)):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        Image.new('RGB', size, 'navy').save(buffer, format='JPEG', exif=exif)
+        booking = reserve_seats(self.user, self.showtime, [seat])
+        payment = Payment(booking=booking)
+        payment.payment_proof.save('proof.jpg', ContentFile(buffer.getvalue()))
+        return payment
+
+    def test_proofs_are_stripped_downscaled_and_deduplicated(self):
+        first, second = self.upload('A1'), self.upload('A2')
+        originals = [first.payment_proof.name, second.payment_proof.name]
+        self.assertEqual(process_pending_proofs(), 2)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.content_hash, second.content_hash)
+        self.assertEqual(first.payment_proof.name, f'payment_proofs/{first.content_hash}.jpg')
+        self.assertEqual(second.payment_proof.name, first.payment_proof.name)
+        self.assertFalse(any(default_storage.exists(name) for name in originals))
+        with Image.open(first.payment_proof.path) as image:
+            self.assertEqual(image.size, (1067, 1600))
+            self.assertEqual(len(image.getexif()), 0)
+        with Image.open(first.thumbnail.path) as image:
+            self.assertEqual(max(image.size), 200)
+        self.assertEqual(process_pending_proofs(), 0)
+
+    def test_invalid_upload_is_not_retried(self):
+        booking = reserve_seats(self.user, self.showtime, ['A1'])
+        payment = Payment(booking=booking)
+        payment.payment_proof.save('proof.png', ContentFile(b'not an image'))
+        self.assertEqual(process_pending_proofs(), 0)
+        payment.refresh_from_db()
+        self.assertIsNotNone(payment.processed_at)
+        self.assertFalse(payment.thumbnail)
+
+
+class ProofUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(
+            MEDIA_ROOT=media_root, PAYMENT_UPLOAD_DIR=f'{media_root}/uploads', PAYMENT_PROOF_MAX_SIZE=200_000,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='selam', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.booking = reserve_seats(self.user, create_showtime(), ['A1'])
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'teal').save(buffer, format='PNG')
+        self.image = buffer.getvalue()
+
+    def post_proof(self, data, content_type='image/png'):
+        proof = SimpleUploadedFile('proof.png', data, content_type=content_type)
+        return self.client.post(reverse('payment-list'), {'booking': self.booking.id, 'payment_proof': proof})
+
+    def test_multipart_upload_is_limited_by_size_and_type(self):
+        self.assertEqual(self.post_proof(self.image + b'\0' * 200_000).status_code, 413)
+        self.assertEqual(self.post_proof(b'GIF89a' + self.image, content_type='image/gif').status_code, 415)
+        self.assertEqual(self.post_proof(b'GIF89a' + self.image).status_code, 415)
+        self.assertFalse(Payment.objects.exists())
+
+        self.assertEqual(self.post_proof(self.image).status_code, 201)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'PENDING_APPROVAL')
+
+    def test_multipart_upload_rejects_other_users_bookings(self):
+        self.client.force_authenticate(User.objects.create_user(username='dawit', password='secret-pass-123'))
+        self.assertEqual(self.post_proof(self.image).status_code, 400)
+        self.assertFalse(Payment.objects.exists())
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'PENDING')
+        self.assertIsNotNone(BookedSeat.objects.get(booking=self.booking).expires_at)
+
+    def put_chunk(self, upload_id, start, data):
+        end = start + len(data) - 1
+        return self.client.put(
+            reverse('proof-upload-detail', args=[upload_id]), data, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.image)}',
+        )
+
+    def test_resumable_upload(self):
+        response = self.client.post(reverse('proof-upload-create'), {
+            'booking': self.booking.id, 'content_type': 'image/png', 'size': len(self.image),
+        })
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['id']
+        half = len(self.image) // 2
+
+        self.assertEqual(self.put_chunk(upload_id, 0, self.image[:half]).json()['received'], half)
+        # A retried chunk is not appended twice; the client learns where to resume.
+        response = self.put_chunk(upload_id, 0, self.image[:half])
+        self.assertEqual((response.status_code, response.json()['received']), (409, half))
+        self.assertEqual(self.client.get(reverse('proof-upload-detail', args=[upload_id])).json()['received'], half)
+
+        response = self.put_chunk(upload_id, half, self.image[half:])
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.get(booking=self.booking)
+        self.assertEqual(payment.payment_proof.read(), self.image)
+        self.assertFalse(ProofUpload.objects.exists())
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'PENDING_APPROVAL')
+
+    def test_resumable_upload_rejects_other_users_bookings(self):
+        other = User.objects.create_user(username='dawit', password='secret-pass-123')
+        self.client.force_authenticate(other)
+        response = self.client.post(reverse('proof-upload-create'), {
+            'booking': self.booking.id, 'content_type': 'image/png', 'size': len(self.image),
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class PaymentReviewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='secret-pass-123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.user = User.objects.create_user(username='meron', password='secret-pass-123')
+        self.showtime = create_showtime()
+
+    def create_payments(self, seats):
+        payments = []
+        for seat in seats:
+            booking = reserve_seats(self.user, self.showtime, [seat])
+            Booking.objects.filter(pk=booking.pk).update(payment_status='PENDING_APPROVAL')
+            payments.append(Payment.objects.create(booking=booking, payment_proof='payment_proofs/proof.png'))
+        return payments
+
+    def review(self, ids, decision):
+        return self.client.post(reverse('payment-review'), {'ids': ids, 'decision': decision}, format='json')
+
+    def test_bulk_review_runs_in_constant_queries(self):
+        small = [p.id for p in self.create_payments(['A1', 'A2'])]
+        large = [p.id for p in self.create_payments([f'B{c}' for c in range(1, 16)] + [f'C{c}' for c in range(1, 16)])]
+        with self.assertNumQueries(5) as small_queries:
+            self.review(small, 'approve')
+        with self.assertNumQueries(len(small_queries.captured_queries)):
+            response = self.review(large, 'approve')
+        self.assertEqual({r['result'] for r in response.json()['results']}, {'approved'})
+        self.assertEqual(Booking.objects.filter(payment_status='COMPLETED').count(), 32)
+        self.assertEqual(Payment.objects.filter(is_approved=True).count(), 32)
+
+    def test_results_are_reported_per_item(self):
+        approved, rejected, expired = self.create_payments(['A1', 'A2', 'A3'])
+        self.review([approved.id], 'approve')
+        Booking.objects.filter(pk=expired.booking_id).update(payment_status='EXPIRED')
+
+        response = self.review([approved.id, rejected.id, expired.id, 9999], 'reject')
+        self.assertEqual(response.json()['results'], [
+            {'id': approved.id, 'result': 'already_approved'},
+            {'id': rejected.id, 'result': 'rejected'},
+            {'id': expired.id, 'result': 'booking_expired'},
+            {'id': 9999, 'result': 'not_found'},
+        ])
+        rejected.booking.refresh_from_db()
+        self.assertEqual(rejected.booking.payment_status, 'REJECTED')
+        self.assertEqual(booked_seat_labels(self.showtime), ['A1', 'A3'])
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.review([rejected.id], 'approve').status_code, 403)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.drama = create_showtime(title='Drama A', genre='Drama')
+        self.drama_b = create_showtime(title='Drama B', genre='Drama')
+        self.comedy = create_showtime(title='Comedy', genre='Comedy', director='Hailu')
+        self.comedy_b = create_showtime(title='Comedy B', genre='Comedy', director='Hailu')
+        self.fan = User.objects.create_user(username='fan', password='secret-pass-123')
+        self.newcomer = User.objects.create_user(username='newcomer', password='secret-pass-123')
+        self.client = APIClient()
+
+    def book(self, user, showtime, seat):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                reserve_seats(user, showtime, [seat])
+
+    def recommended(self, user):
+        self.client.force_authenticate(user)
+        return [movie['title'] for movie in self.client.get(reverse('movie-recommendations')).json()]
+
+    def test_recommendations_update_on_each_booking(self):
+        self.book(self.fan, self.drama, 'A1')
+        self.book(self.fan, self.comedy, 'A1')
+        self.assertEqual(self.recommended(self.fan), ['Comedy B', 'Drama B'])
+
+        # Co-booked with Drama A by another user outranks a genre match alone.
+        self.book(self.newcomer, self.drama, 'A2')
+        self.assertEqual(self.recommended(self.newcomer), ['Comedy', 'Drama B'])
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.book(self.fan, self.drama, 'A1')
+        self.book(self.fan, self.comedy, 'A1')
+        self.book(self.newcomer, self.drama, 'A2')
+        incremental = {user: self.recommended(user) for user in (self.fan, self.newcomer)}
+
+        self.assertEqual(rebuild_recommendations(), (2, 2))
+        self.assertEqual({user: self.recommended(user) for user in (self.fan, self.newcomer)}, incremental)
+
+
+class MovieSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for title, genre, director in [
+            ('Sost Maezen', 'Drama', 'Hailu'), ('Yewedaj Mistir', 'Comedy', 'Sost Films'),
+            ('Hailu Returns', 'Action', 'Meron'), ('Lomi Shita', 'Romance', 'Dawit'),
+        ]:
+            Movie.objects.create(title=title, genre=genre, director=director, duration=120,
+                                 poster='https://example.com/poster.jpg', release_date=date(2025, 1, 1))
+
+    def search(self, query):
+        response = self.client.get(reverse('movie-search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [movie['title'] for movie in response.json()]
+
+    def test_title_matches_rank_above_director_matches(self):
+        self.assertEqual(self.search('sost'), ['Sost Maezen', 'Yewedaj Mistir'])
+        self.assertEqual(self.search('hailu'), ['Hailu Returns', 'Sost Maezen'])
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(self.search('lom'), ['Lomi Shita'])
+        self.assertEqual(self.search('sos mae'), ['Sost Maezen'])
+        self.assertEqual(self.search('romance dawit'), ['Lomi Shita'])
+        # Query syntax is treated as plain words.
+        self.assertEqual(self.search('"sost"* AND'), [])
+        self.assertEqual(self.search('sost*'), ['Sost Maezen', 'Yewedaj Mistir'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers are SQLite-only')
+    def test_index_triggers_survive_later_migrations(self):
+        # A migration that makes Django rebuild cinema_movie drops them silently.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'cinema_movie'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(triggers, {'cinema_movie_fts_insert', 'cinema_movie_fts_delete', 'cinema_movie_fts_update'})
+
+    def test_admin_search_filters_with_the_index(self):
+        self.client.force_login(User.objects.create_superuser(username='root', password='secret-pass-123'))
+        response = self.client.get(reverse('admin:cinema_movie_changelist'), {'q': 'sost'})
+        self.assertEqual(sorted(movie.title for movie in response.context['cl'].result_list),
+                         ['Sost Maezen', 'Yewedaj Mistir'])
+
+    def test_index_follows_updates_and_deletes(self):
+        Movie.objects.filter(title='Lomi Shita').update(title='Tizita')
+        self.assertEqual(self.search('lomi'), [])
+        self.assertEqual(self.search('tizita'), ['Tizita'])
+        Movie.objects.get(title='Tizita').delete()
+        self.assertEqual(self.search('tizita'), [])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(reverse('movie-search'), {'q': '  '}).status_code, 400)
+
+
+class SeatStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user(username='abebe', password='secret-pass-123')
+
+    def reserve(self, seats):
+        with self.captureOnCommitCallbacks(execute=True):
+            return reserve_seats(self.user, self.showtime, seats)
+
+    def on_commit(self, func, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            func(*args)
+
+    async def open_stream(self, showtime_id):
+        sent, closed = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {'type': 'http', 'method': 'GET', 'path': f'/api/showtimes/{showtime_id}/seats/stream/',
+                 'headers': [(b'origin', b'http://localhost:5173')]}
+        task = asyncio.ensure_future(asgi_application(scope, receive, sent.put))
+        start = await asyncio.wait_for(sent.get(), 5)
+        return task, sent, closed, start
+
+    async def next_event(self, sent):
+        body = (await asyncio.wait_for(sent.get(), 5))['body'].decode()
+        name, data = body.strip().split('\n')[-2:]
+        return name.removeprefix('event: '), json.loads(data.removeprefix('data: '))['seats']
+
+    @override_settings(SEAT_FEED_BROKER='cinema.seatfeed.LocalBroker')
+    def test_stream_relays_holds_confirmations_and_releases(self):
+        async def scenario():
+            task, sent, closed, start = await self.open_stream(self.showtime.id)
+            self.assertEqual(start['status'], 200)
+            self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+            self.assertEqual(await self.next_event(sent), ('snapshot', []))
+
+            booking = await sync_to_async(self.reserve)(['A1', 'A2'])
+            self.assertEqual(await self.next_event(sent), ('held', ['A1', 'A2']))
+            await sync_to_async(self.on_commit)(confirm_hold, booking)
+            self.assertEqual(await self.next_event(sent), ('sold', ['A1', 'A2']))
+            await sync_to_async(self.on_commit)(cancel_booking, booking, 'CANCELLED')
+            self.assertEqual(sorted((await self.next_event(sent))[1]), ['A1', 'A2'])
+
+            closed.set()
+            await asyncio.wait_for(task, 5)
+            self.assertEqual(get_broker().subscriber_count(), 0)
+        async_to_sync(scenario)()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                       SEAT_FEED_BROKER='cinema.seatfeed.CacheBroker')
+    def test_cache_broker_carries_events_between_processes(self):
+        self.reserve(['B1'])
+
+        async def scenario():
+            task, sent, closed, _ = await self.open_stream(self.showtime.id)
+            self.assertEqual(await self.next_event(sent), ('snapshot', ['B1']))
+            # A separate broker instance stands in for another worker or the sweeper.
+            publisher = CacheBroker()
+            await sync_to_async(publisher.publish)(self.showtime.id, {'type': 'free', 'seats': ['B1']})
+            self.assertEqual(await self.next_event(sent), ('free', ['B1']))
+
+            # An event lost from the cache turns into a fresh snapshot.
+            await sync_to_async(cache.incr)(sequence_key(self.showtime.id))
+            self.assertEqual(await self.next_event(sent), ('snapshot', ['B1']))
+            closed.set()
+            await asyncio.wait_for(task, 5)
+        async_to_sync(scenario)()
+
+    def test_cache_broker_requires_atomic_increments(self):
+        # The file-based cache reads and rewrites the counter, so concurrent publishers could share a number.
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        with override_settings(CACHES={'default': backend}), self.assertRaises(ImproperlyConfigured):
+            CacheBroker()
+
+    def test_unknown_showtime_is_not_found(self):
+        async def scenario():
+            task, _, closed, start = await self.open_stream(self.showtime.id + 1)
+            await asyncio.wait_for(task, 5)
+            return start['status']
+        self.assertEqual(async_to_sync(scenario)(), 404)
+
+
+class AsyncViewTests(TestCase):
+    """The ASGI views answer exactly like the DRF views they replace."""
+
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        Showtime.objects.create(movie=self.showtime.movie, theater=self.showtime.theater,
+                                date_time=timezone.now() + timedelta(days=2))
+        reserve_seats(User.objects.create_user(username='abebe', password='secret-pass-123'), self.showtime, ['A1'])
+        self.factory = RequestFactory()
+
+    def call(self, view, path, *args, **headers):
+        response = async_to_sync(view)(self.factory.get(path, **headers), *args)
+        return response, json.loads(response.content) if response.content else None
+
+    def test_views_are_awaited_by_the_asgi_handler(self):
+        for view in (async_views.movie_list, async_views.showtime_list,
+                     async_views.showtime_booked_seats, async_views.telebirr_payment):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    def test_responses_match_the_sync_views(self):
+        for view, path, args in [
+            (async_views.movie_list, reverse('movie-list'), ()),
+            (async_views.showtime_list, reverse('showtime-list') + '?page_size=1&fields=id,seats_available', ()),
+            (async_views.showtime_booked_seats, reverse('showtime-booked-seats', args=[self.showtime.id]),
+             (self.showtime.id,)),
+            (async_views.showtime_booked_seats, reverse('showtime-booked-seats', args=[0]), (0,)),
+            (async_views.showtime_list, reverse('showtime-list') + '?movie=abc', ()),
+        ]:
+            cache.clear()
+            expected = self.client.get(path)
+            cache.clear()
+            response, data = self.call(view, path, *args)
+            self.assertEqual((response.status_code, data), (expected.status_code, expected.json()), path)
+
+        page = self.call(async_views.showtime_list, reverse('showtime-list') + '?page_size=1')[1]
+        self.assertEqual(self.client.get(page['next']).json()['results'], self.call(
+            async_views.showtime_list, page['next'])[1]['results'])
+
+    def test_catalog_validators(self):
+        response, _ = self.call(async_views.movie_list, reverse('movie-list'))
+        not_modified, _ = self.call(async_views.movie_list, reverse('movie-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.call(async_views.movie_list, reverse('movie-list'))[0]['ETag'], response['ETag'])
+        self.assertEqual(async_to_sync(async_views.movie_list)(self.factory.post(reverse('movie-list'))).status_code, 405)
+
+
+class FunnelBenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_seeded_funnel_runs_end_to_end(self):
+        dataset = bench_data.seed(movies=3, theaters=2, showtimes_per_theater=3, users=10, occupancy=0.5)
+        self.assertEqual((dataset['showtimes'], dataset['users']), (6, 10))
+        self.assertEqual(Showtime.objects.get(pk=Showtime.objects.first().pk).seats_sold,
+                         BookedSeat.objects.filter(showtime=Showtime.objects.first()).count())
+
+        samples, outcomes, elapsed = bench_funnel.run_funnel(journeys=6, concurrency=1)
+        result = bench_results.build_result({}, dataset, samples, outcomes, elapsed)
+        self.assertEqual(outcomes['completed'] + outcomes['no_showtimes'], 6)
+        self.assertEqual(result['endpoints']['payments']['requests'], outcomes['completed'])
+        self.assertEqual(result['endpoints']['movies']['server_errors'], 0)
+
+        slower = json.loads(json.dumps(result))
+        slower['endpoints']['movies']['p95_ms'] *= 2
+        regressed = {(endpoint, metric) for endpoint, metric, *_, flag in bench_results.compare(slower, result) if flag}
+        self.assertEqual(regressed, {('movies', 'p95_ms')})
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+        self.showtime = create_showtime()
+
+    def test_request_records_time_queries_and_serializers(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('showtime-list'))
+        labels = ('api/showtimes/', 'GET')
+        self.assertEqual(metrics.REQUEST_QUERIES.samples(labels)['sum'], len(queries))
+        self.assertGreater(metrics.REQUEST_DB_DURATION.samples(labels)['sum'], 0)
+        self.assertGreater(metrics.REQUEST_SERIALIZER_DURATION.samples(labels)['sum'], 0)
+        self.assertEqual(metrics.REQUEST_HTTP_DURATION.samples(labels)['sum'], 0)
+        self.assertEqual(metrics.REQUEST_DURATION.samples(('api/showtimes/', 'GET', '200'))['count'], 1)
+
+        # The cached response runs neither SQL nor serializers.
+        self.client.get(reverse('showtime-list'))
+        self.assertEqual(metrics.REQUEST_QUERIES.samples(labels)['0'], 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('movie-list'))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE cinema_request_duration_seconds histogram', body)
+        self.assertIn('cinema_request_duration_seconds_count{route="api/movies/",method="GET",status="200"} 1', body)
+        self.assertIn('cinema_request_db_queries_bucket{route="api/movies/",method="GET",le="+Inf"} 1', body)
+
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0.001)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('cinema.metrics', 'WARNING') as logs:
+            self.client_class().get(reverse('showtime-booked-seats', args=[self.showtime.id]))
+        self.assertIn(f'Slow request GET /api/showtimes/{self.showtime.id}/booked-seats/ 200', logs.output[0])
+        self.assertIn('FROM "cinema_showtime"', logs.output[0])
+
+    def test_async_views_are_instrumented(self):
+        async def view(request):
+            await sync_to_async(list)(Movie.objects.all())
+            return JsonResponse({})
+        middleware = metrics.MetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/api/movies/')
+        async_to_sync(middleware)(request)
+        self.assertEqual(metrics.REQUEST_QUERIES.samples(('<unmatched>', 'GET'))['sum'], 1)
+
+    def test_outbound_calls_are_timed_by_outcome(self):
+        stats = metrics.RequestStats()
+        token = metrics._current.set(stats)
+        try:
+            with metrics.outbound('telebirr'):
+                time.sleep(0.01)
+            with self.assertRaises(ValueError), metrics.outbound('telebirr'):
+                raise ValueError
+        finally:
+            metrics._current.reset(token)
+        self.assertGreaterEqual(stats.http, 0.01)
+        self.assertEqual(metrics.OUTBOUND_DURATION.samples(('telebirr', 'ok'))['count'], 1)
+        self.assertEqual(metrics.OUTBOUND_DURATION.samples(('telebirr', 'error'))['count'], 1)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='hanna', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_reads_skip_the_user_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('user-profile')).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('user-profile')).json()['username'], 'hanna')
+        # Only the bookings query is left.
+        with self.assertNumQueries(1):
+            self.client.get(reverse('booking-list-create'))
+
+    def test_cached_user_has_no_password_hash(self):
+        load_user(self.user.id)
+        user = load_user(self.user.id)
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertTrue(user.check_password('secret-pass-123'))
+
+    def test_saves_invalidate_the_cached_user(self):
+        self.client.get(reverse('user-profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.phone = '0911000000'
+            self.user.profile.save()
+        self.assertEqual(self.client.get(reverse('user-profile')).json()['phone'], '0911000000')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('user-profile')).status_code, 401)
+
+    def test_writes_load_the_user(self):
+        self.client.get(reverse('user-profile'))
+        # A change that bypasses the signals is only seen by writes until the entry expires.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('user-profile')).status_code, 200)
+        self.assertEqual(self.client.patch(reverse('user-profile'), {'phone': '1'}).status_code, 401)
+
+
+class UserProvisioningTests(TestCase):
+    def profile_writes(self, queries):
+        return [query['sql'].split()[0] for query in queries.captured_queries if '"cinema_userprofile"' in query['sql']
+                and not query['sql'].startswith('SELECT')]
+
+    def test_registration_inserts_the_profile_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('register'), {
+                'username': 'dawit', 'email': 'dawit@example.com', 'password': 'secret-pass-123', 'phone': '0911223344',
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['phone'], '0911223344')
+        self.assertEqual(self.profile_writes(queries), ['INSERT'])
+        user = User.objects.get(username='dawit')
+        self.assertEqual(user.profile.phone, '0911223344')
+        self.assertTrue(user.check_password('secret-pass-123'))
+
+    def test_user_saves_leave_the_profile_alone(self):
+        user = User.objects.create_user(username='meron', password='secret-pass-123')
+        with CaptureQueriesContext(connection) as queries:
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+            user.first_name = 'Meron'
+            user.save()
+        self.assertEqual(self.profile_writes(queries), [])
+
+    def test_import_users(self):
+        User.objects.create_user(username='selam', password='secret-pass-123')
+        rows = [
+            {'username': 'abebe', 'email': 'abebe@EXAMPLE.com', 'phone': '0911000001', 'password': 'secret-pass-123'},
+            {'username': 'selam', 'phone': '0911000002'},
+            {'username': 'yonas', 'phone': '0911000003'},
+            {'username': 'abebe', 'phone': '0911000004'},
+            {'username': 'ruth'},
+        ]
+        # Five per batch of two rows: existing usernames, users, profiles and the savepoint pair.
+        with self.assertNumQueries(15):
+            self.assertEqual(import_users(iter(rows), batch_size=2), (3, 2))
+        abebe, yonas, ruth = (User.objects.select_related('profile').get(username=name)
+                              for name in ('abebe', 'yonas', 'ruth'))
+        self.assertEqual((abebe.email, abebe.profile.phone), ('abebe@example.com', '0911000001'))
+        self.assertTrue(abebe.check_password('secret-pass-123'))
+        self.assertFalse(yonas.has_usable_password())
+        self.assertEqual(ruth.profile.phone, '')
+        self.assertEqual(User.objects.get(username='selam').profile.phone, '')
+
+    def test_import_command_reports_invalid_rows(self):
+        path = tempfile.mktemp(suffix='.csv')
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        with open(path, 'w') as f:
+            f.write('username,email,phone\nhanna,hanna@example.com,0911\n,nobody@example.com,\nlong,,' + '9' * 16 + '\n')
+        out = StringIO()
+        call_command('import_users', path, stdout=out)
+        self.assertIn('Line 3: missing username', out.getvalue())
+        self.assertIn('Line 4: phone longer than 15 characters', out.getvalue())
+        self.assertIn('Imported 1 users, skipped 0 existing usernames and 2 invalid rows.', out.getvalue())
+        self.assertEqual(User.objects.get(username='hanna').profile.phone, '0911')
+
+
+@override_settings(SHOWTIME_CLEANING_MINUTES=20)
+class ShowtimeSchedulingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # A 120-minute movie with 20 minutes of cleaning takes its theater for 140 minutes.
+        self.existing = create_showtime(date_time=timezone.make_aware(datetime(2026, 11, 2, 19, 0)))
+        self.movie, self.theater = self.existing.movie, self.existing.theater
+        staff = User.objects.create_user(username='programmer', password='secret-pass-123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def rule(self, times, **kwargs):
+        return {'movie': self.movie.id, 'theater': self.theater.id, 'start_date': '2026-11-01',
+                'end_date': '2026-11-07', 'times': times, **kwargs}
+
+    def schedule(self, *rules, **options):
+        return self.client.post(reverse('showtime-schedule'), {'rules': list(rules), **options}, format='json')
+
+    def test_timeline_finds_overlaps_behind_shorter_intervals(self):
+        timeline = TheaterTimeline()
+        day = datetime(2026, 11, 1, tzinfo=dt_timezone.utc)
+        timeline.add(day, day + timedelta(hours=5), 'long')
+        timeline.add(day + timedelta(hours=1), day + timedelta(hours=2), 'short')
+        self.assertEqual(timeline.overlapping(day + timedelta(hours=3), day + timedelta(hours=4)), ['long'])
+        self.assertEqual(timeline.overlapping(day + timedelta(hours=5), day + timedelta(hours=6)), [])
+
+    def test_schedules_rules_in_one_batch(self):
+        cache_version = self.client.get(reverse('showtime-list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.schedule(self.rule(['10:00', '12:20']), self.rule(['15:00'], weekdays=[5, 6]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'showtimes': 16, 'created': 16, 'conflicts': []})
+        self.assertEqual(Showtime.objects.filter(theater=self.theater).count(), 17)
+        self.assertEqual(sorted(Showtime.objects.filter(date_time__hour=15).values_list('date_time__day', flat=True)),
+                         [1, 7])
+        self.assertNotEqual(self.client.get(reverse('showtime-list'))['ETag'], cache_version)
+
+    def test_conflicts_create_nothing(self):
+        rules = [self.rule(['10:00', '12:00']), self.rule(['20:00'], start_date='2026-11-02', end_date='2026-11-02')]
+        dry_run = self.schedule(*rules, dry_run=True)
+        self.assertEqual(dry_run.status_code, 200)
+        conflicts = dry_run.json()['conflicts']
+        # 12:00 starts before the 10:00 showing has been cleaned, and 20:00 during the existing 19:00 one.
+        self.assertEqual(len(conflicts), 8)
+        self.assertEqual(conflicts[0]['overlaps'], [{'rule': 0, 'date_time': '2026-11-01T10:00:00+00:00'}])
+        self.assertEqual(conflicts[-1]['overlaps'], [{'showtime': self.existing.id, 'date_time': '2026-11-02T19:00:00+00:00'}])
+
+        self.assertEqual(self.schedule(*rules).status_code, 409)
+        self.assertEqual(Showtime.objects.count(), 1)
+        # Without the cleaning buffer the morning showings fit back to back.
+        self.assertEqual(self.schedule(self.rule(['10:00', '12:00']), cleaning_minutes=0).status_code, 201)
+
+    def test_rejects_bad_rules(self):
+        self.assertEqual(self.schedule(self.rule(['10:00'], movie=0)).json(), {'error': 'Unknown movies: 0'})
+        self.assertEqual(self.schedule(self.rule(['10:00'], end_date='2026-10-01')).status_code, 400)
+        self.client.force_authenticate(User.objects.create_user(username='guest', password='secret-pass-123'))
+        self.assertEqual(self.schedule(self.rule(['10:00'])).status_code, 403)
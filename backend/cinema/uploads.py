@@ -0,0 +1,156 @@
+"""Bounded, streaming upload paths for payment proofs.
+
+``ProofUploadHandler`` replaces Django's default upload handlers on the
+payments endpoint. It spools the file to disk in 64 KiB chunks (so the
+final save into storage is a rename), and rejects a request as soon as the
+declared length, the part's content type, the first bytes or the running
+size show it cannot be a proof, instead of after the whole body is read.
+
+Resumable uploads keep their bytes in ``PAYMENT_UPLOAD_DIR``. Each chunk is
+written at the offset named in its ``Content-Range`` header, so a retried
+chunk overwrites itself rather than being appended twice.
+"""
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Payment, ProofUpload
+from .payments import submit_proof
+
+CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and the other form fields.
+MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_SESSION_TTL = timedelta(days=1)
+
+SIGNATURES = {
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'image/webp': (b'RIFF',),
+}
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class ProofTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Payment proof is too large.'
+    default_code = 'proof_too_large'
+
+
+class ProofTypeNotAllowed(APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = 'Payment proof must be a JPEG, PNG or WebP image.'
+    default_code = 'proof_type_not_allowed'
+
+
+def max_proof_size():
+    return settings.PAYMENT_PROOF_MAX_SIZE
+
+
+def matches_signature(content_type, head):
+    signatures = SIGNATURES.get(content_type)
+    if not signatures or not any(head.startswith(signature) for signature in signatures):
+        return False
+    return content_type != 'image/webp' or head[8:12] == b'WEBP'
+
+
+class ProofUploadHandler(TemporaryFileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > max_proof_size() + MULTIPART_OVERHEAD:
+            raise ProofTooLarge()
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        if content_type not in SIGNATURES:
+            raise ProofTypeNotAllowed()
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not matches_signature(self.content_type, raw_data):
+            self.file.close()
+            raise ProofTypeNotAllowed()
+        self.received += len(raw_data)
+        if self.received > max_proof_size():
+            self.file.close()
+            raise ProofTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def partial_path(upload):
+    return Path(settings.PAYMENT_UPLOAD_DIR) / f'{upload.id}.part'
+
+
+def start_upload(upload):
+    os.makedirs(settings.PAYMENT_UPLOAD_DIR, exist_ok=True)
+    partial_path(upload).touch()
+
+
+def parse_content_range(header):
+    """Return ``(start, end, total)`` from a ``Content-Range`` header, or ``None``."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        return None
+    start, end, total = (int(group) for group in match.groups())
+    if start > end or end >= total:
+        return None
+    return start, end, total
+
+
+def write_chunk(upload, start, stream, length):
+    """Copy ``length`` bytes from ``stream`` to offset ``start`` of the partial file.
+
+    Returns ``False`` if the stream ended early (the client dropped the
+    connection); the offset is then left unchanged for the client to retry.
+    """
+    written = 0
+    with open(partial_path(upload), 'r+b') as f:
+        f.seek(start)
+        while written < length:
+            data = stream.read(min(CHUNK_SIZE, length - written))
+            if not data:
+                return False
+            if start + written == 0 and not matches_signature(upload.content_type, data):
+                raise ProofTypeNotAllowed()
+            f.write(data)
+            written += len(data)
+    # Concurrent retries of the same chunk write identical bytes; only one advances the offset.
+    ProofUpload.objects.filter(pk=upload.pk, received=start).update(received=start + length)
+    return True
+
+
+def complete_upload(upload):
+    """Turn a fully received upload into the booking's Payment (see ``submit_proof``)."""
+    def save():
+        payment = Payment(booking_id=upload.booking_id)
+        with open(partial_path(upload), 'rb') as f:
+            payment.payment_proof.save(f'proof.{EXTENSIONS[upload.content_type]}', File(f))
+        return payment
+
+    try:
+        return submit_proof(upload.booking_id, save)
+    finally:
+        discard_upload(upload)
+
+
+def discard_upload(upload):
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def delete_stale_uploads():
+    """Drop resumable uploads abandoned for longer than ``UPLOAD_SESSION_TTL``."""
+    stale = list(ProofUpload.objects.filter(created_at__lt=timezone.now() - UPLOAD_SESSION_TTL))
+    for upload in stale:
+        discard_upload(upload)
+    return len(stale)
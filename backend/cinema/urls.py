@@ -1,25 +1,45 @@
 from django.urls import path, include
+from django.conf import settings
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
-       MovieList, MovieDetail, ShowtimeList, BookingListCreate,
-       RegisterView, UserProfileView, ShowtimeBookedSeats,
+       MovieList, MovieSearch, MovieDetail, ShowtimeList, BookingListCreate,
+       RegisterView, UserProfileView, UserBookingList, ShowtimeBookedSeats,
        TelebirrPaymentView, TelebirrNotificationView, MovieRecommendationView,
-       PaymentViewSet
+       PaymentViewSet, ProofUploadCreate, ProofUploadDetail, ShowtimeSchedule
    )
 
 router = DefaultRouter()
 router.register(r'payments', PaymentViewSet, basename='payment')
 
 urlpatterns = [
-       path('', include(router.urls)),
-       path('movies/', MovieList.as_view(), name='movie-list'),
+       path('movies/', async_views.movie_list if settings.ASYNC_VIEWS else MovieList.as_view(), name='movie-list'),
+       path('movies/search/', MovieSearch.as_view(), name='movie-search'),
        path('movies/<int:pk>/', MovieDetail.as_view(), name='movie-detail'),
-       path('showtimes/', ShowtimeList.as_view(), name='showtime-list'),
+       path(
+           'showtimes/',
+           async_views.showtime_list if settings.ASYNC_VIEWS else ShowtimeList.as_view(),
+           name='showtime-list',
+       ),
+       path('showtimes/schedule/', ShowtimeSchedule.as_view(), name='showtime-schedule'),
        path('bookings/', BookingListCreate.as_view(), name='booking-list-create'),
        path('register/', RegisterView.as_view(), name='register'),
        path('users/me/', UserProfileView.as_view(), name='user-profile'),
-       path('showtimes/<int:showtime_id>/booked-seats/', ShowtimeBookedSeats.as_view(), name='showtime-booked-seats'),
-       path('payments/<int:booking_id>/', TelebirrPaymentView.as_view(), name='telebirr-payment'),
+       path('users/me/bookings/', UserBookingList.as_view(), name='user-bookings'),
+       path(
+           'showtimes/<int:showtime_id>/booked-seats/',
+           async_views.showtime_booked_seats if settings.ASYNC_VIEWS else ShowtimeBookedSeats.as_view(),
+           name='showtime-booked-seats',
+       ),
+       path(
+           'payments/telebirr/<int:booking_id>/',
+           async_views.telebirr_payment if settings.ASYNC_VIEWS else TelebirrPaymentView.as_view(),
+           name='telebirr-payment',
+       ),
        path('payments/notify/', TelebirrNotificationView.as_view(), name='telebirr-notify'),
+       path('payments/uploads/', ProofUploadCreate.as_view(), name='proof-upload-create'),
+       path('payments/uploads/<uuid:pk>/', ProofUploadDetail.as_view(), name='proof-upload-detail'),
        path('recommendations/', MovieRecommendationView.as_view(), name='movie-recommendations'),
+       # After the explicit payments/ routes, which the router's payments/<pk>/ would shadow.
+       path('', include(router.urls)),
    ]
\ No newline at end of file
@@ -1,53 +1,141 @@
 from rest_framework import generics, status, views, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, SAFE_METHODS
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Movie, Theater, Showtime, Booking, Payment
-from .serializers import MovieSerializer, TheaterSerializer, ShowtimeSerializer, BookingSerializer, UserSerializer, PaymentSerializer
+from .models import Movie, Theater, Showtime, Booking, Payment, ProofUpload, Recommendation
+from .serializers import MovieSerializer, TheaterSerializer, ShowtimeSerializer, BookingSerializer, UserSerializer, UserProfileSerializer, PaymentSerializer, PaymentReviewSerializer, ProofUploadSerializer, ShowtimeScheduleSerializer
+from .payments import ProofRejected, record_notification, review_payments, submit_proof
+from .reservations import extend_hold
+from .scheduling import ScheduleError, schedule_showtimes
+from .search import search_movies
+from .seatmap import get_seat_map
+from .telebirr import TelebirrError, TelebirrUnavailable, build_order, get_client as get_telebirr_client
+from .uploads import ProofUploadHandler, complete_upload, parse_content_range, start_upload, write_chunk
 from django.contrib.auth.models import User
 from django.db import IntegrityError
-import requests
-import json
-import base64
-import uuid
+from rest_framework.exceptions import ValidationError
 from django.conf import settings
-import time
 import logging
-from django.views.decorators.cache import cache_page
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .cache import cache_catalog
+from .pagination import BookingCursorPagination, ShowtimeCursorPagination
 from django.utils.decorators import method_decorator
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-@method_decorator(cache_page(60*15), name='dispatch')
+def parse_datetime_param(params, name):
+    """Read an ISO date or datetime query parameter; a bare date means midnight."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            parsed = datetime.combine(day, datetime.min.time())
+    except ValueError:
+        raise ValidationError({name: 'Use an ISO 8601 date or datetime.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def parse_id_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValidationError({name: 'Must be an integer id.'})
+    return int(value)
+
+def filter_showtimes(queryset, params):
+    """Apply the ``ShowtimeList`` query parameters; upcoming shows only unless asked otherwise."""
+    movie_id = parse_id_param(params, 'movie')
+    if movie_id is not None:
+        queryset = queryset.filter(movie_id=movie_id)
+    theater_id = parse_id_param(params, 'theater')
+    if theater_id is not None:
+        queryset = queryset.filter(theater_id=theater_id)
+    date_from = parse_datetime_param(params, 'date_from')
+    date_to = parse_datetime_param(params, 'date_to')
+    if date_from is None and params.get('include_past') != 'true':
+        date_from = timezone.now()
+    if date_from is not None:
+        queryset = queryset.filter(date_time__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date_time__lt=date_to)
+    return queryset
+
+@method_decorator(cache_catalog('movie'), name='dispatch')
 class MovieList(generics.ListAPIView):
          queryset = Movie.objects.all()
          serializer_class = MovieSerializer
 
-@method_decorator(cache_page(60*15), name='dispatch')
+@method_decorator(cache_catalog('movie'), name='dispatch')
+class MovieSearch(APIView):
+    """``?q=`` full-text search over title, genre and director; see ``cinema.search``."""
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(MovieSerializer(search_movies(query, max(limit, 1)), many=True).data)
+
+@method_decorator(cache_catalog('movie'), name='dispatch')
 class MovieDetail(generics.RetrieveAPIView):
          queryset = Movie.objects.all()
          serializer_class = MovieSerializer
 
+# Upcoming-only listings go stale as shows start, so cache them briefly. Seat
+# counter changes bump 'availability' (see cinema.seating).
+@method_decorator(cache_catalog('movie', 'theater', 'showtime', 'availability', timeout=60*5), name='dispatch')
 class ShowtimeList(generics.ListAPIView):
-         queryset = Showtime.objects.all()
          serializer_class = ShowtimeSerializer
+         pagination_class = ShowtimeCursorPagination
+
+         def get_queryset(self):
+             return filter_showtimes(Showtime.objects.select_related('movie', 'theater'), self.request.query_params)
 
 class BookingListCreate(generics.ListCreateAPIView):
-         queryset = Booking.objects.all()
          serializer_class = BookingSerializer
          permission_classes = [IsAuthenticated]
+         pagination_class = BookingCursorPagination
+
+         def get_queryset(self):
+             params = self.request.query_params
+             queryset = Booking.objects.select_related('showtime__movie', 'showtime__theater', 'payment')
+             if not self.request.user.is_staff:
+                 return queryset.filter(user=self.request.user)
+             showtime_id = parse_id_param(params, 'showtime')
+             if showtime_id is not None:
+                 queryset = queryset.filter(showtime_id=showtime_id)
+             if params.get('status'):
+                 queryset = queryset.filter(payment_status=params['status'])
+             date_from = parse_datetime_param(params, 'date_from')
+             if date_from is not None:
+                 queryset = queryset.filter(booking_time__gte=date_from)
+             date_to = parse_datetime_param(params, 'date_to')
+             if date_to is not None:
+                 queryset = queryset.filter(booking_time__lt=date_to)
+             return queryset
 
          def perform_create(self, serializer):
              try:
-                 booking = serializer.save(user=self.request.user)
+                 serializer.save(user=self.request.user)
              except Exception as e:
                  logger.error(f"Booking creation error: {str(e)}")
-                 return Response(
-                     {"detail": f"Error creating booking: {str(e)}"},
-                     status=status.HTTP_400_BAD_REQUEST
-                 )
+                 raise
 
 class RegisterView(generics.CreateAPIView):
          serializer_class = UserSerializer
@@ -74,16 +162,36 @@ class RegisterView(generics.CreateAPIView):
                  )
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
-         serializer_class = UserSerializer
+         serializer_class = UserProfileSerializer
          permission_classes = [IsAuthenticated]
 
          def get_object(self):
-             return self.request.user
+             # Reads get the cached user and profile from CachedJWTAuthentication.
+             if self.request.method in SAFE_METHODS:
+                 return self.request.user
+             return User.objects.select_related('profile').get(pk=self.request.user.pk)
+
+class UserBookingList(generics.ListAPIView):
+    serializer_class = BookingSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = BookingCursorPagination
+
+    def get_queryset(self):
+        return Booking.objects.filter(user=self.request.user).select_related(
+            'showtime__movie', 'showtime__theater', 'payment'
+        )
 
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    upload_handler_classes = [ProofUploadHandler]
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Handlers must be swapped in before anything reads the request body.
+        if self.upload_handler_classes is not None:
+            request.upload_handlers = [handler(request) for handler in self.upload_handler_classes]
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -91,72 +199,90 @@ class PaymentViewSet(viewsets.ModelViewSet):
         return Payment.objects.filter(booking__user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save()
+        try:
+            submit_proof(serializer.validated_data['booking'].pk, serializer.save)
+        except ProofRejected as e:
+            raise ValidationError({'booking': str(e)})
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def approve(self, request, pk=None):
         payment = self.get_object()
-        payment.is_approved = True
-        payment.save()
-        payment.booking.payment_status = 'COMPLETED'
-        payment.booking.save()
+        result = review_payments([payment.id], approve=True)[payment.id]
+        if result != 'approved':
+            return Response({'error': f'Payment not approved: {result}'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'status': 'payment approved'})
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def review(self, request):
+        """Approve or reject up to 1000 payments at once: ``{"ids": [...], "decision": "approve"}``."""
+        serializer = PaymentReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = review_payments(serializer.validated_data['ids'], serializer.validated_data['decision'] == 'approve')
+        return Response({'results': [{'id': payment_id, 'result': result} for payment_id, result in results.items()]})
+
+class ProofUploadCreate(generics.CreateAPIView):
+    """Start a resumable proof upload; the bytes are then PUT to the upload's URL."""
+    serializer_class = ProofUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        start_upload(serializer.save(user=self.request.user))
+
+class ProofUploadDetail(generics.RetrieveAPIView):
+    """GET reports how many bytes arrived; PUT sends the next ``Content-Range`` chunk.
+
+    The response to the final chunk is the created payment.
+    """
+    serializer_class = ProofUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ProofUpload.objects.filter(user=self.request.user)
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_object()
+        content_range = parse_content_range(request.headers.get('Content-Range'))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_range is None or content_range[2] != upload.size or content_range[1] - content_range[0] + 1 != length:
+            return Response(
+                {'error': 'Content-Range must match the body length and the upload size'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if content_range[0] != upload.received:
+            # Out of order or already received: tell the client where to resume.
+            return Response(self.get_serializer(upload).data, status=status.HTTP_409_CONFLICT)
+        if not write_chunk(upload, content_range[0], request.stream, length):
+            return Response({'error': 'Chunk ended early'}, status=status.HTTP_400_BAD_REQUEST)
+        upload.refresh_from_db()
+        if upload.received < upload.size:
+            return Response(self.get_serializer(upload).data)
+        try:
+            payment = complete_upload(upload)
+        except ProofRejected as e:
+            raise ValidationError({'booking': str(e)})
+        return Response(PaymentSerializer(payment, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED)
+
 class TelebirrPaymentView(APIView):
          permission_classes = [IsAuthenticated]
 
          def post(self, request, booking_id):
              try:
-                 booking = Booking.objects.get(id=booking_id, user=self.request.user)
+                 booking = Booking.objects.select_related('showtime__movie').get(id=booking_id, user=self.request.user)
                  if booking.payment_status != 'PENDING':
                      return Response({'error': 'Payment already processed'}, status=status.HTTP_400_BAD_REQUEST)
 
-                 telebirr_config = {
-                     'app_id': settings.TELEBIRR_CONFIG['APP_ID'],
-                     'app_key': settings.TELEBIRR_CONFIG['APP_KEY'],
-                     'short_code': settings.TELEBIRR_CONFIG['SHORT_CODE'],
-                     'api_url': settings.TELEBIRR_CONFIG['API_URL'],
-                     'notify_url': 'http://your-domain.com/api/payments/notify/',
-                     'return_url': 'http://localhost:5173/payment/confirm',
-                     'public_key': settings.TELEBIRR_CONFIG['PUBLIC_KEY'],
-                     'timeout': '30',
-                     'receiver_name': 'Eliana Cinema',
-                 }
-
-                 amount = booking.num_tickets * 100  # Example: 100 ETB per ticket
-                 out_trade_no = str(uuid.uuid4().hex)
-                 subject = f'Booking {booking.id} for {booking.showtime.movie.title}'
-                 data = {
-                     'appId': telebirr_config['app_id'],
-                     'outTradeNo': out_trade_no,
-                     'subject': subject,
-                     'totalAmount': str(amount),
-                     'shortCode': telebirr_config['short_code'],
-                     'notifyUrl': telebirr_config['notify_url'],
-                     'returnUrl': telebirr_config['return_url'],
-                     'receiveName': telebirr_config['receiver_name'],
-                     'timeoutExpress': telebirr_config['timeout'],
-                     'nonce': str(uuid.uuid4().hex),
-                     'timestamp': str(int(time.time() * 1000)),
-                 }
-
-                 signature = base64.b64encode(json.dumps(data).encode()).decode('utf-8')
-
-                 response = requests.post(
-                     telebirr_config['api_url'],
-                     json={'data': data, 'sign': signature},
-                     headers={'Content-Type': 'application/json'},
-                 )
-                 if response.status_code != 200:
-                     logger.error(f"Telebirr API error: {response.text}")
-                     return Response({'error': 'Failed to initiate payment'}, status=status.HTTP_400_BAD_REQUEST)
-                 response_data = response.json()
-                 if response_data.get('code') == '0':
-                     booking.transaction_id = out_trade_no
-                     booking.save()
-                     return Response({'toPayUrl': response_data['data']['toPayUrl']})
-                 logger.error(f"Telebirr invalid response: {response_data}")
-                 return Response({'error': response_data.get('msg', 'Invalid response')}, status=status.HTTP_400_BAD_REQUEST)
+                 out_trade_no, order = build_order(booking)
+                 try:
+                     to_pay_url = get_telebirr_client().create_order(order)
+                 except TelebirrUnavailable as e:
+                     return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+                 except TelebirrError as e:
+                     return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                 booking.transaction_id = out_trade_no
+                 booking.save(update_fields=['transaction_id'])
+                 # Keep the seats for as long as the gateway lets the customer pay.
+                 extend_hold(booking, settings.TELEBIRR_CONFIG['ORDER_TIMEOUT'] * 60)
+                 return Response({'toPayUrl': to_pay_url})
              except Booking.DoesNotExist:
                  logger.error(f"Booking {booking_id} not found")
                  return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -168,34 +294,26 @@ class TelebirrNotificationView(APIView):
          permission_classes = [AllowAny]
 
          def post(self, request):
-             try:
-                 data = request.data
-                 out_trade_no = data.get('outTradeNo')
-                 status = data.get('status')
-                 booking = Booking.objects.get(transaction_id=out_trade_no)
-                 if status == 'SUCCESS':
-                     booking.payment_status = 'COMPLETED'
-                 else:
-                     booking.payment_status = 'FAILED'
-                 booking.save()
-                 return Response({'status': 'success'}, status=status.HTTP_200_OK)
-             except Booking.DoesNotExist:
-                 logger.error(f"Booking with transaction_id {out_trade_no} not found")
-                 return Response({'error': 'Booking not found'}, status=status.HTTP_400_BAD_REQUEST)
-             except Exception as e:
-                 logger.error(f"Notification error: {str(e)}", exc_info=True)
-                 return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+             # Only record the callback here; process_telebirr_notifications applies it,
+             # so gateway bursts never wait on Booking row locks.
+             if not record_notification(request.data):
+                 logger.error(f"Malformed Telebirr notification: {request.data}")
+                 return Response({'error': 'outTradeNo and status are required'}, status=status.HTTP_400_BAD_REQUEST)
+             return Response({'status': 'success'}, status=status.HTTP_200_OK)
 
 class ShowtimeBookedSeats(APIView):
          def get(self, request, showtime_id):
              try:
-                 showtime = Showtime.objects.get(id=showtime_id)
-                 bookings = Booking.objects.filter(showtime=showtime)
-                 booked_seats = []
-                 for booking in bookings:
-                     if booking.seats:
-                         booked_seats.extend(booking.seats.split(','))
-                 return Response({'booked_seats': booked_seats})
+                 seat_map = get_seat_map(showtime_id)
+                 if request.query_params.get('encoding') == 'bitmap':
+                     # Bit row * columns + column (least significant bit first) is set for each taken seat.
+                     return Response({
+                         'rows': seat_map.rows,
+                         'columns': seat_map.columns,
+                         'bitmap': seat_map.encode(),
+                         'extra_seats': sorted(seat_map.extra),
+                     })
+                 return Response({'booked_seats': seat_map.labels()})
              except Showtime.DoesNotExist:
                  logger.error(f"Showtime {showtime_id} not found")
                  return Response({'error': 'Showtime not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -203,13 +321,35 @@ class ShowtimeBookedSeats(APIView):
                  logger.error(f"Error fetching booked seats: {str(e)}", exc_info=True)
                  return Response({'error': f"Error fetching booked seats: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ShowtimeSchedule(APIView):
+    """Create showtimes in bulk from recurrence rules; see ``cinema.scheduling``.
+
+    Answers 201 with the count created, 200 for a dry run and 409 with the
+    conflicts when any planned showtime overlaps another in its theater.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = ShowtimeScheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        cleaning = data.get('cleaning_minutes')
+        try:
+            result = schedule_showtimes(
+                data['rules'], cleaning=None if cleaning is None else timedelta(minutes=cleaning),
+                dry_run=data['dry_run'],
+            )
+        except ScheduleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if result['conflicts'] and not data['dry_run']:
+            return Response(result, status=status.HTTP_409_CONFLICT)
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
 class MovieRecommendationView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        watched_movies = Booking.objects.filter(user=user).values_list('showtime__movie', flat=True)
-        watched_genres = Movie.objects.filter(id__in=watched_movies).values_list('genre', flat=True).distinct()
-        recommendations = Movie.objects.filter(genre__in=watched_genres).exclude(id__in=watched_movies)[:10]
-        serializer = MovieSerializer(recommendations, many=True)
+        # Ranked ahead of time by cinema.recommendations; see rebuild_recommendations.
+        recommendations = Recommendation.objects.filter(user=request.user).select_related('movie').order_by('rank')
+        serializer = MovieSerializer([recommendation.movie for recommendation in recommendations], many=True)
         return Response(serializer.data)
\ No newline at end of file
@@ -2,6 +2,8 @@
 ASGI config for eliana project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Live seat-map streams (``cinema.seatstream``) are routed here, ahead of Django,
+and everything else goes to the Django application.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eliana.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up, since it loads models.
+from cinema.seatstream import PATH_RE, seat_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and PATH_RE.match(scope['path']):
+        return await seat_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
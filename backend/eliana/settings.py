@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cinema.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -56,7 +57,7 @@ MIDDLEWARE = [
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'cinema.authentication.CachedJWTAuthentication',
     ],
 }
 
@@ -137,12 +138,19 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# The cache must be shared by all workers: catalog invalidation and seat maps
+# rely on it. The file-based default needs no extra services; point
+# CACHE_BACKEND/CACHE_LOCATION at Redis (redis://...) or a memcached socket
+# (unix:/path/to/memcached.sock) in production.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
     }
 }
+if CACHES['default']['BACKEND'].endswith('FileBasedCache'):
+    # The default cap of 300 files would keep evicting seat maps.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
 
 LOGGING = {
     'version': 1,
@@ -189,6 +197,10 @@ LOGGING = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Largest accepted payment proof, and where resumable uploads are assembled.
+PAYMENT_PROOF_MAX_SIZE = config('PAYMENT_PROOF_MAX_SIZE', default=10 * 1024 * 1024, cast=int)
+PAYMENT_UPLOAD_DIR = config('PAYMENT_UPLOAD_DIR', default=str(BASE_DIR / 'uploads'))
+
 # Note: SQLite is used for development. For production, consider a more robust database like PostgreSQL.
 # DATABASES = {
 #     'default': {
@@ -209,4 +221,41 @@ TELEBIRR_CONFIG = {
     'SHORT_CODE': config('TELEBIRR_SHORT_CODE'),
     'API_URL': config('TELEBIRR_API_URL', default='https://api.telebirr.com/'),
     'PUBLIC_KEY': config('TELEBIRR_PUBLIC_KEY'),
-}
\ No newline at end of file
+    'NOTIFY_URL': config('TELEBIRR_NOTIFY_URL', default='http://your-domain.com/api/payments/notify/'),
+    'RETURN_URL': config('TELEBIRR_RETURN_URL', default='http://localhost:5173/payment/confirm'),
+    'ORDER_TIMEOUT': 30,  # minutes the customer has to pay
+    # Bounds on how long a checkout can hold a worker while the gateway is slow.
+    'CONNECT_TIMEOUT': config('TELEBIRR_CONNECT_TIMEOUT', default=3.05, cast=float),
+    'READ_TIMEOUT': config('TELEBIRR_READ_TIMEOUT', default=10, cast=float),
+    'MAX_RETRIES': config('TELEBIRR_MAX_RETRIES', default=2, cast=int),
+}
+
+# Serve the async versions of the hot read endpoints and the gateway-bound
+# checkout when running under ASGI (see cinema.async_views).
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Requests slower than this many milliseconds are logged with their SQL
+# (0 turns the log off). With METRICS_TOKEN set, /metrics needs
+# "Authorization: Bearer <token>".
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=0, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Seconds a user stays cached for authenticating read requests (see
+# cinema.authentication); saves invalidate it earlier.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+
+# Minutes a theater is blocked after each showtime for cleaning, when
+# scheduling in bulk (see cinema.scheduling).
+SHOWTIME_CLEANING_MINUTES = config('SHOWTIME_CLEANING_MINUTES', default=20, cast=int)
+
+# Seconds a PENDING booking keeps its seats before the expiry sweeper releases them.
+SEAT_HOLD_TTL = config('SEAT_HOLD_TTL', default=15 * 60, cast=int)
+
+# How seat-state events reach the live seat-map streams. CacheBroker relays
+# them through the shared cache, so holds expired by the sweeper reach every
+# ASGI worker; cinema.seatfeed.LocalBroker keeps them within one process.
+# CacheBroker needs atomic increments, which the file-based cache lacks.
+SEAT_FEED_BROKER = config('SEAT_FEED_BROKER', default=(
+    'cinema.seatfeed.LocalBroker' if CACHES['default']['BACKEND'].endswith('FileBasedCache')
+    else 'cinema.seatfeed.CacheBroker'
+))
@@ -22,7 +22,7 @@ function Bookings() {
         throw new Error(errorData.detail || 'Failed to fetch bookings');
       }
       const data = await response.json();
-      setBookings(data);
+      setBookings(data.results);
       setLoading(false);
     } catch (error) {
       console.error('Fetch bookings error:', error);
@@ -86,7 +86,7 @@ function Bookings() {
                   <div className="mb-4">
                     <p className="text-text-light font-medium mb-2">Payment Proof:</p>
                     <a href={`${import.meta.env.VITE_API_BASE_URL}${booking.payment.payment_proof}`} target="_blank" rel="noopener noreferrer">
-                      <img src={`${import.meta.env.VITE_API_BASE_URL}${booking.payment.payment_proof}`} alt="Payment Proof" className="w-full h-48 object-cover rounded-lg shadow-md cursor-pointer hover:opacity-90 transition duration-300" />
+                      <img src={`${import.meta.env.VITE_API_BASE_URL}${booking.payment.thumbnail || booking.payment.payment_proof}`} alt="Payment Proof" className="w-full h-48 object-cover rounded-lg shadow-md cursor-pointer hover:opacity-90 transition duration-300" />
                     </a>
                   </div>
                 )}
@@ -20,7 +20,7 @@ function MovieDetail() {
     setLoading(true);
     Promise.all([
       fetch(`${import.meta.env.VITE_API_BASE_URL}/api/movies/${id}/`),
-      fetch(`${import.meta.env.VITE_API_BASE_URL}/api/showtimes/`)
+      fetch(`${import.meta.env.VITE_API_BASE_URL}/api/showtimes/?movie=${id}`)
     ])
       .then(async ([movieResponse, showtimesResponse]) => {
         if (!movieResponse.ok || !showtimesResponse.ok) {
@@ -29,7 +29,7 @@ function MovieDetail() {
         const movieData = await movieResponse.json();
         const showtimesData = await showtimesResponse.json();
         setMovie(movieData);
-        setShowtimes(showtimesData.filter(showtime => showtime.movie.id === parseInt(id)));
+        setShowtimes(showtimesData.results);
         setLoading(false);
       })
       .catch(error => {
@@ -54,6 +54,25 @@ function MovieDetail() {
           console.error('Error fetching booked seats:', error);
           setBookingMessage('Error loading seat availability.');
         });
+
+      // Live updates while the seat map is open: a snapshot on (re)connect, then deltas.
+      const source = new EventSource(`${import.meta.env.VITE_API_BASE_URL}/api/showtimes/${selectedShowtime}/seats/stream/`);
+      const taken = (seats) => {
+        setBookedSeats(prev => [...new Set([...prev, ...seats])]);
+        setSelectedSeats(prev => prev.filter(seat => !seats.includes(seat)));
+      };
+      source.addEventListener('snapshot', event => {
+        const { seats } = JSON.parse(event.data);
+        setBookedSeats(seats);
+        setSelectedSeats(prev => prev.filter(seat => !seats.includes(seat)));
+      });
+      source.addEventListener('held', event => taken(JSON.parse(event.data).seats));
+      source.addEventListener('sold', event => taken(JSON.parse(event.data).seats));
+      source.addEventListener('free', event => {
+        const { seats } = JSON.parse(event.data);
+        setBookedSeats(prev => prev.filter(seat => !seats.includes(seat)));
+      });
+      return () => source.close();
     }
   }, [selectedShowtime]);
 
@@ -176,6 +195,7 @@ function MovieDetail() {
               {showtimes.map(showtime => (
                 <option key={showtime.id} value={showtime.id}>
                   {showtime.theater.name} - {new Date(showtime.date_time).toLocaleString()}
+                  {showtime.seats_available === 0 ? ' (Sold out)' : showtime.selling_fast ? ` (Selling fast - ${showtime.seats_available} left)` : ''}
                 </option>
               ))}
             </select>
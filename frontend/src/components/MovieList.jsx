@@ -6,6 +6,8 @@ function MovieList() {
   const [movies, setMovies] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [query, setQuery] = useState('');
+  const [results, setResults] = useState(null);
 
   useEffect(() => {
     axios.get(`${import.meta.env.VITE_API_BASE_URL}/api/movies/`)
@@ -20,6 +22,21 @@ function MovieList() {
       });
   }, []);
 
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setResults(null);
+      return;
+    }
+    // Debounce keystrokes; the server does the matching against its search index.
+    const timer = setTimeout(() => {
+      axios.get(`${import.meta.env.VITE_API_BASE_URL}/api/movies/search/`, { params: { q } })
+        .then(response => setResults(response.data))
+        .catch(error => console.error('Error searching movies:', error));
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [query]);
+
   if (loading) {
     return <div className="text-center text-text-light text-xl py-8">Loading movies...</div>;
   }
@@ -32,8 +49,18 @@ function MovieList() {
     <div className="bg-dark-1 min-h-screen text-text-light pt-16">
       <div className="container mx-auto py-8 px-4">
         <h1 className="text-4xl font-bold text-center text-primary mb-8">All Movies</h1>
+        <input
+          type="search"
+          value={query}
+          onChange={e => setQuery(e.target.value)}
+          placeholder="Search by title, genre or director"
+          className="w-full mb-8 p-3 rounded-lg bg-dark-2 border border-dark-3 text-text-light focus:outline-none focus:border-primary"
+        />
+        {results && results.length === 0 && (
+          <p className="text-center text-text-dark mb-8">No movies match "{query.trim()}".</p>
+        )}
         <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-8">
-          {movies.map(movie => (
+          {(results ?? movies).map(movie => (
             <div key={movie.id} className="bg-dark-2 rounded-xl shadow-2xl p-5 border border-dark-3 transition duration-300 ease-in-out transform hover:-translate-y-2 hover:shadow-lg">
               <img src={movie.poster} alt={movie.title} className="w-full h-72 object-cover rounded-lg mb-4" />
               <h2 className="text-xl font-semibold text-text-light mb-2">{movie.title}</h2>
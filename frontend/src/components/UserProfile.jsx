@@ -6,6 +6,7 @@ function UserProfile() {
   const { user, token, logout } = useContext(AuthContext);
   const navigate = useNavigate();
   const [profile, setProfile] = useState(null);
+  const [bookings, setBookings] = useState([]);
   const [formData, setFormData] = useState({ email: '', phone: '' });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
@@ -18,17 +19,21 @@ function UserProfile() {
     }
     const fetchProfile = async () => {
       try {
-        const response = await fetch(`${import.meta.env.VITE_API_BASE_URL}/api/users/me/`, {
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`,
-          },
-        });
-        if (!response.ok) {
+        const headers = {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`,
+        };
+        const [response, bookingsResponse] = await Promise.all([
+          fetch(`${import.meta.env.VITE_API_BASE_URL}/api/users/me/`, { headers }),
+          fetch(`${import.meta.env.VITE_API_BASE_URL}/api/users/me/bookings/`, { headers }),
+        ]);
+        if (!response.ok || !bookingsResponse.ok) {
           throw new Error('Failed to fetch profile');
         }
         const data = await response.json();
+        const bookingsData = await bookingsResponse.json();
         setProfile(data);
+        setBookings(bookingsData.results);
         setFormData({ email: data.email, phone: data.phone });
         setLoading(false);
       } catch (err) {
@@ -131,11 +136,11 @@ function UserProfile() {
 
         <div className="bg-dark-2 rounded-xl shadow-2xl p-8 border border-dark-3">
           <h2 className="text-3xl font-bold text-text-light mb-6">Booking History</h2>
-          {profile?.bookings?.length === 0 ? (
+          {bookings.length === 0 ? (
             <p className="text-center text-text-dark text-lg py-4">No bookings found.</p>
           ) : (
             <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
-              {profile?.bookings?.map(booking => (
+              {bookings.map(booking => (
                 <div key={booking.id} className="bg-dark-3 rounded-lg shadow-md p-5 border border-dark-2 transition duration-300 ease-in-out hover:shadow-lg">
                   <p className="text-text-light text-lg mb-1"><strong>Movie:</strong> {booking.showtime.movie.title}</p>
                   <p className="text-text-dark text-md mb-1"><strong>Theater:</strong> {booking.showtime.theater.name}</p>